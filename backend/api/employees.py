@@ -8,6 +8,7 @@ from sqlalchemy.exc import IntegrityError
 
 from ..database import session_scope
 from ..models import Pracownik
+from ..services.preferences import invalidate_preferences
 from .utils import parse_date, response_message
 
 
@@ -114,6 +115,8 @@ def update_employee(employee_id: int):
         for attr in ["imie", "nazwisko", "rola_id", "limit_godzin_miesieczny", "preferencje"]:
             if attr in payload:
                 setattr(employee, attr, payload.get(attr))
+        if "preferencje" in payload:
+            invalidate_preferences(employee_id)
         
         # Handle etat conversion explicitly
         if "etat" in payload:
@@ -136,4 +139,5 @@ def delete_employee(employee_id: int):
             return jsonify(response_message("Employee not found")), 404
 
         session.delete(employee)
+        invalidate_preferences(employee_id)
         return "", 204
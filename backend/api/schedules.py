@@ -1,22 +1,37 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime, date
 from time import time
+from typing import Any, Dict
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from sqlalchemy.orm import selectinload
 
 from ..core.generator import GenerationError
 from ..core.heuristic_generator import generate_monthly_schedule as heuristic_generate
-from ..core.ortools_generator import OrToolsGenerator
+from ..core.ortools_generator import (
+    CapacityError,
+    GenerationCancelled,
+    GenerationError as OrToolsGenerationError,
+    InfeasibleScheduleError,
+    OrToolsGenerator,
+    WARM_START_SOURCES,
+)
+from ..core.quarter_generator import QuarterGenerator
+from ..core.schedule_repair import ScheduleRepairGenerator
 from ..database import session_scope
 from ..models import GrafikEntry, GrafikMiesieczny, Nieobecnosc, Zmiana, Pracownik, Holiday
+from ..services.jobs import GenerationJob, JobCancelled, JobFailed, job_manager
+from ..services.persistence import sync_schedule_entries
 from ..services.walidacja import validate_schedule
-from .utils import response_message
+from .utils import parse_date, response_message
 
 
 bp = Blueprint("schedules", __name__)
 
+SSE_KEEPALIVE_SECONDS = 15.0
+
 
 def _serialize_entry(entry: GrafikEntry):
     return {
@@ -68,19 +83,28 @@ def _serialize_absences(absences):
     ]
 
 
-@bp.post("/grafiki/generuj")
-def generate_schedule():
-    payload = request.get_json(silent=True) or {}
+def _parse_generation_payload(payload) -> Dict[str, Any]:
+    """Validate a generation request body.
+
+    Raises:
+        ValueError: with a user-facing message when a parameter is invalid
+    """
     month = payload.get("month")
     year = payload.get("year")
     generator_type = payload.get("generator_type", "heuristic")  # "heuristic" or "ortools"
     scenario_type = payload.get("scenario_type", "DEFAULT")  # For OR-Tools: DEFAULT, NIGHT_FOCUS, etc.
+    warm_start = payload.get("warm_start")  # For OR-Tools: previous_month, heuristic, current
+    diagnose = payload.get("diagnose", False)  # For OR-Tools: explain infeasible months
+    soft_coverage = payload.get("soft_coverage")  # For OR-Tools: best-effort roster with uncovered slots
+    rolling_horizon = payload.get("rolling_horizon", False)  # For OR-Tools: rest rules across the month start
+    decompose = payload.get("decompose")  # For OR-Tools: solve role groups as parallel models
 
     # Validate generator_type
     if generator_type not in ["heuristic", "ortools"]:
-        return jsonify(response_message(
-            "Parametr 'generator_type' musi być 'heuristic' lub 'ortools'"
-        )), 400
+        raise ValueError("Parametr 'generator_type' musi być 'heuristic' lub 'ortools'")
+
+    if warm_start is not None and warm_start not in WARM_START_SOURCES:
+        raise ValueError("Parametr 'warm_start' musi być jednym z: " + ", ".join(WARM_START_SOURCES))
 
     try:
         if not month or not year:
@@ -90,30 +114,125 @@ def generate_schedule():
         month = int(month)
         year = int(year)
     except (TypeError, ValueError):
-        return jsonify(response_message("Parametry 'month' i 'year' muszą być liczbami")), 400
+        raise ValueError("Parametry 'month' i 'year' muszą być liczbami")
+
+    return {
+        "month": month,
+        "year": year,
+        "generator_type": generator_type,
+        "scenario_type": scenario_type,
+        "warm_start": warm_start,
+        "diagnose": bool(diagnose),
+        "soft_coverage": None if soft_coverage is None else bool(soft_coverage),
+        "rolling_horizon": bool(rolling_horizon),
+        "decompose": None if decompose is None else bool(decompose),
+    }
+
+
+def _run_generation(
+    session,
+    params: Dict[str, Any],
+    progress_callback=None,
+    solution_callback=None,
+    cancel_event=None,
+) -> Dict[str, Any]:
+    """Generate a schedule and return the serialized response body.
+
+    Raises:
+        GenerationError / OrToolsGenerationError: when no schedule can be generated
+    """
+    year = params["year"]
+    month = params["month"]
+    generator_type = params["generator_type"]
+    scenario_type = params["scenario_type"]
+
+    # Measure generation time
+    start_time = time()
+
+    solver_stats = None
+    persist_stats = None
+    uncovered_slots = None
+    if generator_type == "ortools":
+        # Use OR-Tools generator
+        generator = OrToolsGenerator(
+            session,
+            year,
+            month,
+            scenario_type,
+            warm_start=params.get("warm_start"),
+            diagnose=params.get("diagnose", False),
+            soft_coverage=params.get("soft_coverage"),
+            rolling_horizon=params.get("rolling_horizon", False),
+            decompose=params.get("decompose"),
+            progress_callback=progress_callback,
+            solution_callback=solution_callback,
+            cancel_event=cancel_event,
+        )
+        schedule, entries, issues = generator.generate()
+        runtime_ms = int((time() - start_time) * 1000)
+        solver_stats = generator.solve_stats
+        persist_stats = generator.persist_stats
+        if generator.soft_coverage:
+            uncovered_slots = generator.uncovered_slots
+    else:
+        # Use heuristic generator
+        schedule, entries, issues = heuristic_generate(session, year, month)
+        runtime_ms = int((time() - start_time) * 1000)
+
+    shifts = session.query(Zmiana).all()
+    absences = session.query(Nieobecnosc).all()
+
+    serialized = _serialize_schedule(schedule, entries)
+    serialized["issues"] = [issue.__dict__ for issue in issues]
+    serialized["shifts"] = _serialize_shifts(shifts)
+    serialized["absences"] = _serialize_absences(absences)
+
+    # Add diagnostics
+    serialized["diagnostics"] = {
+        "generator_type": generator_type,
+        "scenario_type": scenario_type if generator_type == "ortools" else None,
+        "runtime_ms": runtime_ms,
+        "entry_count": len(entries),
+        "issue_count": len(issues),
+        "blocking_issues": len([i for i in issues if i.level == "error"]),
+        "warning_issues": len([i for i in issues if i.level == "warning"]),
+        "time_to_first_feasible_ms": solver_stats.get("time_to_first_feasible_ms") if solver_stats else None,
+        "solver": solver_stats,
+        "persisted": persist_stats,
+        "uncovered_slots": uncovered_slots,
+    }
+    return serialized
+
+
+@bp.post("/grafiki/generuj")
+def generate_schedule():
+    payload = request.get_json(silent=True) or {}
+    try:
+        params = _parse_generation_payload(payload)
+    except ValueError as exc:
+        return jsonify(response_message(str(exc))), 400
 
     with session_scope() as session:
         try:
-            # Measure generation time
-            start_time = time()
-            
-            if generator_type == "ortools":
-                # Use OR-Tools generator
-                try:
-                    generator = OrToolsGenerator(session, year, month, scenario_type)
-                except ImportError as imp_err:
-                    return jsonify(response_message(
-                        "Środowisko nie ma zainstalowanej biblioteki OR-Tools",
-                        error=str(imp_err),
-                    )), 500
-                schedule, entries, issues = generator.generate()
-                runtime_ms = int((time() - start_time) * 1000)
-            else:
-                # Use heuristic generator
-                schedule, entries, issues = heuristic_generate(session, year, month)
-                runtime_ms = int((time() - start_time) * 1000)
-                
-        except GenerationError as exc:
+            serialized = _run_generation(session, params)
+        except ImportError as imp_err:
+            return jsonify(response_message(
+                "Środowisko nie ma zainstalowanej biblioteki OR-Tools",
+                error=str(imp_err),
+            )), 500
+        except CapacityError as exc:
+            return jsonify(response_message(
+                "Nie można wygenerować grafiku",
+                error=str(exc),
+                capacity=exc.report.to_dict(),
+            )), 400
+        except InfeasibleScheduleError as exc:
+            return jsonify(response_message(
+                "Nie można wygenerować grafiku",
+                error=str(exc),
+                infeasibility=exc.causes,
+            )), 400
+        except (GenerationError, OrToolsGenerationError) as exc:
             return jsonify(response_message("Nie można wygenerować grafiku", error=str(exc))), 400
         except Exception as exc:
             # Bezpieczny fallback błędów nieprzewidzianych z dodaniem typu wyjątku
@@ -124,29 +243,249 @@ def generate_schedule():
             if os.getenv("FLASK_DEBUG", "0") == "1":
                 payload["trace"] = traceback.format_exc()
             return jsonify(payload), 500
-            
-        shifts = session.query(Zmiana).all()
-        absences = session.query(Nieobecnosc).all()
+
+        return jsonify(serialized), 200
+
+
+@bp.post("/grafiki/generuj-kwartal")
+def generate_quarter():
+    """
+    Generate the three monthly schedules of a quarter with OR-Tools.
+
+    Months are solved one after another with rest carried across month
+    boundaries and hours capped by the quarterly limit of each ``etat``.
+    """
+    payload = request.get_json(silent=True) or {}
+    soft_coverage = payload.get("soft_coverage")
+    try:
+        year = int(payload.get("year") or datetime.utcnow().year)
+        quarter = int(payload.get("quarter"))
+    except (TypeError, ValueError):
+        return jsonify(response_message("Parametry 'year' i 'quarter' muszą być liczbami")), 400
+    if quarter not in (1, 2, 3, 4):
+        return jsonify(response_message("Parametr 'quarter' musi być liczbą od 1 do 4")), 400
+
+    with session_scope() as session:
+        try:
+            result = QuarterGenerator(
+                session,
+                year,
+                quarter,
+                scenario_type=payload.get("scenario_type", "DEFAULT"),
+                soft_coverage=None if soft_coverage is None else bool(soft_coverage),
+            ).generate()
+        except CapacityError as exc:
+            return jsonify(response_message(
+                "Nie można wygenerować grafiku kwartalnego",
+                error=str(exc),
+                capacity=exc.report.to_dict(),
+            )), 400
+        except OrToolsGenerationError as exc:
+            return jsonify(response_message("Nie można wygenerować grafiku kwartalnego", error=str(exc))), 400
+
+        schedules = []
+        for month_result in result.months:
+            serialized = _serialize_schedule(month_result.schedule, month_result.entries)
+            serialized["issues"] = [issue.__dict__ for issue in month_result.issues]
+            serialized["solver"] = month_result.generator.solve_stats
+            schedules.append(serialized)
+        return jsonify({"quarter": result.summary(), "schedules": schedules}), 200
+
+
+@bp.post("/grafiki/<int:schedule_id>/napraw")
+def repair_schedule(schedule_id: int):
+    """
+    Repair a stored schedule after one employee's absence changed.
+
+    Body: ``{"nieobecnosc_id": ...}`` for a new or edited absence, or
+    ``{"pracownik_id", "data_od", "data_do"}`` (e.g. for a deleted one or the
+    union of an edited absence's old and new range). Only the neighborhood of
+    the affected days and role is re-solved; the rest of the roster is kept.
+    """
+    payload = request.get_json(silent=True) or {}
+    soft_coverage = payload.get("soft_coverage")
+    radius_days = payload.get("radius_days")
+    if radius_days is not None:
+        try:
+            radius_days = int(radius_days)
+        except (TypeError, ValueError):
+            return jsonify(response_message("Parametr 'radius_days' musi być liczbą")), 400
+
+    with session_scope() as session:
+        schedule = session.get(GrafikMiesieczny, schedule_id)
+        if not schedule:
+            return jsonify(response_message("Grafik nie istnieje")), 404
+
+        if payload.get("nieobecnosc_id") is not None:
+            absence = session.get(Nieobecnosc, payload["nieobecnosc_id"])
+            if not absence:
+                return jsonify(response_message("Nieobecność nie istnieje")), 404
+            pracownik_id, data_od, data_do = absence.pracownik_id, absence.data_od, absence.data_do
+        else:
+            pracownik_id = payload.get("pracownik_id")
+            try:
+                data_od = parse_date(payload.get("data_od"))
+                data_do = parse_date(payload.get("data_do"))
+            except ValueError:
+                data_od = data_do = None
+            if not pracownik_id or not data_od or not data_do or data_do < data_od:
+                return jsonify(response_message(
+                    "Podaj 'nieobecnosc_id' albo 'pracownik_id' z poprawnym zakresem 'data_od'–'data_do'"
+                )), 400
+
+        year, month = (int(part) for part in schedule.miesiac_rok.split("-"))
+        start_time = time()
+        try:
+            generator = ScheduleRepairGenerator(
+                session,
+                year,
+                month,
+                int(pracownik_id),
+                data_od,
+                data_do,
+                radius_days=radius_days,
+                scenario_type=payload.get("scenario_type", "DEFAULT"),
+                diagnose=bool(payload.get("diagnose", False)),
+                soft_coverage=None if soft_coverage is None else bool(soft_coverage),
+            )
+            schedule, entries, issues = generator.generate()
+        except CapacityError as exc:
+            return jsonify(response_message(
+                "Nie można naprawić grafiku",
+                error=str(exc),
+                capacity=exc.report.to_dict(),
+            )), 400
+        except InfeasibleScheduleError as exc:
+            return jsonify(response_message(
+                "Nie można naprawić grafiku",
+                error=str(exc),
+                infeasibility=exc.causes,
+            )), 400
+        except OrToolsGenerationError as exc:
+            return jsonify(response_message("Nie można naprawić grafiku", error=str(exc))), 400
 
         serialized = _serialize_schedule(schedule, entries)
         serialized["issues"] = [issue.__dict__ for issue in issues]
-        serialized["shifts"] = _serialize_shifts(shifts)
-        serialized["absences"] = _serialize_absences(absences)
-        
-        # Add diagnostics
         serialized["diagnostics"] = {
-            "generator_type": generator_type,
-            "scenario_type": scenario_type if generator_type == "ortools" else None,
-            "runtime_ms": runtime_ms,
-            "entry_count": len(entries),
-            "issue_count": len(issues),
-            "blocking_issues": len([i for i in issues if i.level == "error"]),
-            "warning_issues": len([i for i in issues if i.level == "warning"]),
+            "runtime_ms": int((time() - start_time) * 1000),
+            "repair": generator.repair_stats,
+            "solver": generator.solve_stats,
+            "persisted": generator.persist_stats,
+            "uncovered_slots": generator.uncovered_slots if generator.soft_coverage else None,
         }
-        
         return jsonify(serialized), 200
 
 
+def _generation_job(job: GenerationJob) -> Dict[str, Any]:
+    """Job body: generate in the worker thread with its own session."""
+    if job.cancel_event.is_set():
+        raise JobCancelled()
+    with session_scope() as session:
+        try:
+            return _run_generation(
+                session,
+                job.params,
+                progress_callback=job.report_progress,
+                solution_callback=job.publish_solution,
+                cancel_event=job.cancel_event,
+            )
+        except GenerationCancelled:
+            raise JobCancelled()
+        # Same report as POST /grafiki/generuj, kept on the job as error_details
+        except CapacityError as exc:
+            raise JobFailed(
+                f"{exc.__class__.__name__}: {exc}",
+                response_message(
+                    "Nie można wygenerować grafiku",
+                    error=str(exc),
+                    capacity=exc.report.to_dict(),
+                ),
+            ) from exc
+        except InfeasibleScheduleError as exc:
+            raise JobFailed(
+                f"{exc.__class__.__name__}: {exc}",
+                response_message(
+                    "Nie można wygenerować grafiku",
+                    error=str(exc),
+                    infeasibility=exc.causes,
+                ),
+            ) from exc
+
+
+@bp.post("/grafiki/generuj/zadania")
+def submit_generation_job():
+    """Queue schedule generation and return a job id to poll."""
+    payload = request.get_json(silent=True) or {}
+    try:
+        params = _parse_generation_payload(payload)
+    except ValueError as exc:
+        return jsonify(response_message(str(exc))), 400
+
+    job = job_manager.submit(params, _generation_job)
+    return jsonify(job.to_dict(include_result=False)), 202
+
+
+@bp.get("/grafiki/zadania/<string:job_id>")
+def get_generation_job(job_id: str):
+    """Job status, solver progress and, once completed, the generated schedule."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify(response_message("Zadanie nie istnieje")), 404
+    return jsonify(job.to_dict())
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@bp.get("/grafiki/zadania/<string:job_id>/strumien")
+def stream_generation_job(job_id: str):
+    """
+    Server-sent events for a generation job.
+
+    Emits ``progress`` when the generation enters a new phase, ``solution``
+    for every improving solution (with its entries), so the UI can show a
+    usable roster while the solver keeps refining it, and a final ``status``
+    event with the finished job.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify(response_message("Zadanie nie istnieje")), 404
+
+    def events():
+        seq = -1
+        sent_solution = None
+        sent_phase = None
+        while True:
+            seq = job.wait_for_update(seq, timeout=SSE_KEEPALIVE_SECONDS)
+            progress = job.to_dict(include_result=False)["progress"]
+            if progress.get("phase") != sent_phase:
+                sent_phase = progress.get("phase")
+                yield _sse_event("progress", progress)
+            solution = job.latest_solution
+            if solution is not None and solution is not sent_solution:
+                sent_solution = solution
+                yield _sse_event("solution", solution)
+            if job.finished:
+                yield _sse_event("status", job.to_dict())
+                return
+            yield ": keepalive\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.delete("/grafiki/zadania/<string:job_id>")
+def cancel_generation_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify(response_message("Zadanie nie istnieje")), 404
+    return jsonify(job.to_dict(include_result=False)), 202
+
+
 @bp.get("/grafiki/ostatni")
 def latest_schedule():
     with session_scope() as session:
@@ -225,22 +564,20 @@ def update_schedule(schedule_id: int):
         if not schedule:
             return jsonify(response_message("Grafik nie istnieje")), 404
 
-        session.query(GrafikEntry).filter(
-            GrafikEntry.grafik_miesieczny_id == schedule_id
-        ).delete()
-
+        assignments = []
         for row in entries_payload:
             try:
-                entry = GrafikEntry(
-                    grafik_miesieczny_id=schedule_id,
-                    pracownik_id=int(row["pracownik_id"]),
-                    zmiana_id=int(row["zmiana_id"]),
-                    data=date.fromisoformat(row["data"]),
+                assignments.append(
+                    (
+                        int(row["pracownik_id"]),
+                        date.fromisoformat(row["data"]),
+                        int(row["zmiana_id"]),
+                    )
                 )
-            except (KeyError, ValueError):
+            except (KeyError, TypeError, ValueError):
                 return jsonify(response_message("Nieprawidłowe dane wpisu grafiku")), 400
-            session.add(entry)
 
+        sync_schedule_entries(session, schedule_id, assignments)
         schedule.status = payload.get("status", schedule.status)
         session.flush()
 
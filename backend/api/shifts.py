@@ -25,6 +25,7 @@ def serialize_shift(shift: Zmiana) -> Dict[str, Any]:
         if isinstance(shift.godzina_zakonczenia, time)
         else None,
         "wymagana_obsada": shift.wymagana_obsada,
+        "przerwa_minuty": shift.przerwa_minuty,
     }
 
 
@@ -46,6 +47,7 @@ def create_shift():
         godzina_rozpoczecia=parse_time(payload.get("godzina_rozpoczecia")),
         godzina_zakonczenia=parse_time(payload.get("godzina_zakonczenia")),
         wymagana_obsada=payload.get("wymagana_obsada"),
+        przerwa_minuty=payload.get("przerwa_minuty"),
     )
 
     try:
@@ -82,6 +84,8 @@ def update_shift(shift_id: int):
             shift.godzina_zakonczenia = parse_time(payload.get("godzina_zakonczenia"))
         if "wymagana_obsada" in payload:
             shift.wymagana_obsada = payload.get("wymagana_obsada")
+        if "przerwa_minuty" in payload:
+            shift.przerwa_minuty = payload.get("przerwa_minuty")
 
         session.flush()
         return jsonify(serialize_shift(shift))
@@ -12,6 +12,7 @@ from calendar import monthrange
 from flask import Blueprint, jsonify, request
 from sqlalchemy.orm import selectinload
 
+from ..core.ortools_generator import GenerationError as OrToolsGenerationError, OrToolsGenerator
 from ..database import session_scope
 from ..models import GrafikEntry, GrafikMiesieczny, Zmiana, Holiday, Pracownik
 from ..services.walidacja import validate_schedule, validate_schedule_with_rules
@@ -230,3 +231,49 @@ def validate_entries_endpoint():
             "validation_type": "rules-based" if use_rules else "basic",
             "entry_count": len(entries)
         }), 200
+
+
+@bp.post("/walidacja/wykonalnosc")
+def capacity_analysis_endpoint():
+    """
+    Check staffing capacity for a month before running the OR-Tools solver.
+
+    Request body:
+    {
+        "year": 2024,
+        "month": 1,
+        "scenario_type": "DEFAULT"  // optional
+    }
+
+    Returns:
+    {
+        "year": 2024,
+        "month": 1,
+        "feasible": false,
+        "slot_deficits": [{"date": "2024-01-02", "shift_id": 1, "shift_name": "Poranna",
+                           "role": "Kasjer", "required": 2, "available": 1, "deficit": 1}],
+        "day_deficits": [...],
+        "hour_deficits": [{"role": "Kasjer", "required_hours": 496.0,
+                           "capacity_hours": 320.0, "deficit_hours": 176.0}],
+        "messages": ["..."],
+        "elapsed_ms": 0.8
+    }
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        year = int(payload["year"])
+        month = int(payload["month"])
+        monthrange(year, month)
+    except (KeyError, ValueError, TypeError):
+        return jsonify(response_message("Wymagane parametry: year, month")), 400
+    scenario_type = payload.get("scenario_type", "DEFAULT")
+
+    with session_scope() as session:
+        try:
+            generator = OrToolsGenerator(session, year, month, scenario_type)
+        except OrToolsGenerationError as exc:
+            return jsonify(response_message("Nie można przeanalizować obsady", error=str(exc))), 400
+        report = generator.analyze_capacity()
+        body = report.to_dict()
+        body["messages"] = report.messages()
+        return jsonify(body), 200
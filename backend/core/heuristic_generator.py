@@ -11,13 +11,16 @@ For constraint programming approach with legal compliance, see ortools_generator
 from __future__ import annotations
 
 from calendar import monthrange
-from collections import deque, defaultdict
-from datetime import date, timedelta
-from typing import Any, Dict, Iterable, List, Optional, Tuple, cast
+from datetime import date
+from typing import List, Optional, Tuple, cast
 
+import numpy as np
 from sqlalchemy.orm import Session, selectinload
 
-from ..models import GrafikEntry, GrafikMiesieczny, Pracownik, Zmiana, Nieobecnosc, Holiday
+from ..models import Pracownik, Zmiana, Nieobecnosc, Holiday
+from ..services.absences import build_absence_map, load_absences, month_window
+from ..services.persistence import get_or_create_month_schedule, sync_schedule_entries
+from ..services.schedule_context import ScheduleContext
 from ..services.walidacja import validate_schedule
 
 
@@ -25,8 +28,15 @@ class GenerationError(Exception):
     """Raised when schedule generation is not possible."""
 
 
-def _fetch_context(session: Session, year: int, month: int) -> Tuple[List[Pracownik], List[Zmiana], List[Nieobecnosc], List[Holiday]]:
-    """Fetch all necessary data for schedule generation."""
+def _fetch_context(
+    session: Session,
+    year: int,
+    month: int,
+) -> Tuple[List[Pracownik], List[Zmiana], List[Nieobecnosc], List[Holiday]]:
+    """Fetch all necessary data for schedule generation.
+
+    Only absences overlapping the month are loaded.
+    """
     employees = (
         session.query(Pracownik)
         .options(selectinload(Pracownik.rola))
@@ -34,11 +44,10 @@ def _fetch_context(session: Session, year: int, month: int) -> Tuple[List[Pracow
         .all()
     )
     shifts = session.query(Zmiana).order_by(Zmiana.id).all()
-    absences = session.query(Nieobecnosc).all()
-    
+    absences = load_absences(session, *month_window(year, month))
+
     # Fetch holidays for the given month
     month_start = date(year, month, 1)
-    from calendar import monthrange
     last_day = monthrange(year, month)[1]
     month_end = date(year, month, last_day)
     holidays = (
@@ -52,40 +61,85 @@ def _fetch_context(session: Session, year: int, month: int) -> Tuple[List[Pracow
     return employees, shifts, absences, holidays
 
 
-def _group_employees_by_role(employees: Iterable[Pracownik]):
-    """Group employees into queues by their role."""
-    grouped: Dict[str, deque[Pracownik]] = defaultdict(deque)
-    for employee in employees:
-        if employee.rola:
-            grouped[employee.rola.nazwa_roli].append(employee)
-    return grouped
-
-
-def _build_absence_map(
-    absences: Iterable[Nieobecnosc],
+def _build_context(
+    employees: List[Pracownik],
+    shifts: List[Zmiana],
+    absences: List[Nieobecnosc],
+    holidays: List[Holiday],
     year: int,
     month: int,
-    last_day: int,
-):
-    """Build a map of dates to sets of absent employee IDs."""
-    absence_map: Dict[date, set[int]] = defaultdict(set)
-    month_start = date(year, month, 1)
-    month_end = date(year, month, last_day)
-    for absence in absences:
-        start_date = cast(Optional[date], getattr(absence, "data_od", None))
-        end_date = cast(Optional[date], getattr(absence, "data_do", None))
-        if start_date is None or end_date is None:
-            continue
-        start = max(start_date, month_start)
-        end = min(end_date, month_end)
-        current = start
-        employee_id = cast(Optional[int], getattr(absence, "pracownik_id", None))
-        if employee_id is None:
-            continue
-        while current <= end:
-            absence_map[current].add(employee_id)
-            current += timedelta(days=1)
-    return absence_map
+) -> ScheduleContext:
+    absence_map = build_absence_map(absences, *month_window(year, month))
+    return ScheduleContext.build(year, month, employees, shifts, absence_map, holidays)
+
+
+def _plan_assignments(
+    employees: List[Pracownik],
+    shifts: List[Zmiana],
+    context: ScheduleContext,
+) -> List[Tuple[Pracownik, date, Zmiana]]:
+    """Run the round-robin rotation and return (employee, date, shift) triples.
+
+    Demand, role membership and availability all come from ``context``: each
+    role keeps a rotation pointer over its members (``role_masks``) and skips
+    those ``available`` marks as absent for the day.
+    """
+    if not (context.employee_role >= 0).any():
+        raise GenerationError("Brak przypisanych ról do pracowników")
+
+    employees_by_position = {context.employee_index[cast(int, emp.id)]: emp for emp in employees if emp.id is not None}
+    shifts_by_position = {context.shift_index[cast(int, shift.id)]: shift for shift in shifts if shift.id is not None}
+    members = [np.flatnonzero(mask) for mask in context.role_masks]
+    rotation = [0] * len(context.role_names)
+    demand = context.demand()
+    available_by_role = context.available_by_role()
+
+    planned: List[Tuple[Pracownik, date, Zmiana]] = []
+    # Pomiń dni, kiedy sklep jest zamknięty (święta z store_closed=True)
+    for d_idx in np.flatnonzero(context.open_days):
+        current_date = context.dates[d_idx]
+        available_today = context.available[:, d_idx]
+        for s_idx, shift in shifts_by_position.items():
+            for r_idx in np.flatnonzero(demand[:, d_idx, s_idx]):
+                role_name = context.role_names[r_idx]
+                role_members = members[r_idx]
+                if not len(role_members):
+                    raise GenerationError(f"Brak pracowników dla roli {role_name}")
+                if not available_by_role[r_idx, d_idx]:
+                    raise GenerationError(
+                        f"Wszyscy pracownicy w roli {role_name} są niedostępni {current_date.isoformat()}"
+                    )
+                for _ in range(int(demand[r_idx, d_idx, s_idx])):
+                    # The next available member in rotation order; there is one (see above)
+                    offset = next(
+                        step
+                        for step in range(len(role_members))
+                        if available_today[role_members[(rotation[r_idx] + step) % len(role_members)]]
+                    )
+                    position = (rotation[r_idx] + offset) % len(role_members)
+                    planned.append((employees_by_position[int(role_members[position])], current_date, shift))
+                    rotation[r_idx] = (position + 1) % len(role_members)
+    return planned
+
+
+def plan_monthly_assignments(session: Session, year: int, month: int) -> List[Tuple[int, date, int]]:
+    """
+    Run the heuristic without persisting anything.
+
+    Used e.g. to warm-start the OR-Tools solver.
+
+    Returns:
+        List of (employee_id, date, shift_id) tuples
+
+    Raises:
+        GenerationError: If the heuristic cannot staff the month
+    """
+    employees, shifts, absences, holidays = _fetch_context(session, year, month)
+    context = _build_context(employees, shifts, absences, holidays, year, month)
+    return [
+        (cast(int, employee.id), current_date, cast(int, shift.id))
+        for employee, current_date, shift in _plan_assignments(employees, shifts, context)
+    ]
 
 
 def generate_monthly_schedule(session: Session, year: int, month: int):
@@ -104,113 +158,23 @@ def generate_monthly_schedule(session: Session, year: int, month: int):
         GenerationError: If generation fails due to insufficient resources
     """
     employees, shifts, absences, holidays = _fetch_context(session, year, month)
-    grouped = _group_employees_by_role(employees)
-
-    if not grouped:
-        raise GenerationError("Brak przypisanych ról do pracowników")
+    context = _build_context(employees, shifts, absences, holidays, year, month)
+    planned = _plan_assignments(employees, shifts, context)
 
-    last_day = monthrange(year, month)[1]
-    absence_map = _build_absence_map(absences, year, month, last_day)
-
-    # Zbuduj mapę świąt zamkniętych (store_closed=True), aby pominąć te dni w przydziałach
-    closed_holidays: Dict[date, bool] = {}
-    for h in holidays:
-        h_date = cast(Optional[date], getattr(h, "date", None))
-        if h_date is None:
-            continue
-        if bool(getattr(h, "store_closed", False)):
-            closed_holidays[h_date] = True
-    schedule = (
-        session.query(GrafikMiesieczny)
-        .filter(GrafikMiesieczny.miesiac_rok == f"{year:04d}-{month:02d}")
-        .one_or_none()
-    )
-    if schedule is None:
-        schedule = GrafikMiesieczny(
-            miesiac_rok=f"{year:04d}-{month:02d}",
-            status="roboczy",
-        )
-        session.add(schedule)
-        session.flush()
-    else:
-        session.query(GrafikEntry).filter(
-            GrafikEntry.grafik_miesieczny_id == schedule.id
-        ).delete()
-        session.flush()
-
-    created_entries: List[GrafikEntry] = []
+    schedule = get_or_create_month_schedule(session, year, month)
     schedule_id = cast(Optional[int], getattr(schedule, "id", None))
     if schedule_id is None:
         raise GenerationError("Brak identyfikatora grafiku do zapisania wpisów")
 
-    for day in range(1, last_day + 1):
-        current_date = date(year, month, day)
-        # Pomiń dni, kiedy sklep jest zamknięty
-        if closed_holidays.get(current_date):
-            continue
-        for shift in shifts:
-            raw_requirements = getattr(shift, "wymagana_obsada", None)
-            requirements: Dict[str, int]
-            if isinstance(raw_requirements, dict):
-                requirements = raw_requirements
-            elif raw_requirements:
-                requirements = dict(raw_requirements)
-            else:
-                requirements = {}
-
-            if len(requirements) == 0:
-                continue
-
-            absent_today = absence_map.get(current_date)
-            if absent_today is None:
-                absent_today = set()
-
-            for role_name, required_count in requirements.items():
-                available = grouped.get(role_name)
-                if not available:
-                    raise GenerationError(f"Brak pracowników dla roli {role_name}")
+    created_entries = sync_schedule_entries(
+        session,
+        schedule_id,
+        ((cast(int, employee.id), current_date, cast(int, shift.id)) for employee, current_date, shift in planned),
+        {cast(int, employee.id): employee for employee in employees},
+        {cast(int, shift.id): shift for shift in shifts},
+    ).entries
 
-                for _ in range(required_count):
-                    if not available:
-                        raise GenerationError(
-                            f"Niewystarczająca liczba pracowników dla roli {role_name}"
-                        )
-
-                    assigned = False
-                    for _ in range(len(available)):
-                        employee = available.popleft()
-                        employee_id = cast(Optional[int], getattr(employee, "id", None))
-                        if employee_id is None:
-                            continue
-                        if employee_id in absent_today:
-                            available.append(employee)
-                            continue
-
-                        shift_id = cast(Optional[int], getattr(shift, "id", None))
-                        if shift_id is None:
-                            available.append(employee)
-                            continue
-
-                        entry = GrafikEntry(
-                            grafik_miesieczny_id=schedule_id,
-                            pracownik_id=employee_id,
-                            data=current_date,
-                            zmiana_id=shift_id,
-                        )
-                        entry.pracownik = employee
-                        entry.zmiana = shift
-                        session.add(entry)
-                        created_entries.append(entry)
-                        available.append(employee)
-                        assigned = True
-                        break
-
-                    if not assigned:
-                        raise GenerationError(
-                            f"Wszyscy pracownicy w roli {role_name} są niedostępni {current_date.isoformat()}"
-                        )
-
-    issues = validate_schedule(created_entries, shifts, holidays)
+    issues = validate_schedule(created_entries, shifts, holidays, context=context)
     # For the heuristic generator, return only blocking issues to keep output concise
     # and align with legacy expectations in tests.
     blocking_issues = [issue for issue in issues if getattr(issue, "level", "") == "error"]
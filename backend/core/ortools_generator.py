@@ -7,11 +7,20 @@ to generate work schedules with full legal compliance and optimization.
 
 from __future__ import annotations
 
+import copy
+import multiprocessing
+import os
+import threading
 from calendar import monthrange
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from collections import defaultdict
-from datetime import date, datetime, timedelta, time
-from typing import Any, DefaultDict, Dict, List, Optional, Tuple, cast
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from time import perf_counter
+from typing import Any, Callable, DefaultDict, Dict, List, Optional, Tuple, cast
 
+import numpy as np
 from ortools.sat.python import cp_model
 from sqlalchemy import or_
 from sqlalchemy.orm import Session, selectinload
@@ -21,11 +30,20 @@ from ..models import (
     GrafikMiesieczny,
     Pracownik,
     Zmiana,
-    Nieobecnosc,
     Holiday,
     LaborLawRule,
     GeneratorParameter,
 )
+from .heuristic_generator import GenerationError as HeuristicGenerationError, plan_monthly_assignments
+from ..services.absences import build_absence_map, load_absences, month_window
+from ..services.horizon import load_boundary_entries, month_sequence
+from ..services.hour_limits import HourCaps, HourLimitLookup, employee_etat
+from ..services.capacity import CapacityReport, analyze_capacity
+from ..services.persistence import get_or_create_month_schedule, sync_schedule_entries
+from ..services.preferences import EmployeePreferences, preference_index
+from ..services.schedule_context import ScheduleContext
+from ..services.shift_rules import ShiftRestMatrix, is_night_shift, resolve_min_rest_hours
+from ..services.staffing import StaffingBounds, day_type_calendar, load_staffing_templates, resolve_staffing
 from ..services.walidacja import validate_schedule
 
 
@@ -33,6 +51,151 @@ class GenerationError(Exception):
     """Raised when schedule generation is not possible."""
 
 
+class InfeasibleScheduleError(GenerationError):
+    """Raised when diagnosis found the constraint groups that conflict."""
+
+    def __init__(self, message: str, causes: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.causes = causes
+
+
+class CapacityError(GenerationError):
+    """Raised when prevalidation finds staffing deficits."""
+
+    def __init__(self, message: str, report: CapacityReport):
+        super().__init__(message)
+        self.report = report
+
+
+class GenerationCancelled(GenerationError):
+    """Raised when a running generation was cancelled by the caller."""
+
+
+class _SolutionCallback(cp_model.CpSolverSolutionCallback):
+    """Hand every improving CP-SAT solution to the generator."""
+
+    def __init__(self, handler: Callable[["_SolutionCallback"], None]):
+        super().__init__()
+        self._handler = handler
+        self.solution_count = 0
+
+    def on_solution_callback(self) -> None:
+        self.solution_count += 1
+        self._handler(self)
+
+
+DEFAULT_TIME_LIMIT_SECONDS = 60.0
+WARM_START_SOURCES = ("previous_month", "heuristic", "current")
+# Soft coverage penalties per missing / surplus person on a slot
+DEFAULT_UNDERSTAFFING_WEIGHT = 1000
+DEFAULT_OVERSTAFFING_WEIGHT = 100
+DEFAULT_TARGET_STAFFING_WEIGHT = 20
+# Fairness formulations selectable with weights["fairness_mode"] (a name or a list)
+FAIRNESS_MODES = ("deviation", "spread", "hours", "weekend_night")
+DEFAULT_FAIRNESS_MODE = "deviation"
+# Hundredths of a day: resolution of availability-normalized shift counts in "spread" mode
+SPREAD_SCALE = 100
+# Penalty per violated employee preference (weights["preferencje"])
+DEFAULT_PREFERENCE_WEIGHT = 5
+# Processes solving role components in parallel; 0 means one per CPU
+DECOMPOSITION_WORKERS = int(os.getenv("DECOMPOSITION_WORKERS", "0"))
+# Below this many candidate assignments, starting a process pool costs more than it saves
+DECOMPOSITION_MIN_VARIABLES = int(os.getenv("DECOMPOSITION_MIN_VARIABLES", "5000"))
+
+
+@dataclass
+class SolverSettings:
+    """CP-SAT search profile resolved from a scenario's ``GeneratorParameter``.
+
+    ``None`` leaves the corresponding CP-SAT parameter at its default
+    (e.g. ``num_workers`` = all available cores).
+    """
+
+    num_search_workers: Optional[int] = None
+    max_time_in_seconds: float = DEFAULT_TIME_LIMIT_SECONDS
+    relative_gap_limit: Optional[float] = None
+    random_seed: Optional[int] = None
+    use_hints: bool = False
+
+    @classmethod
+    def from_parameters(cls, params: Optional[GeneratorParameter]) -> "SolverSettings":
+        if params is None:
+            return cls()
+        workers = cast(Optional[int], getattr(params, "num_search_workers", None))
+        time_limit = cast(Optional[float], getattr(params, "max_time_in_seconds", None))
+        gap = cast(Optional[float], getattr(params, "relative_gap_limit", None))
+        seed = cast(Optional[int], getattr(params, "random_seed", None))
+        return cls(
+            num_search_workers=int(workers) if workers else None,
+            max_time_in_seconds=float(time_limit) if time_limit else DEFAULT_TIME_LIMIT_SECONDS,
+            relative_gap_limit=float(gap) if gap is not None else None,
+            random_seed=int(seed) if seed is not None else None,
+            use_hints=bool(getattr(params, "use_hints", False)),
+        )
+
+    def apply(self, solver: cp_model.CpSolver) -> None:
+        """Copy the profile onto ``solver.parameters``."""
+        solver.parameters.max_time_in_seconds = self.max_time_in_seconds
+        if self.num_search_workers is not None:
+            solver.parameters.num_workers = self.num_search_workers
+        if self.relative_gap_limit is not None:
+            solver.parameters.relative_gap_limit = self.relative_gap_limit
+        if self.random_seed is not None:
+            solver.parameters.random_seed = self.random_seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _slot_order(slot: Dict[str, Any]) -> Tuple[str, int, str]:
+    return slot["date"], slot["shift_id"], slot["role"]
+
+
+# Set in each pool process by _init_component_worker; the parent sets it to stop running solves
+_component_stop_event: Optional[Any] = None
+
+
+def _init_component_worker(stop_event: Any) -> None:
+    global _component_stop_event
+    _component_stop_event = stop_event
+
+
+def _solve_component_model(model_text: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Process-pool entry point: solve one component model sent as a text-format proto."""
+    model = cp_model.CpModel()
+    model.Proto().parse_text_format(model_text)
+    solver = cp_model.CpSolver()
+    SolverSettings(**settings).apply(solver)
+    stop_event = _component_stop_event
+    if stop_event is None:
+        status = solver.Solve(model)
+    else:
+        solve_finished = threading.Event()
+
+        def stop_on_request():
+            while not solve_finished.wait(0.1):
+                if stop_event.is_set():
+                    solver.StopSearch()
+                    return
+
+        watcher = threading.Thread(target=stop_on_request, daemon=True)
+        watcher.start()
+        try:
+            status = solver.Solve(model)
+        finally:
+            solve_finished.set()
+            watcher.join()
+    solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    return {
+        # Status enums do not cross process boundaries; names map back via cp_model
+        "status": solver.StatusName(status),
+        "solution": list(solver.ResponseProto().solution) if solved else [],
+        "wall_time_s": round(solver.WallTime(), 3),
+        "objective": solver.ObjectiveValue() if solved else None,
+        "best_bound": solver.BestObjectiveBound() if solved else None,
+    }
+
+
 class OrToolsGenerator:
     """
     Constraint Programming generator using Google OR-Tools CP-SAT solver.
@@ -47,6 +210,15 @@ class OrToolsGenerator:
         year: int,
         month: int,
         scenario_type: str = "DEFAULT",
+        warm_start: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        solution_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        diagnose: bool = False,
+        soft_coverage: Optional[bool] = None,
+        rolling_horizon: bool = False,
+        hour_budget_minutes: Optional[Dict[int, int]] = None,
+        decompose: Optional[bool] = None,
     ):
         """
         Initialize OR-Tools generator.
@@ -56,23 +228,106 @@ class OrToolsGenerator:
             year: Year of the schedule
             month: Month of the schedule (1-12)
             scenario_type: Generator profile (DEFAULT, NIGHT_FOCUS, PEAK_SEASON, etc.)
+            warm_start: Solution hint source: "previous_month", "heuristic" or
+                "current" (the schedule already stored for this month). When
+                omitted, "current" is used if the scenario enables ``use_hints``.
+            progress_callback: Called with ``{"phase": ...}`` when a step starts
+                ("model", "solving", "persisting", "validating") and with
+                solver progress (solution count, objective, bound, elapsed
+                time) for every improving solution
+            solution_callback: Called for every improving solution like
+                ``progress_callback``, with the solution's ``entries`` added,
+                for streaming to clients
+            cancel_event: When set, the solve stops and ``GenerationCancelled``
+                is raised instead of saving a schedule
+            diagnose: When the solve ends INFEASIBLE (or without any solution),
+                re-solve with assumption literals and raise
+                ``InfeasibleScheduleError`` listing the conflicting rules
+            soft_coverage: Model under- and overstaffing as penalized slack
+                instead of exact coverage, so a (best-effort) schedule is always
+                returned together with ``uncovered_slots``. Defaults to the
+                scenario's ``weights["soft_coverage"]``.
+            rolling_horizon: Load the stored entries of the days just before the
+                month as fixed context, so daily and weekly rest also hold
+                across the month boundary
+            hour_budget_minutes: Per-employee cap on minutes worked this month,
+                applied on top of ``limit_godzin_miesieczny`` (e.g. what is left
+                of a quarterly limit)
+            decompose: Solve each role's employees as a separate CP-SAT model
+                in a process pool and merge the results. Roles never share a
+                constraint, so this gives the same schedules as one model.
+                Progress is then reported once, when all components are done.
+                Defaults to the scenario's ``weights["decompose"]``.
         """
+        if warm_start is not None and warm_start not in WARM_START_SOURCES:
+            raise GenerationError(f"Nieznane źródło rozwiązania startowego: {warm_start}")
+        # Measured like the API's runtime_ms, i.e. including data loading
+        self.generation_started = perf_counter()
         self.session = session
         self.year = year
         self.month = month
         self.scenario_type = scenario_type
+        self.warm_start = warm_start
+        self.progress_callback = progress_callback
+        self.solution_callback = solution_callback
+        self.cancel_event = cancel_event
+        self.diagnose = diagnose
+        self.rolling_horizon = rolling_horizon
+        self.hour_budget_minutes = dict(hour_budget_minutes or {})
+        # Only set while building the diagnosis model: constraint group -> literal
+        self.assumption_literals: Optional[Dict[Tuple[Any, ...], cp_model.IntVar]] = None
         
         # Calculate month boundaries
         self.last_day = monthrange(year, month)[1]
         self.month_start = date(year, month, 1)
         self.month_end = date(year, month, self.last_day)
-        
+        self.absence_window = month_window(year, month)
+
         # Fetch data
         self._load_data()
         
+        self.weights = self._objective_weights()
+        if soft_coverage is None:
+            soft_coverage = bool(self.weights.get("soft_coverage", False))
+        self.soft_coverage = soft_coverage
+        if decompose is None:
+            decompose = bool(self.weights.get("decompose", False))
+        self.decompose = decompose
+        raw_modes = self.weights.get("fairness_mode", DEFAULT_FAIRNESS_MODE)
+        self.fairness_modes: List[str] = [raw_modes] if isinstance(raw_modes, str) else list(raw_modes or [])
+        unknown = [mode for mode in self.fairness_modes if mode not in FAIRNESS_MODES]
+        if unknown:
+            raise GenerationError(
+                f"Nieznany tryb sprawiedliwości: {', '.join(map(str, unknown))} "
+                f"(dostępne: {', '.join(FAIRNESS_MODES)})"
+            )
+        # Interchangeable employees are ordered unless a warm start pins one permutation
+        self.symmetry_breaking = bool(self.weights.get("symmetry_breaking", True))
+        self.symmetry_stats: Dict[str, int] = {}
+
         # OR-Tools model
         self.model = cp_model.CpModel()
         self.solver = cp_model.CpSolver()
+        self.solver_settings = SolverSettings.from_parameters(self.params)
+        self.solve_stats: Dict[str, Any] = {}
+        self.hint_keys: set[Tuple[int, int, int]] = set()
+        self.hint_stats: Dict[str, Any] = {}
+        self.persist_stats: Dict[str, int] = {}
+        self.capacity_report: Optional[CapacityReport] = None
+        self.diagnosis_stats: Dict[str, Any] = {}
+        # (role, day, shift_id) -> (understaffing, overstaffing, bounds) in soft coverage mode
+        self.coverage_slack: Dict[Tuple[str, int, int], Tuple[Any, Any, StaffingBounds]] = {}
+        # (role, day, shift_id) -> (below target, above target) for slots with min < max
+        self.target_deviation: Dict[Tuple[str, int, int], Tuple[Any, Any]] = {}
+        self.uncovered_slots: List[Dict[str, Any]] = []
+        self.overstaffed_slots: List[Dict[str, Any]] = []
+        self.time_to_first_feasible_ms: Optional[int] = None
+        # Set when the solution comes from a component solved in another process
+        self.solution_values: Optional[List[int]] = None
+        self.solved_assignments: List[Tuple[int, date, int]] = []
+        # One 0/1 (or count) variable per violated preference; filled by _preference_terms
+        self.preference_penalties: List[Any] = []
+        self.preference_stats: Dict[str, int] = {}
         
         # Decision variables
         self.assignments: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
@@ -90,8 +345,8 @@ class OrToolsGenerator:
         # Shifts
         self.shifts = self.session.query(Zmiana).order_by(Zmiana.id).all()
         
-        # Absences
-        self.absences = self.session.query(Nieobecnosc).all()
+        # Absences overlapping the month
+        self.absences = load_absences(self.session, *self.absence_window)
         
         # Holidays
         self.holidays = (
@@ -103,6 +358,17 @@ class OrToolsGenerator:
             .all()
         )
         
+        # Previous month's tail, fixed context for rest across the boundary
+        self.boundary_entries = (
+            load_boundary_entries(self.session, self.month_start) if self.rolling_horizon else []
+        )
+
+        # Daily/weekly/monthly caps by etat
+        self.hour_limits = HourLimitLookup.load(self.session)
+
+        # Min/target/max staffing templates effective during the month
+        self.staffing_templates = load_staffing_templates(self.session, self.month_start, self.month_end)
+
         # Labor law rules (active only)
         self.rules = (
             self.session.query(LaborLawRule)
@@ -143,76 +409,41 @@ class OrToolsGenerator:
         # Build holiday map
         self._build_holiday_map()
 
+        # Plain lookup tables used by the model builders
+        self._build_input_index()
+
+    def analyze_capacity(self) -> CapacityReport:
+        """Vectorized staffing capacity analysis; no CP model is built."""
+        return analyze_capacity(
+            self.context,
+            one_shift_per_day=self.rest_matrix.is_same_day_clique(self.shift_ids),
+            shift_names=self.shift_names,
+        )
+
     def _prevalidate_feasibility(self) -> None:
         """Quick feasibility checks before building the CP model.
 
         Raises:
-            GenerationError: when obvious staffing deficits make the model infeasible.
+            CapacityError: when staffing deficits make the model infeasible;
+                the structured report is attached as ``report``.
         """
-        problems = []
-        # Precompute employees per role
-        employees_by_role: DefaultDict[str, List[Any]] = defaultdict(list)
-        for emp in self.employees:
-            role = getattr(emp, "rola", None)
-            role_name = getattr(role, "nazwa_roli", "") if role else ""
-            if role_name:
-                employees_by_role[role_name].append(emp)
-
-        for day in range(1, self.last_day + 1):
-            current_date = date(self.year, self.month, day)
-
-            # Skip closed store days
-            holiday = self.holiday_map.get(current_date)
-            if holiday is not None and bool(getattr(holiday, "store_closed", False)):
-                continue
-
-            # Build absent set for the day
-            absent_today = self.absence_map.get(current_date, set())
-
-            for shift in self.shifts:
-                raw_requirements = getattr(shift, "wymagana_obsada", None)
-                if isinstance(raw_requirements, dict):
-                    requirements = raw_requirements
-                elif raw_requirements:
-                    requirements = dict(raw_requirements)
-                else:
-                    requirements = {}
-
-                for role_name, required_count in requirements.items():
-                    pool = employees_by_role.get(role_name, [])
-                    # Available employees for this role on this day (not absent)
-                    available = [e for e in pool if getattr(e, "id", None) not in absent_today]
-                    if len(available) < int(required_count):
-                        problems.append(
-                            f"{current_date.isoformat()} '{getattr(shift, 'nazwa_zmiany', '?')}' — rola {role_name}: "
-                            f"wymagane {int(required_count)}, dostępne {len(available)}"
-                        )
-
-        if problems:
+        report = self.analyze_capacity()
+        self.capacity_report = report
+        # Soft coverage turns deficits into uncovered slots instead of failing
+        if not report.feasible and not self.soft_coverage:
+            problems = report.messages()
             summary = problems[:5]
             more = f" (… +{len(problems) - 5} więcej)" if len(problems) > 5 else ""
-            raise GenerationError(
+            raise CapacityError(
                 "Braki w obsadzie uniemożliwiają wygenerowanie grafiku metodą OR-Tools.\n"
-                + "\n".join(summary) + more
+                + "\n".join(summary) + more,
+                report,
             )
-        
+
     def _build_absence_map(self):
         """Build a map of dates to sets of absent employee IDs."""
-        self.absence_map: Dict[date, set[int]] = defaultdict(set)
-        for absence in self.absences:
-            start_date = cast(Optional[date], getattr(absence, "data_od", None))
-            end_date = cast(Optional[date], getattr(absence, "data_do", None))
-            employee_id = cast(Optional[int], getattr(absence, "pracownik_id", None))
-            if start_date is None or end_date is None or employee_id is None:
-                continue
+        self.absence_map: Dict[date, set[int]] = build_absence_map(self.absences, *self.absence_window)
 
-            start = max(start_date, self.month_start)
-            end = min(end_date, self.month_end)
-            current = start
-            while current <= end:
-                self.absence_map[current].add(employee_id)
-                current += timedelta(days=1)
-                
     def _build_holiday_map(self):
         """Build a map of holiday dates."""
         self.holiday_map: Dict[date, Holiday] = {}
@@ -222,252 +453,1072 @@ class OrToolsGenerator:
                 continue
             self.holiday_map[holiday_date] = holiday
     
-    def _create_variables(self):
-        """Create decision variables for the CP-SAT model."""
-        # assignments[employee_id, day, shift_id] = 0/1
+    def _build_input_index(self):
+        """Flatten ORM rows into plain lookup tables.
+
+        Constraint builders only read these tables, so ``getattr``/``cast`` on
+        ORM objects happens once per row instead of once per model term.
+        """
+        self.days: List[int] = list(range(1, self.last_day + 1))
+
+        self.employee_ids: List[int] = []
+        self.employee_roles: Dict[int, str] = {}
+        self.employee_limits: Dict[int, int] = {}
+        self.employees_by_role: DefaultDict[str, List[int]] = defaultdict(list)
         for emp in self.employees:
             emp_id = cast(Optional[int], getattr(emp, "id", None))
             if emp_id is None:
                 continue
-            for day in range(1, self.last_day + 1):
-                current_date = date(self.year, self.month, day)
-                
-                # Skip if employee is absent
-                absent_today = self.absence_map.get(current_date)
-                if absent_today is not None and emp_id in absent_today:
-                    continue
-                    
-                for shift in self.shifts:
-                    shift_id = cast(Optional[int], getattr(shift, "id", None))
-                    if shift_id is None:
-                        continue
-                    var_name = f"e{emp_id}_d{day}_s{shift_id}"
-                    var = self.model.NewBoolVar(var_name)
-                    self.assignments[(emp_id, day, shift_id)] = var
-    
+            self.employee_ids.append(emp_id)
+            role = getattr(emp, "rola", None)
+            role_name = cast(str, getattr(role, "nazwa_roli", "") or "") if role else ""
+            if role_name:
+                self.employee_roles[emp_id] = role_name
+                self.employees_by_role[role_name].append(emp_id)
+            limit_raw = cast(Optional[int], getattr(emp, "limit_godzin_miesieczny", None))
+            self.employee_limits[emp_id] = limit_raw if limit_raw is not None else 160  # Default 160h
+
+        self.shift_ids: List[int] = []
+        self.shift_names: Dict[int, str] = {}
+        self.shift_requirements: Dict[int, Dict[str, int]] = {}
+        for shift in self.shifts:
+            shift_id = cast(Optional[int], getattr(shift, "id", None))
+            if shift_id is None:
+                continue
+            self.shift_ids.append(shift_id)
+            self.shift_names[shift_id] = cast(str, getattr(shift, "nazwa_zmiany", "?"))
+
+            raw_requirements = getattr(shift, "wymagana_obsada", None)
+            if isinstance(raw_requirements, dict):
+                requirements = raw_requirements
+            elif raw_requirements:
+                requirements = dict(raw_requirements)
+            else:
+                requirements = {}
+            self.shift_requirements[shift_id] = {
+                str(role_name): int(count) for role_name, count in requirements.items()
+            }
+
+        # Per-date staffing bounds: templates and holiday overrides, else wymagana_obsada
+        self.day_types = day_type_calendar(self.year, self.month, self.holidays)
+        self.staffing: Dict[Tuple[date, int, str], StaffingBounds] = resolve_staffing(
+            self.day_types, self.shift_requirements, self.staffing_templates, self.holidays
+        )
+
+        # Rest compatibility between shifts, computed once per run
+        self.min_rest_hours = resolve_min_rest_hours(self.rules)
+        self.rest_matrix = ShiftRestMatrix.build(self.shifts, self.min_rest_hours)
+        self.night_shift_ids: set[int] = {
+            shift_id
+            for shift_id, start in self.rest_matrix.start_minutes.items()
+            if is_night_shift(start, self.rest_matrix.end_minutes[shift_id])
+        }
+
+        # Compiled (cached) preferences of employees who have any
+        self.preferences: Dict[int, EmployeePreferences] = preference_index(self.employees)
+
+        # Dense availability / demand arrays shared with prevalidation and validation
+        self.context = ScheduleContext.build(
+            self.year, self.month, self.employees, self.shifts, self.absence_map, self.holidays,
+            staffing=self.staffing,
+        )
+
+        # Boundary shifts keyed by (employee, day), where day 0 is the previous month's last day
+        self.boundary_shifts: DefaultDict[Tuple[int, int], List[int]] = defaultdict(list)
+        known_employees = set(self.employee_ids)
+        for entry in self.boundary_entries:
+            emp_id = cast(int, entry.pracownik_id)
+            if emp_id in known_employees:
+                day = (cast(date, entry.data) - self.month_start).days + 1
+                self.boundary_shifts[(emp_id, day)].append(cast(int, entry.zmiana_id))
+
+        # HourLimit caps of each employee's etat; the monthly one tightens limit_godzin_miesieczny
+        self.hour_caps: Dict[int, HourCaps] = self.hour_limits.caps_by_employee(self.employees)
+        for emp_id, caps in self.hour_caps.items():
+            e_idx = self.context.employee_index.get(emp_id)
+            if e_idx is not None and caps.monthly_minutes is not None:
+                limit = self.context.monthly_limit_minutes[e_idx]
+                self.context.monthly_limit_minutes[e_idx] = min(int(limit), caps.monthly_minutes)
+
+        # Budgets tighten the monthly limit seen by prevalidation and the model
+        for emp_id, budget in self.hour_budget_minutes.items():
+            e_idx = self.context.employee_index.get(emp_id)
+            if e_idx is not None:
+                limit = self.context.monthly_limit_minutes[e_idx]
+                self.context.monthly_limit_minutes[e_idx] = max(0, min(int(limit), int(budget)))
+
+        # Days on which the store is closed get no variables at all
+        self.closed_days: set[int] = {int(idx) + 1 for idx in np.flatnonzero(~self.context.open_days)}
+
+    def _guard(self, constraint: Any, key: Tuple[Any, ...]) -> None:
+        """In diagnosis mode, enforce ``constraint`` only under the assumption literal of ``key``."""
+        if self.assumption_literals is None:
+            return
+        literal = self.assumption_literals.get(key)
+        if literal is None:
+            literal = self.model.NewBoolVar(f"assume_{len(self.assumption_literals)}")
+            self.assumption_literals[key] = literal
+        constraint.OnlyEnforceIf(literal)
+
+    def _add_at_most_one(self, literals: List[Any], key: Tuple[Any, ...]) -> None:
+        # AtMostOne takes no enforcement literal, so diagnosis uses the linear form
+        if self.assumption_literals is None:
+            self.model.AddAtMostOne(literals)
+        else:
+            self._guard(self.model.Add(sum(literals) <= 1), key)
+
+    def _create_variables(self):
+        """Create decision variables for the CP-SAT model.
+
+        Besides the flat ``assignments`` dict, variables are indexed by
+        (role, day, shift), (employee, day) and employee so that every
+        constraint family is emitted with a single pass over its index.
+        """
+        self.vars_by_slot: DefaultDict[Tuple[str, int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_employee_day: DefaultDict[Tuple[int, int], Dict[int, cp_model.IntVar]] = defaultdict(dict)
+        self.vars_by_employee: DefaultDict[int, List[Tuple[int, int, cp_model.IntVar]]] = defaultdict(list)
+
+        context = self.context
+        # assignments[employee_id, day, shift_id] = 0/1, only where the employee is available
+        for e_idx, d_idx, s_idx in np.argwhere(context.availability):
+            emp_id = context.employee_ids[e_idx]
+            day = int(d_idx) + 1
+            shift_id = context.shift_ids[s_idx]
+            var = self.model.NewBoolVar(f"e{emp_id}_d{day}_s{shift_id}")
+            self.assignments[(emp_id, day, shift_id)] = var
+            self.vars_by_employee_day[(emp_id, day)][shift_id] = var
+            self.vars_by_employee[emp_id].append((day, shift_id, var))
+            role_idx = context.employee_role[e_idx]
+            if role_idx >= 0:
+                self.vars_by_slot[(context.role_names[role_idx], day, shift_id)].append(var)
+
     def _add_coverage_constraints(self):
-        """Ensure each shift has required staff coverage."""
-        for day in range(1, self.last_day + 1):
-            current_date = date(self.year, self.month, day)
-            
-            # Check if store is closed on this holiday
-            holiday = self.holiday_map.get(current_date)
-            if holiday is not None:
-                is_closed = bool(getattr(holiday, "store_closed", False))
-                if is_closed:
-                    # No assignments on closed days
-                    for key, var in list(self.assignments.items()):
-                        _, assignment_day, _ = key
-                        if assignment_day == day:
-                            self.model.Add(var == 0)
-                    continue
-            
-            for shift in self.shifts:
-                shift_id = cast(Optional[int], getattr(shift, "id", None))
-                if shift_id is None:
+        """Keep each (day, shift, role) headcount within its staffing bounds.
+
+        Exact bounds (legacy ``wymagana_obsada``) become an equality; otherwise
+        ``min_staff``/``max_staff`` are bounds and ``target_staff`` is only
+        pursued through the objective. In soft coverage mode (never while
+        diagnosing) the bounds instead get understaffing/overstaffing slack
+        that the objective penalizes.
+        """
+        soft = self.soft_coverage and self.assumption_literals is None
+        for (slot_date, shift_id, role_name), bounds in self.staffing.items():
+            day = slot_date.day
+            # No variables exist on closed days, so there is nothing to cover
+            if day in self.closed_days:
+                continue
+            role_assignments = self.vars_by_slot.get((role_name, day, shift_id))
+            if soft:
+                self._add_soft_coverage(role_name, day, shift_id, bounds, role_assignments or [])
+            elif role_assignments:
+                key = ("coverage", day, shift_id, role_name)
+                if bounds.is_exact:
+                    self._guard(self.model.Add(sum(role_assignments) == bounds.min_staff), key)
                     continue
+                if bounds.min_staff > 0:
+                    self._guard(self.model.Add(sum(role_assignments) >= bounds.min_staff), key)
+                if bounds.max_staff is not None and bounds.max_staff < len(role_assignments):
+                    self._guard(self.model.Add(sum(role_assignments) <= bounds.max_staff), key)
+            if role_assignments and not bounds.is_exact and self.assumption_literals is None:
+                self._add_target_deviation(role_name, day, shift_id, bounds, role_assignments)
+
+    def _add_soft_coverage(
+        self, role_name: str, day: int, shift_id: int, bounds: StaffingBounds, role_assignments: List[Any]
+    ) -> None:
+        key = (role_name, day, shift_id)
+        suffix = f"{role_name}_d{day}_s{shift_id}"
+        under = self.model.NewIntVar(0, bounds.min_staff, f"under_{suffix}")
+        max_over = len(role_assignments) if bounds.max_staff is not None else 0
+        over = self.model.NewIntVar(0, max_over, f"over_{suffix}")
+        if bounds.is_exact:
+            self.model.Add(sum(role_assignments) + under - over == bounds.min_staff)
+        else:
+            self.model.Add(sum(role_assignments) + under >= bounds.min_staff)
+            if bounds.max_staff is not None:
+                self.model.Add(sum(role_assignments) - over <= bounds.max_staff)
+        self.coverage_slack[key] = (under, over, bounds)
+
+    def _add_target_deviation(
+        self, role_name: str, day: int, shift_id: int, bounds: StaffingBounds, role_assignments: List[Any]
+    ) -> None:
+        suffix = f"{role_name}_d{day}_s{shift_id}"
+        below = self.model.NewIntVar(0, bounds.target_staff, f"below_target_{suffix}")
+        above = self.model.NewIntVar(0, len(role_assignments), f"above_target_{suffix}")
+        self.model.Add(sum(role_assignments) + below - above == bounds.target_staff)
+        self.target_deviation[(role_name, day, shift_id)] = (below, above)
+
+    def _coverage_penalty_terms(self) -> List[Any]:
+        under_weight = int(self.weights.get("understaffing", DEFAULT_UNDERSTAFFING_WEIGHT))
+        over_weight = int(self.weights.get("overstaffing", DEFAULT_OVERSTAFFING_WEIGHT))
+        target_weight = int(self.weights.get("target_staffing", DEFAULT_TARGET_STAFFING_WEIGHT))
+        terms: List[Any] = []
+        for under, over, _ in self.coverage_slack.values():
+            terms.append(under_weight * under)
+            terms.append(over_weight * over)
+        for below, above in self.target_deviation.values():
+            terms.append(target_weight * below)
+            terms.append(target_weight * above)
+        return terms
+
+    def _record_coverage_slack(self) -> None:
+        """Fill ``uncovered_slots``/``overstaffed_slots`` from the solved slack."""
+        self.uncovered_slots = []
+        self.overstaffed_slots = []
+        for (role_name, day, shift_id), (under, over, bounds) in sorted(
+            self.coverage_slack.items(), key=lambda item: (item[0][1], item[0][2], item[0][0])
+        ):
+            missing = self._value(under)
+            surplus = self._value(over)
+            if not missing and not surplus:
+                continue
+            assigned = sum(self._value(var) for var in self.vars_by_slot.get((role_name, day, shift_id), []))
+            slot = {
+                "date": date(self.year, self.month, day).isoformat(),
+                "shift_id": shift_id,
+                "shift_name": self.shift_names[shift_id],
+                "role": role_name,
+                "required": bounds.min_staff,
+                "max_staff": bounds.max_staff,
+                "assigned": assigned,
+            }
+            if missing:
+                self.uncovered_slots.append({**slot, "missing": missing})
+            if surplus:
+                self.overstaffed_slots.append({**slot, "surplus": surplus})
 
-                raw_requirements = getattr(shift, "wymagana_obsada", None)
-                if isinstance(raw_requirements, dict):
-                    requirements = raw_requirements
-                elif raw_requirements:
-                    requirements = dict(raw_requirements)
-                else:
-                    requirements = {}
-                
-                for role_name, required_count in requirements.items():
-                    required_int = int(required_count)
-                    # Find employees with this role
-                    role_employees = [
-                        emp for emp in self.employees
-                        if emp.rola and emp.rola.nazwa_roli == role_name
-                    ]
-                    
-                    # Sum assignments for this role
-                    role_assignments = []
-                    for emp in role_employees:
-                        emp_id = cast(Optional[int], getattr(emp, "id", None))
-                        if emp_id is None:
-                            continue
-                        key = (emp_id, day, shift_id)
-                        if key in self.assignments:
-                            role_assignments.append(self.assignments[key])
-                    
-                    if len(role_assignments) > 0:
-                        # Require exactly the needed count
-                        self.model.Add(sum(role_assignments) == required_int)
-    
     def _add_daily_rest_constraints(self):
-        """Ensure minimum 11 hours rest between shifts."""
-        # Get minimum rest hours from rules or use default
-        min_rest_hours = 11
-        for rule in self.rules:
-            rule_code = getattr(rule, "code", "")
-            if rule_code.lower() in {"odpoczynek_dobowy", "rest_daily"}:
-                parameters = cast(Optional[Dict[str, Any]], getattr(rule, "parameters", None))
-                if parameters is not None:
-                    min_rest_hours = int(parameters.get("min_hours", min_rest_hours))
-                break
-        
-        for emp in self.employees:
-            emp_id = cast(Optional[int], getattr(emp, "id", None))
-            if emp_id is None:
+        """Ensure minimum rest (11 hours by default) between shifts.
+
+        Conflicts come from the run's ``ShiftRestMatrix``. Day-d shifts sharing
+        the same set of forbidden day-(d+1) shifts form one group; when both
+        sides of a group are mutually exclusive within a day, the whole group
+        becomes a single ``AtMostOne`` per employee-day boundary.
+        """
+        matrix = self.rest_matrix
+        groups: List[Tuple[List[int], List[int], bool]] = []
+        for today_ids, tomorrow_ids in matrix.next_day_conflict_groups():
+            aggregated = matrix.is_same_day_clique(today_ids) and matrix.is_same_day_clique(tomorrow_ids)
+            groups.append((today_ids, sorted(tomorrow_ids), aggregated))
+        same_day_pairs = sorted(matrix.same_day_conflicts)
+        all_exclusive = matrix.is_same_day_clique(self.shift_ids)
+
+        # Shifts worked on the previous month's last day forbid conflicting shifts on the 1st
+        for (emp_id, day), worked_ids in self.boundary_shifts.items():
+            first_day_vars = self.vars_by_employee_day.get((emp_id, 1)) if day == 0 else None
+            if not first_day_vars:
                 continue
-            for day in range(1, self.last_day):
-                # Check all shift combinations between consecutive days
-                for shift1 in self.shifts:
-                    for shift2 in self.shifts:
-                        shift1_id = cast(Optional[int], getattr(shift1, "id", None))
-                        shift2_id = cast(Optional[int], getattr(shift2, "id", None))
-                        if shift1_id is None or shift2_id is None:
-                            continue
-                        key1 = (emp_id, day, shift1_id)
-                        key2 = (emp_id, day + 1, shift2_id)
-                        
-                        if key1 not in self.assignments or key2 not in self.assignments:
-                            continue
-                        
-                        # Calculate time between shifts
-                        end_time_raw = cast(Optional[time], getattr(shift1, "godzina_zakonczenia", None))
-                        start_time_raw = cast(Optional[time], getattr(shift2, "godzina_rozpoczecia", None))
-                        if end_time_raw is None or start_time_raw is None:
-                            continue
-                        end_time1 = datetime.combine(date.today(), end_time_raw)
-                        start_time2 = datetime.combine(date.today(), start_time_raw)
-                        
-                        # Handle overnight shifts
-                        if end_time_raw > start_time_raw:
-                            start_time2 += timedelta(days=1)
-                        
-                        hours_between = (start_time2 - end_time1).total_seconds() / 3600
-                        
-                        # If rest period is too short, don't allow both shifts
-                        if hours_between < min_rest_hours:
-                            self.model.Add(
-                                self.assignments[key1] + self.assignments[key2] <= 1
-                            )
+            forbidden = {
+                next_id
+                for shift_id in worked_ids
+                for next_id in matrix.next_day_conflicts.get(shift_id, frozenset())
+            }
+            for shift_id in sorted(forbidden):
+                if shift_id in first_day_vars:
+                    self._guard(self.model.Add(first_day_vars[shift_id] == 0), ("daily_rest", emp_id))
+
+        for (emp_id, day), today_vars in self.vars_by_employee_day.items():
+            group = ("daily_rest", emp_id)
+            # Rest between two shifts on the same day
+            if all_exclusive:
+                if len(today_vars) > 1:
+                    self._add_at_most_one(list(today_vars.values()), group)
+            else:
+                for first_id, second_id in same_day_pairs:
+                    if first_id in today_vars and second_id in today_vars:
+                        self._guard(self.model.Add(today_vars[first_id] + today_vars[second_id] <= 1), group)
+
+            tomorrow_vars = self.vars_by_employee_day.get((emp_id, day + 1))
+            if not tomorrow_vars:
+                continue
+            for today_ids, tomorrow_ids, aggregated in groups:
+                first = [today_vars[shift_id] for shift_id in today_ids if shift_id in today_vars]
+                second = [tomorrow_vars[shift_id] for shift_id in tomorrow_ids if shift_id in tomorrow_vars]
+                if not first or not second:
+                    continue
+                if aggregated:
+                    self._add_at_most_one(first + second, group)
+                else:
+                    for var1 in first:
+                        for var2 in second:
+                            self._guard(self.model.Add(var1 + var2 <= 1), group)
     
-    def _add_weekly_rest_constraints(self):
-        """Ensure at least one day off per week."""
-        for emp in self.employees:
-            emp_id = cast(Optional[int], getattr(emp, "id", None))
-            if emp_id is None:
+    def _create_works_day_variables(self):
+        """Create one "works on day" term per (employee, day).
+
+        These are shared by the weekly rest windows, the fairness objective and
+        any other rule that reasons about whole working days.
+        """
+        self.works_day: Dict[Tuple[int, int], Any] = {}
+        # When daily rest already allows at most one shift per day, the day's
+        # assignments sum to 0/1 and can be used directly without a new literal
+        single_shift_days = self.rest_matrix.is_same_day_clique(self.shift_ids)
+        for (emp_id, day), day_vars in self.vars_by_employee_day.items():
+            if single_shift_days or len(day_vars) == 1:
+                self.works_day[(emp_id, day)] = cp_model.LinearExpr.Sum(list(day_vars.values()))
                 continue
+            works_day = self.model.NewBoolVar(f"e{emp_id}_works_d{day}")
+            self.model.AddMaxEquality(works_day, list(day_vars.values()))
+            self.works_day[(emp_id, day)] = works_day
+
+    def _add_weekly_rest_constraints(self):
+        """Ensure at least one day off per week.
+
+        In rolling-horizon mode windows also start in the previous month's
+        tail, whose worked days count as fixed.
+        """
+        first_start = min((day for _, day in self.boundary_shifts), default=1)
+        for emp_id in self.employee_ids:
             # Check 7-day windows
-            for start_day in range(1, self.last_day - 5):
+            for start_day in range(first_start, self.last_day - 5):
                 # For each 7-day window, employee must have at least one day with no shifts
-                window_assignments = []
-                
-                for day in range(start_day, start_day + 7):
-                    if day > self.last_day:
-                        break
-                    
-                    # Check if employee works any shift this day
-                    day_vars = []
-                    for shift in self.shifts:
-                        shift_id = cast(Optional[int], getattr(shift, "id", None))
-                        if shift_id is None:
-                            continue
-                        key = (emp_id, day, shift_id)
-                        if key in self.assignments:
-                            day_vars.append(self.assignments[key])
-                    
-                    if day_vars:
-                        # Create a variable for "works this day"
-                        works_day = self.model.NewBoolVar(f"e{emp_id}_works_d{day}")
-                        self.model.AddMaxEquality(works_day, day_vars)
-                        window_assignments.append(works_day)
-                
+                fixed_days = sum(
+                    1 for day in range(start_day, min(start_day + 7, 1)) if (emp_id, day) in self.boundary_shifts
+                )
+                window_assignments = [
+                    self.works_day[(emp_id, day)]
+                    for day in range(max(start_day, 1), start_day + 7)
+                    if (emp_id, day) in self.works_day
+                ]
                 # Ensure at least one day off (at most 6 working days)
-                if window_assignments:
-                    self.model.Add(sum(window_assignments) <= 6)
+                if window_assignments and len(window_assignments) + fixed_days > 6:
+                    self._guard(
+                        self.model.Add(sum(window_assignments) <= 6 - fixed_days), ("weekly_rest", emp_id)
+                    )
     
+    def _shift_duration_minutes(self) -> Dict[int, int]:
+        """Paid shift minutes keyed by shift id (overnight shifts and breaks included)."""
+        return dict(zip(self.context.shift_ids, self.context.shift_minutes.tolist()))
+
     def _add_monthly_hours_constraints(self):
-        """Ensure monthly working hours don't exceed limits."""
-        for emp in self.employees:
-            emp_id = cast(Optional[int], getattr(emp, "id", None))
-            if emp_id is None:
-                continue
-            limit_raw = cast(Optional[int], getattr(emp, "limit_godzin_miesieczny", None))
-            limit = limit_raw if limit_raw is not None else 160  # Default 160h
-            
-            total_hours = []
-            for day in range(1, self.last_day + 1):
-                for shift in self.shifts:
-                    shift_id = cast(Optional[int], getattr(shift, "id", None))
-                    if shift_id is None:
-                        continue
-                    key = (emp_id, day, shift_id)
-                    if key not in self.assignments:
-                        continue
-                    
-                    # Calculate shift duration in hours
-                    start_time = cast(Optional[time], getattr(shift, "godzina_rozpoczecia", None))
-                    end_time = cast(Optional[time], getattr(shift, "godzina_zakonczenia", None))
-                    if start_time is None or end_time is None:
-                        continue
-                    duration = (
-                        datetime.combine(date.today(), end_time)
-                        - datetime.combine(date.today(), start_time)
-                    ).total_seconds() / 3600
-                    
-                    # Add weighted by assignment variable
-                    total_hours.append(int(duration * 10) * self.assignments[key])
-            
-            if total_hours:
-                self.model.Add(sum(total_hours) <= limit * 10)
+        """Ensure monthly working minutes don't exceed limits (and hour budgets).
+
+        Coefficients are exact integer minutes, so no rounding loosens or
+        tightens the limit.
+        """
+        durations = self._shift_duration_minutes()
+        limit_minutes = dict(zip(self.context.employee_ids, self.context.monthly_limit_minutes.tolist()))
+        for emp_id, emp_vars in self.vars_by_employee.items():
+            total_minutes = [
+                durations[shift_id] * var
+                for _, shift_id, var in emp_vars
+                if durations.get(shift_id)
+            ]
+            if total_minutes:
+                self._guard(
+                    self.model.Add(sum(total_minutes) <= limit_minutes[emp_id]),
+                    ("monthly_hours", emp_id),
+                )
     
-    def _add_objective(self):
-        """Add optimization objective to balance workload."""
-        weights: Dict[str, Any] = {}
+    def _add_daily_hours_constraints(self):
+        """Cap the minutes worked per day at the ``max_dziennie`` of the employee's etat.
+
+        Shifts longer than the cap are fixed to 0; the linear cap is only
+        emitted where the remaining shifts of a day could still exceed it.
+        """
+        durations = self._shift_duration_minutes()
+        for (emp_id, day), day_vars in self.vars_by_employee_day.items():
+            caps = self.hour_caps.get(emp_id)
+            cap = caps.daily_minutes if caps is not None else None
+            if cap is None:
+                continue
+            group = ("daily_hours", emp_id)
+            allowed: List[Tuple[int, Any]] = []
+            for shift_id, var in day_vars.items():
+                minutes = durations.get(shift_id, 0)
+                if minutes > cap:
+                    self._guard(self.model.Add(var == 0), group)
+                elif minutes:
+                    allowed.append((minutes, var))
+            if sum(minutes for minutes, _ in allowed) > cap:
+                self._guard(self.model.Add(sum(minutes * var for minutes, var in allowed) <= cap), group)
+
+    def _add_weekly_hours_constraints(self):
+        """Cap the minutes worked per ISO week at the ``max_tygodniowo`` of the employee's etat.
+
+        Weeks are cut at the month boundary; in rolling-horizon mode the
+        previous month's shifts in the first week count as already worked.
+        """
+        durations = self._shift_duration_minutes()
+        weeks: DefaultDict[Tuple[int, int], List[int]] = defaultdict(list)
+        for day in self.days:
+            weeks[date(self.year, self.month, day).isocalendar()[:2]].append(day)
+        first_week = self.month_start.isocalendar()[:2]
+        boundary_minutes: DefaultDict[int, int] = defaultdict(int)
+        for (emp_id, day), shift_ids in self.boundary_shifts.items():
+            if (self.month_start + timedelta(days=day - 1)).isocalendar()[:2] == first_week:
+                boundary_minutes[emp_id] += sum(durations.get(shift_id, 0) for shift_id in shift_ids)
+
+        for emp_id in self.employee_ids:
+            caps = self.hour_caps.get(emp_id)
+            cap = caps.weekly_minutes if caps is not None else None
+            if cap is None:
+                continue
+            for week, week_days in weeks.items():
+                terms = [
+                    durations.get(shift_id, 0) * var
+                    for day in week_days
+                    for shift_id, var in self.vars_by_employee_day.get((emp_id, day), {}).items()
+                    if durations.get(shift_id, 0)
+                ]
+                if terms:
+                    worked = boundary_minutes[emp_id] if week == first_week else 0
+                    self._guard(
+                        self.model.Add(sum(terms) <= max(0, cap - worked)), ("weekly_hours", emp_id)
+                    )
+
+    def _equivalence_classes(self) -> List[List[int]]:
+        """Groups of two or more employees that every constraint treats identically.
+
+        Employees are interchangeable when they share role, etat caps,
+        monthly limit, availability (i.e. absences), previous-month tail and
+        preferences; any permutation of their rosters is then equally good.
+        """
+        context = self.context
+        boundary: DefaultDict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for (emp_id, day), shift_ids in self.boundary_shifts.items():
+            boundary[emp_id].extend((day, shift_id) for shift_id in shift_ids)
+        # Etat scales the "hours" fairness target, so it tells employees apart like an hour cap
+        etats = {cast(int, emp.id): employee_etat(emp) for emp in self.employees}
+        classes: DefaultDict[Tuple[Any, ...], List[int]] = defaultdict(list)
+        for emp_id in self.employee_ids:
+            e_idx = context.employee_index[emp_id]
+            key = (
+                int(context.employee_role[e_idx]),
+                etats.get(emp_id),
+                self.hour_caps.get(emp_id),
+                int(context.monthly_limit_minutes[e_idx]),
+                context.availability[e_idx].tobytes(),
+                tuple(sorted(boundary[emp_id])),
+                self.preferences.get(emp_id),
+            )
+            classes[key].append(emp_id)
+        return [members for members in classes.values() if len(members) > 1]
+
+    def _add_symmetry_breaking(self) -> None:
+        """Order interchangeable employees by their number of shifts.
+
+        Within each equivalence class, every employee works at least as many
+        shifts as the next one, so CP-SAT does not explore permutations of
+        the same roster. Skipped when a warm start is applied, since a
+        hinted roster usually violates the chosen order.
+        """
+        self.symmetry_stats = {}
+        if not self.symmetry_breaking or self.warm_start is not None or self.solver_settings.use_hints:
+            return
+        classes = self._equivalence_classes()
+        for members in classes:
+            counts = [sum(var for _, _, var in self.vars_by_employee.get(emp_id, [])) for emp_id in members]
+            for earlier, later in zip(counts, counts[1:]):
+                self.model.Add(earlier >= later)
+        self.symmetry_stats = {
+            "classes": len(classes),
+            "employees": sum(len(members) for members in classes),
+        }
+
+    def _objective_weights(self) -> Dict[str, Any]:
         if self.params is not None:
             raw_weights = getattr(self.params, "weights", None)
             if isinstance(raw_weights, dict):
-                weights = raw_weights
-        
-        # Default weights
-        fairness_weight = weights.get("fairness", 10)
-        # preference_weight currently unused but reserved for future soft constraints
+                return raw_weights
+        return {}
+
+    def _add_objective(self):
+        """Add optimization objective: fairness, coverage slack and preferences."""
+        fairness_weight = int(self.weights.get("fairness", 10))
 
         objective_terms = []
-        
-        # Fairness: minimize difference in total shifts per employee
-        shifts_per_emp = {}
-        for emp in self.employees:
-            emp_id = cast(Optional[int], getattr(emp, "id", None))
-            if emp_id is None:
-                continue
-            emp_shifts = []
-            for day in range(1, self.last_day + 1):
-                for shift in self.shifts:
-                    shift_id = cast(Optional[int], getattr(shift, "id", None))
-                    if shift_id is None:
-                        continue
-                    key = (emp_id, day, shift_id)
-                    if key in self.assignments:
-                        emp_shifts.append(self.assignments[key])
-            
-            if emp_shifts:
-                shifts_count = self.model.NewIntVar(0, len(emp_shifts), f"shifts_e{emp_id}")
-                self.model.Add(shifts_count == sum(emp_shifts))
-                shifts_per_emp[emp_id] = shifts_count
-        
-        # Add penalty for deviation from average
-        if shifts_per_emp:
-            assignment_slots: DefaultDict[int, int] = defaultdict(int)
-            for emp_id_key, _, _ in self.assignments:
-                assignment_slots[emp_id_key] += 1
-            avg_shifts = sum(assignment_slots.values()) // max(1, len(assignment_slots))
-            
-            for emp_id, count in shifts_per_emp.items():
-                deviation = self.model.NewIntVar(0, 100, f"dev_e{emp_id}")
-                self.model.AddAbsEquality(deviation, count - avg_shifts)
-                objective_terms.append(fairness_weight * deviation)
-        
+        if fairness_weight > 0:
+            for mode in self.fairness_modes:
+                objective_terms.extend(fairness_weight * term for term in self._fairness_terms(mode))
+
+        # Soft coverage slack
+        objective_terms.extend(self._coverage_penalty_terms())
+
+        # Employee preferences
+        objective_terms.extend(self._preference_terms())
+
         # Minimize total objective
         if objective_terms:
             self.model.Minimize(sum(objective_terms))
-    
+
+    def _fairness_groups(self) -> List[List[int]]:
+        """Employees compared with each other: one group per role, plus those without a role."""
+        groups: DefaultDict[str, List[int]] = defaultdict(list)
+        for emp_id in self.employee_ids:
+            if self.vars_by_employee.get(emp_id):
+                groups[self.employee_roles.get(emp_id, "")].append(emp_id)
+        return list(groups.values())
+
+    def _fairness_terms(self, mode: str) -> List[Any]:
+        """Objective terms of one fairness formulation (before ``weights["fairness"]``).
+
+        * ``deviation``: per employee, |worked days - expected days|, where the
+          expected days are the role's demand split over its employees
+        * ``spread``: per role, max - min of shift counts normalized by each
+          employee's available days, in days
+        * ``hours``: per role, max - min of worked minutes normalized by etat
+          and available days, in hours
+        * ``weekend_night``: per role, max - min of weekend/holiday shifts and
+          of night shifts
+
+        The min-max forms add two bound variables per group instead of an
+        absolute value per employee, which keeps the LP relaxation tight.
+        """
+        if mode == "deviation":
+            return self._deviation_terms()
+        durations = self._shift_duration_minutes()
+        open_days = max(1, int(self.context.open_days.sum()))
+        etats = {cast(int, emp.id): employee_etat(emp) for emp in self.employees}
+        terms: List[Any] = []
+        for index, group in enumerate(self._fairness_groups()):
+            if len(group) < 2:
+                continue
+            if mode == "weekend_night":
+                weekend = {
+                    emp_id: [
+                        var
+                        for day, _, var in self.vars_by_employee[emp_id]
+                        if date(self.year, self.month, day).weekday() >= 5
+                        or date(self.year, self.month, day) in self.holiday_map
+                    ]
+                    for emp_id in group
+                }
+                nights = {
+                    emp_id: [var for _, shift_id, var in self.vars_by_employee[emp_id] if shift_id in self.night_shift_ids]
+                    for emp_id in group
+                }
+                for name, selected in (("weekend", weekend), ("night", nights)):
+                    loads = {emp_id: [(1, var) for var in emp_vars] for emp_id, emp_vars in selected.items()}
+                    spread = self._spread(f"{name}_{index}", loads, 1)
+                    if spread is not None:
+                        terms.append(spread)
+                continue
+
+            loads: Dict[int, List[Tuple[int, Any]]] = {}
+            for emp_id in group:
+                emp_vars = self.vars_by_employee[emp_id]
+                available_days = len({day for day, _, _ in emp_vars})
+                if mode == "spread":
+                    coefficient = round(SPREAD_SCALE * open_days / available_days)
+                    loads[emp_id] = [(coefficient, var) for _, _, var in emp_vars]
+                else:
+                    scale = open_days / (available_days * (etats.get(emp_id) or 1.0))
+                    loads[emp_id] = [
+                        (round(durations.get(shift_id, 0) * scale), var) for _, shift_id, var in emp_vars
+                    ]
+            spread = self._spread(f"{mode}_{index}", loads, SPREAD_SCALE if mode == "spread" else 60)
+            if spread is not None:
+                terms.append(spread)
+        return terms
+
+    def _spread(self, name: str, loads: Dict[int, List[Tuple[int, Any]]], unit: int) -> Optional[Any]:
+        """max - min of the weighted loads, rounded up to multiples of ``unit``."""
+        upper = max((sum(coefficient for coefficient, _ in terms) for terms in loads.values()), default=0)
+        if upper <= 0 or len(loads) < 2:
+            return None
+        high = self.model.NewIntVar(0, upper, f"{name}_max")
+        low = self.model.NewIntVar(0, upper, f"{name}_min")
+        total = []
+        for terms in loads.values():
+            load = sum(coefficient * var for coefficient, var in terms)
+            self.model.Add(high >= load)
+            self.model.Add(low <= load)
+            total.append(load)
+        # Redundant: the maximum is at least, the minimum at most the average load
+        self.model.Add(len(loads) * high >= sum(total))
+        self.model.Add(len(loads) * low <= sum(total))
+        if unit == 1:
+            return high - low
+        spread = self.model.NewIntVar(0, -(-upper // unit), f"{name}_spread")
+        self.model.Add(unit * spread >= high - low)
+        return spread
+
+    def _expected_days(self) -> Dict[int, int]:
+        """Worked days each employee would get if the role's demand were split evenly."""
+        demand = self.context.demand().sum(axis=(1, 2))
+        role_index = {role_name: idx for idx, role_name in enumerate(self.context.role_names)}
+        expected: Dict[int, int] = {}
+        for group in self._fairness_groups():
+            role_idx = role_index.get(self.employee_roles.get(group[0], ""))
+            required = int(demand[role_idx]) if role_idx is not None else 0
+            for emp_id in group:
+                expected[emp_id] = round(required / len(group))
+        return expected
+
+    def _deviation_terms(self) -> List[Any]:
+        days_per_emp: DefaultDict[int, List[Any]] = defaultdict(list)
+        for (emp_id, _), works_day in self.works_day.items():
+            days_per_emp[emp_id].append(works_day)
+        expected = self._expected_days()
+        terms: List[Any] = []
+        for emp_id, emp_days in days_per_emp.items():
+            reference = expected.get(emp_id, 0)
+            deviation = self.model.NewIntVar(0, max(len(emp_days), reference), f"dev_e{emp_id}")
+            self.model.AddAbsEquality(deviation, sum(emp_days) - reference)
+            terms.append(deviation)
+        return terms
+
+    def _preference_terms(self) -> List[Any]:
+        """Weighted soft literals for the compiled employee preferences.
+
+        Every assignment to an avoided shift, to a shift outside a non-empty
+        preferred set or on a requested day off is one violation; night
+        shifts above ``max_nights`` count once each.
+        """
+        weight = int(self.weights.get("preferencje", DEFAULT_PREFERENCE_WEIGHT))
+        self.preference_penalties = []
+        if weight <= 0 or not self.preferences:
+            return []
+        shift_ids_by_name = {name.strip().lower(): shift_id for shift_id, name in self.shift_names.items()}
+        for emp_id, preferences in self.preferences.items():
+            emp_vars = self.vars_by_employee.get(emp_id)
+            if not emp_vars:
+                continue
+            preferred = preferences.resolve_shifts(preferences.preferred_shifts, shift_ids_by_name)
+            avoided = preferences.resolve_shifts(preferences.avoided_shifts, shift_ids_by_name)
+            nights = []
+            for day, shift_id, var in emp_vars:
+                if shift_id in avoided:
+                    self.preference_penalties.append(var)
+                if preferred and shift_id not in preferred:
+                    self.preference_penalties.append(var)
+                if preferences.is_day_off(date(self.year, self.month, day)):
+                    self.preference_penalties.append(var)
+                if shift_id in self.night_shift_ids:
+                    nights.append(var)
+            if preferences.max_nights is not None and len(nights) > preferences.max_nights:
+                extra = self.model.NewIntVar(0, len(nights) - preferences.max_nights, f"extra_nights_e{emp_id}")
+                self.model.Add(sum(nights) - extra <= preferences.max_nights)
+                self.preference_penalties.append(extra)
+        return [weight * penalty for penalty in self.preference_penalties]
+
+    def _record_preference_stats(self) -> None:
+        self.preference_stats = {
+            "employees": len(self.preferences),
+            "soft_literals": len(self.preference_penalties),
+            "violations": sum(self._value(penalty) for penalty in self.preference_penalties),
+        } if self.preference_penalties else {}
+
+    def _stored_month_entries(self, year: int, month: int) -> List[Tuple[int, date, int]]:
+        """Return (employee_id, date, shift_id) of the schedule stored for a month."""
+        return [
+            (emp_id, entry_date, shift_id)
+            for emp_id, entry_date, shift_id in (
+                self.session.query(GrafikEntry.pracownik_id, GrafikEntry.data, GrafikEntry.zmiana_id)
+                .join(GrafikMiesieczny, GrafikEntry.grafik_miesieczny_id == GrafikMiesieczny.id)
+                .filter(GrafikMiesieczny.miesiac_rok == f"{year:04d}-{month:02d}")
+                .all()
+            )
+        ]
+
+    def _hint_from_previous_month(self) -> set[Tuple[int, int, int]]:
+        """Project last month's roster onto this month, keeping weekdays aligned."""
+        previous_end = self.month_start - timedelta(days=1)
+        previous = {
+            (emp_id, entry_date): shift_id
+            for emp_id, entry_date, shift_id in self._stored_month_entries(previous_end.year, previous_end.month)
+        }
+        if not previous:
+            return set()
+        keys: set[Tuple[int, int, int]] = set()
+        for day in self.days:
+            # Four (or five) weeks back always lands in the previous month on the same weekday
+            source = date(self.year, self.month, day) - timedelta(days=28)
+            if source >= self.month_start:
+                source -= timedelta(days=7)
+            for emp_id in self.employee_ids:
+                shift_id = previous.get((emp_id, source))
+                if shift_id is not None:
+                    keys.add((emp_id, day, shift_id))
+        return keys
+
+    def _hint_from_heuristic(self) -> set[Tuple[int, int, int]]:
+        """Use the round-robin heuristic roster; empty when it cannot staff the month."""
+        try:
+            planned = plan_monthly_assignments(self.session, self.year, self.month)
+        except HeuristicGenerationError:
+            return set()
+        return {(emp_id, entry_date.day, shift_id) for emp_id, entry_date, shift_id in planned}
+
+    def _add_solution_hints(self) -> None:
+        """Hint every assignment variable from the configured warm-start source."""
+        hint = self._solution_hint()
+        if hint is not None:
+            self._apply_solution_hint(*hint)
+
+    def _solution_hint(self) -> Optional[Tuple[str, set[Tuple[int, int, int]]]]:
+        """``(source, hinted assignment keys)`` of the configured warm start, if any."""
+        source = self.warm_start
+        if source is None and self.solver_settings.use_hints:
+            source = "current"
+        if source is None:
+            return None
+
+        if source == "previous_month":
+            hinted = self._hint_from_previous_month()
+        elif source == "heuristic":
+            hinted = self._hint_from_heuristic()
+        else:
+            hinted = {
+                (emp_id, entry_date.day, shift_id)
+                for emp_id, entry_date, shift_id in self._stored_month_entries(self.year, self.month)
+            }
+        return source, hinted
+
+    def _apply_solution_hint(self, source: str, hinted: set[Tuple[int, int, int]]) -> None:
+        self.hint_keys = {key for key in hinted if key in self.assignments}
+        self.hint_stats = {"source": source, "hinted_assignments": len(self.hint_keys)}
+        if not self.hint_keys:
+            return
+        for key, var in self.assignments.items():
+            self.model.AddHint(var, 1 if key in self.hint_keys else 0)
+
+    def _record_hint_survival(self) -> None:
+        """Report how much of the warm start is kept in the final solution."""
+        if not self.hint_stats:
+            return
+        kept = sum(1 for key in self.hint_keys if self._value(self.assignments[key]) == 1)
+        changed = sum(
+            1
+            for key, var in self.assignments.items()
+            if (self._value(var) == 1) != (key in self.hint_keys)
+        )
+        self.hint_stats.update(
+            kept_assignments=kept,
+            survival_rate=round(kept / len(self.hint_keys), 3) if self.hint_keys else 0.0,
+            changed_variables=changed,
+        )
+
+    def _record_solve_stats(self, status) -> None:
+        """Keep solver outcome and profile for the API diagnostics block."""
+        self._set_solve_stats(status, self.solver.WallTime())
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.solve_stats["objective"] = self.solver.ObjectiveValue()
+            self.solve_stats["best_bound"] = self.solver.BestObjectiveBound()
+
+    def _set_solve_stats(self, status, wall_time_s: float) -> None:
+        self.solve_stats = {
+            "status": self.solver.StatusName(status),
+            "wall_time_s": round(wall_time_s, 3),
+            "settings": self.solver_settings.to_dict(),
+            "warm_start": self.hint_stats or None,
+            "time_to_first_feasible_ms": self.time_to_first_feasible_ms,
+            "coverage_mode": "soft" if self.soft_coverage else "hard",
+            "boundary_entries": len(self.boundary_entries) if self.rolling_horizon else None,
+            "symmetry": self.symmetry_stats or None,
+            "fairness_modes": self.fairness_modes,
+        }
+
+    def _report_phase(self, phase: str) -> None:
+        """Tell ``progress_callback`` which step of the generation is running."""
+        if self.progress_callback is not None:
+            self.progress_callback({"phase": phase})
+
+    def _on_solution(self, callback: _SolutionCallback) -> None:
+        """Record time to first solution and publish the improving solution."""
+        if self.time_to_first_feasible_ms is None:
+            self.time_to_first_feasible_ms = int((perf_counter() - self.generation_started) * 1000)
+        update: Dict[str, Any] = {
+            "solutions": callback.solution_count,
+            "objective": callback.ObjectiveValue(),
+            "best_bound": callback.BestObjectiveBound(),
+            "elapsed_s": round(callback.WallTime(), 3),
+        }
+        # Each consumer gets its own dict; jobs and SSE queues keep the reference
+        if self.progress_callback is not None:
+            self.progress_callback(dict(update))
+        if self.solution_callback is not None:
+            entries = [
+                {
+                    "pracownik_id": emp_id,
+                    "data": date(self.year, self.month, day).isoformat(),
+                    "zmiana_id": shift_id,
+                }
+                for (emp_id, day, shift_id), var in self.assignments.items()
+                if callback.Value(var) == 1
+            ]
+            self.solution_callback({**update, "entries": entries})
+
+    def _solve(self):
+        """Run CP-SAT, reporting solutions and honouring ``cancel_event``."""
+        callback = _SolutionCallback(self._on_solution)
+        if self.cancel_event is None:
+            return self.solver.Solve(self.model, callback)
+
+        solve_finished = threading.Event()
+
+        def stop_on_cancel():
+            while not solve_finished.wait(0.1):
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    self.solver.StopSearch()
+                    return
+
+        watcher = threading.Thread(target=stop_on_cancel, daemon=True)
+        watcher.start()
+        try:
+            return self.solver.Solve(self.model, callback)
+        finally:
+            solve_finished.set()
+            watcher.join()
+
+    def _value(self, var: Any) -> int:
+        """Solved value of ``var``, from this generator's solver or a component's solution."""
+        if self.solution_values is not None:
+            return int(self.solution_values[var.Index()])
+        return int(self.solver.Value(var))
+
+    def _extract_assignments(self) -> List[Tuple[int, date, int]]:
+        return [
+            (emp_id, date(self.year, self.month, day), shift_id)
+            for (emp_id, day, shift_id), var in self.assignments.items()
+            if self._value(var) == 1
+        ]
+
+    def _independent_components(self) -> List[Tuple[List[int], List[str]]]:
+        """Role components worth solving separately; empty when decomposition does not apply."""
+        # A role with demand but no employees only shows up in the full model (as uncovered slots)
+        if self.context.unstaffed_demand():
+            return []
+        if int(np.count_nonzero(self.context.availability)) < DECOMPOSITION_MIN_VARIABLES:
+            return []
+        components = self.context.role_components()
+        return components if len(components) > 1 else []
+
+    def _component_generator(self, employee_ids: List[int], role_names: List[str]) -> "OrToolsGenerator":
+        """A copy of this generator restricted to one component's employees and roles."""
+        component = copy.copy(self)
+        members = set(employee_ids)
+        component.employees = [emp for emp in self.employees if getattr(emp, "id", None) in members]
+        component.model = cp_model.CpModel()
+        component.solver = cp_model.CpSolver()
+        component.assignments = {}
+        component.coverage_slack = {}
+        component.target_deviation = {}
+        component.hint_keys = set()
+        component.hint_stats = {}
+        component.solution_values = None
+        component._build_input_index()
+        roles = set(role_names)
+        component.staffing = {key: bounds for key, bounds in component.staffing.items() if key[2] in roles}
+        return component
+
+    def _solve_decomposed(self, components: List[Tuple[List[int], List[str]]]):
+        """Solve each role component in a process pool and merge the solutions.
+
+        Returns the combined status: the first failing component's status,
+        else OPTIMAL when every component is optimal, else FEASIBLE.
+        """
+        hint = self._solution_hint()
+
+        parts: List[OrToolsGenerator] = []
+        for employee_ids, role_names in components:
+            part = self._component_generator(employee_ids, role_names)
+            part._build_constraints()
+            part._add_objective()
+            if hint is not None:
+                part._apply_solution_hint(*hint)
+            parts.append(part)
+        symmetric_parts = [part.symmetry_stats for part in parts if part.symmetry_stats]
+        self.symmetry_stats = {
+            key: sum(stats[key] for stats in symmetric_parts) for key in ("classes", "employees")
+        } if symmetric_parts else {}
+
+        self._report_phase("solving")
+        started = perf_counter()
+        cpus = os.cpu_count() or 1
+        workers = min(len(parts), DECOMPOSITION_WORKERS or cpus)
+        # The pool's solves share the search workers a single solve would get
+        settings = self.solver_settings.to_dict()
+        settings["num_search_workers"] = max(1, (self.solver_settings.num_search_workers or cpus) // workers)
+        # spawn: forking a process that runs Flask and solver threads is unsafe
+        mp_context = multiprocessing.get_context("spawn")
+        stop_event = mp_context.Event()
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp_context,
+            initializer=_init_component_worker,
+            initargs=(stop_event,),
+        )
+        try:
+            futures = [executor.submit(_solve_component_model, str(part.model.Proto()), settings) for part in parts]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    raise GenerationCancelled("Generowanie grafiku zostało anulowane")
+            results = [future.result() for future in futures]
+        finally:
+            # Running solves stop at their next check instead of at the time limit
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        statuses = [getattr(cp_model, result["status"]) for result in results]
+        failed = [status for status in statuses if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE)]
+        if failed:
+            status = failed[0]
+        else:
+            status = cp_model.OPTIMAL if all(value == cp_model.OPTIMAL for value in statuses) else cp_model.FEASIBLE
+            self.time_to_first_feasible_ms = int((perf_counter() - self.generation_started) * 1000)
+
+        self._set_solve_stats(status, perf_counter() - started)
+        self.solve_stats["components"] = [
+            {
+                "roles": role_names,
+                "employees": len(employee_ids),
+                "variables": len(part.assignments),
+                "status": result["status"],
+                "wall_time_s": result["wall_time_s"],
+            }
+            for (employee_ids, role_names), part, result in zip(components, parts, results)
+        ]
+        if failed:
+            return status
+
+        self.solved_assignments = []
+        self.uncovered_slots = []
+        self.overstaffed_slots = []
+        hinted = kept = changed = 0
+        for part, result in zip(parts, results):
+            part.solution_values = result["solution"]
+            part._record_hint_survival()
+            part._record_coverage_slack()
+            part._record_preference_stats()
+            self.solved_assignments.extend(part._extract_assignments())
+            self.uncovered_slots.extend(part.uncovered_slots)
+            self.overstaffed_slots.extend(part.overstaffed_slots)
+            hinted += len(part.hint_keys)
+            kept += part.hint_stats.get("kept_assignments", 0)
+            changed += part.hint_stats.get("changed_variables", 0)
+        self.uncovered_slots.sort(key=_slot_order)
+        self.overstaffed_slots.sort(key=_slot_order)
+        self.solved_assignments.sort(key=lambda item: (item[1], item[2], item[0]))
+        if hint is not None:
+            self.hint_stats = {
+                "source": hint[0],
+                "hinted_assignments": hinted,
+                "kept_assignments": kept,
+                "survival_rate": round(kept / hinted, 3) if hinted else 0.0,
+                "changed_variables": changed,
+            }
+            self.solve_stats["warm_start"] = self.hint_stats
+        preference_parts = [part.preference_stats for part in parts if part.preference_stats]
+        self.preference_stats = {
+            key: sum(stats[key] for stats in preference_parts)
+            for key in ("employees", "soft_literals", "violations")
+        } if preference_parts else {}
+        self.solve_stats["preferences"] = self.preference_stats or None
+        self.solve_stats["objective"] = sum(result["objective"] for result in results)
+        self.solve_stats["best_bound"] = sum(result["best_bound"] for result in results)
+        self._publish_final_solution()
+        return status
+
+    def _publish_final_solution(self) -> None:
+        """Report the merged solution once to the progress and solution callbacks."""
+        update: Dict[str, Any] = {
+            "solutions": 1,
+            "objective": self.solve_stats.get("objective"),
+            "best_bound": self.solve_stats.get("best_bound"),
+            "elapsed_s": self.solve_stats.get("wall_time_s"),
+        }
+        if self.progress_callback is not None:
+            self.progress_callback(dict(update))
+        if self.solution_callback is not None:
+            entries = [
+                {"pracownik_id": emp_id, "data": entry_date.isoformat(), "zmiana_id": shift_id}
+                for emp_id, entry_date, shift_id in self.solved_assignments
+            ]
+            self.solution_callback({**update, "entries": entries})
+
+    def _build_constraints(self) -> None:
+        """Create the decision variables and every hard constraint family."""
+        self._create_variables()
+        self._create_works_day_variables()
+        self._add_coverage_constraints()
+        self._add_daily_rest_constraints()
+        self._add_weekly_rest_constraints()
+        self._add_monthly_hours_constraints()
+        self._add_daily_hours_constraints()
+        self._add_weekly_hours_constraints()
+        self._add_symmetry_breaking()
+
+    def _describe_assumption(self, key: Tuple[Any, ...]) -> Dict[str, Any]:
+        family = key[0]
+        if family == "coverage":
+            _, day, shift_id, role_name = key
+            slot_date = date(self.year, self.month, day)
+            current_date = slot_date.isoformat()
+            bounds = self.staffing[(slot_date, shift_id, role_name)]
+            if bounds.is_exact:
+                required = f"wymagana obsada {bounds.min_staff}"
+            elif bounds.max_staff is None:
+                required = f"obsada co najmniej {bounds.min_staff}"
+            else:
+                required = f"obsada od {bounds.min_staff} do {bounds.max_staff}"
+            return {
+                "constraint": family,
+                "date": current_date,
+                "shift_id": shift_id,
+                "role": role_name,
+                "message": (
+                    f"{current_date} '{self.shift_names[shift_id]}' — rola {role_name}: {required}"
+                ),
+            }
+
+        emp_id = key[1]
+        employee = next((emp for emp in self.employees if getattr(emp, "id", None) == emp_id), None)
+        label = (
+            f"{getattr(employee, 'imie', '')} {getattr(employee, 'nazwisko', '')}".strip() if employee else ""
+        ) or f"ID {emp_id}"
+        if family == "daily_rest":
+            rule = f"odpoczynek dobowy ({self.min_rest_hours} h)"
+        elif family == "weekly_rest":
+            rule = "co najmniej 1 dzień wolny w każdym 7-dniowym oknie"
+        elif family == "daily_hours":
+            rule = f"limit {self.hour_caps[emp_id].daily_minutes / 60:g} h dziennie (etat)"
+        elif family == "weekly_hours":
+            rule = f"limit {self.hour_caps[emp_id].weekly_minutes / 60:g} h w tygodniu (etat)"
+        else:
+            limit_minutes = int(self.context.monthly_limit_minutes[self.context.employee_index[emp_id]])
+            rule = f"limit {limit_minutes / 60:g} h w miesiącu"
+        return {"constraint": family, "pracownik_id": emp_id, "message": f"Pracownik {label}: {rule}"}
+
+    def diagnose_infeasibility(self) -> List[Dict[str, Any]]:
+        """Find a set of constraint groups that together make the month infeasible.
+
+        Rebuilds the model without an objective, guarding coverage per
+        (day, shift, role) and daily rest, weekly rest and daily, weekly and
+        monthly hours per employee with assumption literals, and maps CP-SAT's
+        ``SufficientAssumptionsForInfeasibility`` back to readable causes.
+        Returns an empty list when the month turns out to be feasible or the
+        diagnosis runs out of time. The generator's model is replaced.
+        """
+        self.model = cp_model.CpModel()
+        self.assignments = {}
+        self.assumption_literals = {}
+        try:
+            self._build_constraints()
+            literals = self.assumption_literals
+        finally:
+            self.assumption_literals = None
+        self.model.AddAssumptions(list(literals.values()))
+
+        solver = cp_model.CpSolver()
+        # Core extraction needs the sequential search
+        solver.parameters.num_workers = 1
+        solver.parameters.max_time_in_seconds = self.solver_settings.max_time_in_seconds
+        status = solver.Solve(self.model)
+        self.diagnosis_stats = {"status": solver.StatusName(status), "wall_time_s": solver.WallTime()}
+        if status != cp_model.INFEASIBLE:
+            return []
+
+        key_by_index = {literal.Index(): key for key, literal in literals.items()}
+        core = [
+            key_by_index[index]
+            for index in solver.SufficientAssumptionsForInfeasibility()
+            if index in key_by_index
+        ]
+        return [self._describe_assumption(key) for key in sorted(core)]
+
     def generate(self) -> Tuple[GrafikMiesieczny, List[GrafikEntry], List]:
         """
         Generate schedule using OR-Tools CP-SAT solver.
@@ -481,17 +1532,35 @@ class OrToolsGenerator:
         # Wstępna prewalidacja wykonalności
         self._prevalidate_feasibility()
 
-        # Create variables and constraints
-        self._create_variables()
-        self._add_coverage_constraints()
-        self._add_daily_rest_constraints()
-        self._add_weekly_rest_constraints()
-        self._add_monthly_hours_constraints()
-        self._add_objective()
-        
-        # Solve with timeout
-        self.solver.parameters.max_time_in_seconds = 60.0
-        status = self.solver.Solve(self.model)
+        self._report_phase("model")
+        components = self._independent_components() if self.decompose else []
+        status = None
+        if components:
+            try:
+                status = self._solve_decomposed(components)
+            except BrokenProcessPool:
+                # Worker processes could not run (e.g. no process support); solve one model instead
+                status = None
+        if status is None:
+            # Create variables and constraints
+            self._build_constraints()
+            self._add_objective()
+
+            self._add_solution_hints()
+
+            # Solve with the scenario's search profile
+            self.solver_settings.apply(self.solver)
+            self._report_phase("solving")
+            status = self._solve()
+            self._record_solve_stats(status)
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise GenerationCancelled("Generowanie grafiku zostało anulowane")
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                self._record_hint_survival()
+                self._record_coverage_slack()
+                self._record_preference_stats()
+                self.solve_stats["preferences"] = self.preference_stats or None
+                self.solved_assignments = self._extract_assignments()
         
         if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
             # Provide detailed diagnostics
@@ -504,58 +1573,89 @@ class OrToolsGenerator:
                 status_name = "INFEASIBLE"
             else:
                 status_name = f"STATUS_{status}"
+
+            if self.diagnose and status in (cp_model.INFEASIBLE, cp_model.UNKNOWN):
+                causes = self.diagnose_infeasibility()
+                if causes:
+                    summary = [cause["message"] for cause in causes[:10]]
+                    more = f" (… +{len(causes) - 10} więcej)" if len(causes) > 10 else ""
+                    raise InfeasibleScheduleError(
+                        f"OR-Tools nie znalazł rozwiązania (status: {status_name}). "
+                        "Sprzeczne ograniczenia:\n" + "\n".join(summary) + more,
+                        causes,
+                    )
             
+            variable_count = len(self.assignments) or sum(
+                component["variables"] for component in self.solve_stats.get("components", [])
+            )
             raise GenerationError(
                 f"OR-Tools nie znalazł rozwiązania (status: {status_name}). "
                 f"Pracownicy: {len(self.employees)}, Zmiany: {len(self.shifts)}, "
-                f"Zmienne: {len(self.assignments)}. "
+                f"Zmienne: {variable_count}. "
                 "Sprawdź ograniczenia i wymagania obsadowe."
             )
         
         # Create or update schedule
-        schedule = (
-            self.session.query(GrafikMiesieczny)
-            .filter(GrafikMiesieczny.miesiac_rok == f"{self.year:04d}-{self.month:02d}")
-            .one_or_none()
+        self._report_phase("persisting")
+        schedule = get_or_create_month_schedule(self.session, self.year, self.month)
+
+        # Write only the entries that changed
+        sync = sync_schedule_entries(
+            self.session,
+            cast(int, schedule.id),
+            self.solved_assignments,
+            {cast(int, emp.id): emp for emp in self.employees},
+            {cast(int, shift.id): shift for shift in self.shifts},
         )
-        
-        if schedule is None:
-            schedule = GrafikMiesieczny(
-                miesiac_rok=f"{self.year:04d}-{self.month:02d}",
-                status="roboczy",
-            )
-            self.session.add(schedule)
-            self.session.flush()
-        else:
-            # Clear existing entries
-            self.session.query(GrafikEntry).filter(
-                GrafikEntry.grafik_miesieczny_id == schedule.id
-            ).delete()
-            self.session.flush()
-        
-        # Extract solution
-        created_entries: List[GrafikEntry] = []
-        
-        for (emp_id, day, shift_id), var in self.assignments.items():
-            if self.solver.Value(var) == 1:
-                current_date = date(self.year, self.month, day)
-                
-                entry = GrafikEntry(
-                    grafik_miesieczny_id=schedule.id,
-                    pracownik_id=emp_id,
-                    data=current_date,
-                    zmiana_id=shift_id,
-                )
-                
-                # Load relationships for validation
-                entry.pracownik = self.session.get(Pracownik, emp_id)
-                entry.zmiana = self.session.get(Zmiana, shift_id)
-                
-                self.session.add(entry)
-                created_entries.append(entry)
-        
+        self.persist_stats = sync.summary()
+        created_entries = sync.entries
+
         # Validate solution
-        issues = validate_schedule(created_entries, self.shifts, self.holidays)
+        self._report_phase("validating")
+        issues = validate_schedule(
+            created_entries,
+            self.shifts,
+            self.holidays,
+            rest_matrix=self.rest_matrix,
+            context=self.context,
+            previous_entries=self.boundary_entries,
+        )
         self.session.flush()
         
         return schedule, created_entries, issues
+
+
+@dataclass
+class HorizonMonth:
+    """One month generated by :func:`generate_rolling_horizon`."""
+
+    year: int
+    month: int
+    schedule: GrafikMiesieczny
+    entries: List[GrafikEntry]
+    issues: List
+    generator: OrToolsGenerator
+
+
+def generate_rolling_horizon(
+    session: Session,
+    year: int,
+    month: int,
+    months: int,
+    **generator_options: Any,
+) -> List[HorizonMonth]:
+    """Generate ``months`` consecutive months starting at ``year``/``month``.
+
+    Each month is a separate CP-SAT model in rolling-horizon mode, so it sees
+    the tail of the month generated just before it as fixed context instead of
+    all months being solved as one large model. ``generator_options`` are
+    passed to every ``OrToolsGenerator``; the first error stops the pipeline.
+    """
+    results: List[HorizonMonth] = []
+    for current_year, current_month in month_sequence(year, month, months):
+        generator = OrToolsGenerator(
+            session, current_year, current_month, rolling_horizon=True, **generator_options
+        )
+        schedule, entries, issues = generator.generate()
+        results.append(HorizonMonth(current_year, current_month, schedule, entries, issues, generator))
+    return results
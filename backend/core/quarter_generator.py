@@ -0,0 +1,243 @@
+"""
+Quarter planning by month-by-month decomposition.
+
+A quarter is never solved as one 90-day CP-SAT model. Each month is an
+ordinary ``OrToolsGenerator`` run in rolling-horizon mode, so daily and weekly
+rest carry over from the month before, and the hours an employee may work in
+a month are capped by a pro-rata share of what is left of their quarterly
+limit (``HourLimit.max_kwartalnie``) after the months already planned.
+
+A month that cannot be staffed within the remaining budgets is re-solved with
+its monthly limits only. A final repair pass then walks the quarter backwards
+and re-solves months, warm-started from the stored roster, with reduced
+budgets for employees still above their quarterly limit. Re-solving a month
+also re-solves every month after it; such a chain runs in a savepoint and is
+rolled back as a whole when any of its months fails, so no month is left
+persisted against a tail that was never stored.
+"""
+
+from __future__ import annotations
+
+import math
+from calendar import monthrange
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from sqlalchemy.orm import Session
+
+from ..models import GrafikEntry, Pracownik, Zmiana
+from ..services.shift_rules import shift_minutes_table
+from ..services.hour_limits import load_hour_limits, quarterly_limit_minutes
+from ..services.horizon import month_sequence
+from .ortools_generator import GenerationCancelled, GenerationError, HorizonMonth, OrToolsGenerator
+
+QUARTER_MONTHS = 3
+
+
+def _month_label(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+def _worked_minutes(generator: OrToolsGenerator, entries: List[GrafikEntry]) -> Dict[int, int]:
+    """Minutes worked per employee id in one generated month."""
+    context = generator.context
+    positions = context.index_assignments(
+        (cast(int, entry.pracownik_id), entry.data, cast(int, entry.zmiana_id)) for entry in entries
+    )
+    if positions is None:
+        return {}
+    e_idx, _, s_idx = positions
+    minutes = context.worked_minutes(e_idx, s_idx)
+    return {emp_id: int(worked) for emp_id, worked in zip(context.employee_ids, minutes) if worked}
+
+
+@dataclass
+class QuarterResult:
+    """Outcome of :meth:`QuarterGenerator.generate`."""
+
+    year: int
+    quarter: int
+    months: List[HorizonMonth]
+    worked_minutes: Dict[int, int]
+    quarterly_limit_minutes: Dict[int, int]
+    budget_fallback_months: List[str] = field(default_factory=list)
+    repaired_months: List[str] = field(default_factory=list)
+    # Repair chains rolled back: {"month": repaired month, "failed_month": ..., "error": ...}
+    failed_repairs: List[Dict[str, str]] = field(default_factory=list)
+    runtime_ms: int = 0
+
+    @property
+    def violations(self) -> List[Dict[str, Any]]:
+        """Employees still above their quarterly limit after repair."""
+        return [
+            {
+                "pracownik_id": emp_id,
+                "worked_hours": round(self.worked_minutes.get(emp_id, 0) / 60, 2),
+                "limit_hours": round(limit / 60, 2),
+            }
+            for emp_id, limit in sorted(self.quarterly_limit_minutes.items())
+            if self.worked_minutes.get(emp_id, 0) > limit
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "year": self.year,
+            "quarter": self.quarter,
+            "months": [_month_label(result.year, result.month) for result in self.months],
+            "worked_hours": {
+                str(emp_id): round(minutes / 60, 2) for emp_id, minutes in sorted(self.worked_minutes.items())
+            },
+            "budget_fallback_months": self.budget_fallback_months,
+            "repaired_months": self.repaired_months,
+            "failed_repairs": self.failed_repairs,
+            "violations": self.violations,
+            "runtime_ms": self.runtime_ms,
+        }
+
+
+class QuarterGenerator:
+    """Plan the three months of a quarter as rolling-horizon subproblems."""
+
+    def __init__(self, session: Session, year: int, quarter: int, **generator_options: Any):
+        """
+        Args:
+            session: Database session
+            year: Year of the quarter
+            quarter: Quarter number (1-4)
+            generator_options: Passed to every ``OrToolsGenerator`` (e.g.
+                ``scenario_type``, ``soft_coverage``, ``cancel_event``)
+        """
+        if quarter not in (1, 2, 3, 4):
+            raise GenerationError("Kwartał musi być liczbą od 1 do 4")
+        self.session = session
+        self.year = year
+        self.quarter = quarter
+        self.months: List[Tuple[int, int]] = month_sequence(year, 3 * (quarter - 1) + 1, QUARTER_MONTHS)
+        self.generator_options = generator_options
+
+        employees = session.query(Pracownik).order_by(Pracownik.id).all()
+        self.quarterly_limits = quarterly_limit_minutes(employees, load_hour_limits(session))
+        self.max_shift_minutes = max(shift_minutes_table(session.query(Zmiana).all()).values(), default=0)
+
+        self.results: Dict[Tuple[int, int], HorizonMonth] = {}
+        self.worked: Dict[Tuple[int, int], Dict[int, int]] = {}
+        self.budget_fallback_months: List[str] = []
+        self.repaired_months: List[str] = []
+        self.failed_repairs: List[Dict[str, str]] = []
+
+    def _solve_month(
+        self,
+        year: int,
+        month: int,
+        budgets: Optional[Dict[int, int]],
+        warm_start: Optional[str] = None,
+    ) -> HorizonMonth:
+        options = dict(self.generator_options)
+        if warm_start is not None:
+            options["warm_start"] = warm_start
+        generator = OrToolsGenerator(
+            self.session, year, month, rolling_horizon=True, hour_budget_minutes=budgets, **options
+        )
+        schedule, entries, issues = generator.generate()
+        result = HorizonMonth(year, month, schedule, entries, issues, generator)
+        self.results[(year, month)] = result
+        self.worked[(year, month)] = _worked_minutes(generator, entries)
+        return result
+
+    def _total_worked(self, months: List[Tuple[int, int]]) -> Dict[int, int]:
+        totals: Dict[int, int] = {}
+        for key in months:
+            for emp_id, minutes in self.worked.get(key, {}).items():
+                totals[emp_id] = totals.get(emp_id, 0) + minutes
+        return totals
+
+    def _over_limit(self) -> bool:
+        totals = self._total_worked(self.months)
+        return any(totals.get(emp_id, 0) > limit for emp_id, limit in self.quarterly_limits.items())
+
+    def _forward_pass(self) -> None:
+        days = [monthrange(year, month)[1] for year, month in self.months]
+        for index, (year, month) in enumerate(self.months):
+            used = self._total_worked(self.months[:index])
+            share = days[index] / sum(days[index:])
+            budgets: Dict[int, int] = {}
+            for emp_id, limit in self.quarterly_limits.items():
+                remaining = max(0, limit - used.get(emp_id, 0))
+                # A pro-rata share keeps hours for later months; one extra shift absorbs rounding
+                budgets[emp_id] = min(remaining, math.ceil(remaining * share) + self.max_shift_minutes)
+            try:
+                self._solve_month(year, month, budgets)
+            except GenerationCancelled:
+                raise
+            except GenerationError:
+                if not budgets:
+                    raise
+                # Staff the month first; the repair pass moves hours back under the quarterly limit
+                self._solve_month(year, month, None)
+                self.budget_fallback_months.append(_month_label(year, month))
+
+    def _repair_pass(self) -> None:
+        for index in reversed(range(len(self.months))):
+            if not self._over_limit():
+                return
+            year, month = self.months[index]
+            worked = self.worked.get((year, month), {})
+            totals = self._total_worked(self.months)
+            # Employees above the limit give up their excess, the others may only take on their slack
+            budgets = {
+                emp_id: max(0, worked.get(emp_id, 0) + limit - totals.get(emp_id, 0))
+                for emp_id, limit in self.quarterly_limits.items()
+            }
+            chain = self.months[index:]
+            previous = {key: (self.results[key], self.worked.get(key, {})) for key in chain}
+            savepoint = self.session.begin_nested()
+            current = (year, month)
+            try:
+                self._solve_month(year, month, budgets, warm_start="current")
+                # Later months were solved against this month's previous tail
+                for later in chain[1:]:
+                    current = later
+                    later_worked = self.worked.get(later, {})
+                    # Hours of the later months must not grow back
+                    later_budgets = {emp_id: later_worked.get(emp_id, 0) for emp_id in self.quarterly_limits}
+                    self._solve_month(*later, later_budgets, warm_start="current")
+            except (GenerationCancelled, GenerationError) as exc:
+                savepoint.rollback()
+                for key, (result, worked_minutes) in previous.items():
+                    self.results[key] = result
+                    self.worked[key] = worked_minutes
+                if isinstance(exc, GenerationCancelled):
+                    raise
+                self.failed_repairs.append(
+                    {
+                        "month": _month_label(year, month),
+                        "failed_month": _month_label(*current),
+                        "error": str(exc),
+                    }
+                )
+                continue
+            savepoint.commit()
+            self.repaired_months.append(_month_label(year, month))
+
+    def generate(self) -> QuarterResult:
+        """Generate and persist the quarter's three monthly schedules.
+
+        Raises:
+            GenerationError: when a month cannot be generated even with its
+                monthly limits only
+        """
+        started = perf_counter()
+        self._forward_pass()
+        self._repair_pass()
+        return QuarterResult(
+            year=self.year,
+            quarter=self.quarter,
+            months=[self.results[key] for key in self.months],
+            worked_minutes=self._total_worked(self.months),
+            quarterly_limit_minutes=dict(self.quarterly_limits),
+            budget_fallback_months=self.budget_fallback_months,
+            repaired_months=self.repaired_months,
+            failed_repairs=self.failed_repairs,
+            runtime_ms=int((perf_counter() - started) * 1000),
+        )
@@ -0,0 +1,146 @@
+"""
+Incremental repair of a published month after an absence change.
+
+Regenerating a whole month because one employee reported sick reshuffles the
+roster of everybody else. The repair generator instead keeps every stored
+assignment fixed except in a small neighborhood: the affected days, widened
+by ``radius_days`` so rest rules can still be rebalanced, and the employees
+who can stand in for the absent one (the same role). Inside the
+neighborhood CP-SAT minimizes the number of changed assignments, so a
+repair touches a handful of entries and solves in about a second.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models import GrafikEntry, GrafikMiesieczny
+from .ortools_generator import GenerationError, OrToolsGenerator
+
+# Days around the changed absence that are re-solved as well
+REPAIR_RADIUS_DAYS = 3
+REPAIR_TIME_LIMIT_SECONDS = 5.0
+# Objective penalty per assignment added to or removed from the stored roster
+DEFAULT_CHANGE_WEIGHT = 50
+
+
+class ScheduleRepairGenerator(OrToolsGenerator):
+    """Re-solve the neighborhood of one employee's changed absence in a stored month."""
+
+    def __init__(
+        self,
+        session: Session,
+        year: int,
+        month: int,
+        pracownik_id: int,
+        data_od: date,
+        data_do: date,
+        radius_days: Optional[int] = None,
+        **generator_options: Any,
+    ):
+        """
+        Args:
+            pracownik_id: Employee whose absence was added, changed or removed
+            data_od, data_do: Days the change affects; for a moved absence
+                pass the union of its old and new range
+            radius_days: Extra days on both sides that may be re-solved
+                (defaults to ``REPAIR_RADIUS_DAYS``)
+            generator_options: Passed to ``OrToolsGenerator``; rolling horizon
+                is on by default and the model is never decomposed
+        """
+        generator_options.setdefault("rolling_horizon", True)
+        generator_options["decompose"] = False
+        super().__init__(session, year, month, **generator_options)
+
+        if pracownik_id not in self.employee_ids:
+            raise GenerationError(f"Pracownik o ID {pracownik_id} nie istnieje")
+        first = max(data_od, self.month_start)
+        last = min(data_do, self.month_end)
+        if first > last:
+            raise GenerationError(f"Zmiana nieobecności nie dotyczy miesiąca {year:04d}-{month:02d}")
+
+        self.current: set[Tuple[int, int, int]] = {
+            (emp_id, entry_date.day, shift_id)
+            for emp_id, entry_date, shift_id in self._stored_month_entries(year, month)
+        }
+        if not self.current:
+            raise GenerationError(
+                f"Brak zapisanego grafiku na {year:04d}-{month:02d} — najpierw wygeneruj grafik"
+            )
+
+        radius = REPAIR_RADIUS_DAYS if radius_days is None else max(0, int(radius_days))
+        self.pracownik_id = pracownik_id
+        self.repair_first_day = max(1, first.day - radius)
+        self.repair_last_day = min(self.last_day, last.day + radius)
+        role_name = self.employee_roles.get(pracownik_id)
+        self.repair_employees: set[int] = {pracownik_id}
+        if role_name:
+            self.repair_employees.update(self.employees_by_role[role_name])
+        # Pinned assignments already tell identical employees apart
+        self.symmetry_breaking = False
+        self.solver_settings.max_time_in_seconds = min(
+            self.solver_settings.max_time_in_seconds, REPAIR_TIME_LIMIT_SECONDS
+        )
+        self.repair_stats: Dict[str, Any] = {}
+
+    def _is_free(self, key: Tuple[int, int, int]) -> bool:
+        emp_id, day, _ = key
+        return emp_id in self.repair_employees and self.repair_first_day <= day <= self.repair_last_day
+
+    def _build_constraints(self) -> None:
+        super()._build_constraints()
+        self._fix_outside_neighborhood()
+
+    def _fix_outside_neighborhood(self) -> None:
+        """Pin every assignment outside the neighborhood to the stored roster."""
+        free = 0
+        for key, var in self.assignments.items():
+            if self._is_free(key):
+                free += 1
+                continue
+            self._guard(self.model.Add(var == (1 if key in self.current else 0)), ("fixed_roster",))
+        self.repair_stats = {
+            "pracownik_id": self.pracownik_id,
+            "date_from": date(self.year, self.month, self.repair_first_day).isoformat(),
+            "date_to": date(self.year, self.month, self.repair_last_day).isoformat(),
+            "employees": len(self.repair_employees),
+            "free_variables": free,
+            "fixed_variables": len(self.assignments) - free,
+        }
+
+    def _add_objective(self) -> None:
+        """Minimize changes to the stored roster, then coverage slack."""
+        change_weight = int(self.weights.get("repair_change", DEFAULT_CHANGE_WEIGHT))
+        terms: List[Any] = []
+        for key, var in self.assignments.items():
+            if self._is_free(key):
+                terms.append(change_weight * (1 - var) if key in self.current else change_weight * var)
+        terms.extend(self._coverage_penalty_terms())
+        if terms:
+            self.model.Minimize(sum(terms))
+
+    def _solution_hint(self) -> Optional[Tuple[str, set[Tuple[int, int, int]]]]:
+        # The stored roster is already loaded and is the natural starting point
+        return "current", self.current
+
+    def _describe_assumption(self, key: Tuple[Any, ...]) -> Dict[str, Any]:
+        if key[0] != "fixed_roster":
+            return super()._describe_assumption(key)
+        first = date(self.year, self.month, self.repair_first_day).isoformat()
+        last = date(self.year, self.month, self.repair_last_day).isoformat()
+        return {
+            "constraint": "fixed_roster",
+            "message": (
+                f"Grafik poza naprawianym zakresem ({first} – {last}) pozostaje bez zmian; "
+                "zwiększ zakres naprawy lub wygeneruj miesiąc ponownie"
+            ),
+        }
+
+    def generate(self) -> Tuple[GrafikMiesieczny, List[GrafikEntry], List]:
+        """Repair and persist the month; only changed entries are written."""
+        schedule, entries, issues = super().generate()
+        self.repair_stats["changes"] = self.persist_stats.get("inserted", 0) + self.persist_stats.get("deleted", 0)
+        return schedule, entries, issues
@@ -3,7 +3,7 @@ from contextlib import contextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from .models import (
@@ -49,8 +49,63 @@ def session_scope():
         session.close()
 
 
+def _add_missing_columns() -> None:
+    """Add nullable columns introduced after a SQLite database was created.
+
+    ``create_all`` only creates missing tables, so new model columns would
+    otherwise break queries against existing ``work_schedule.db`` files.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(
+                    text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+                )
+
+
+def _remove_duplicate_rows(connection, table, columns) -> None:
+    """Keep the lowest ``id`` per ``columns`` so a unique index can be built."""
+    column_list = ", ".join(f'"{column.name}"' for column in columns)
+    connection.execute(
+        text(
+            f'DELETE FROM "{table.name}" WHERE id NOT IN '
+            f'(SELECT MIN(id) FROM "{table.name}" GROUP BY {column_list})'
+        )
+    )
+
+
+def _add_missing_indexes() -> None:
+    """Create model indexes missing from tables created by older versions.
+
+    Duplicate rows are removed before a unique index is created on them.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.unique:
+                    _remove_duplicate_rows(connection, table, index.columns)
+                index.create(connection, checkfirst=True)
+
+
 def create_db_tables() -> None:
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _add_missing_indexes()
 
 
 def get_session():
@@ -5,6 +5,7 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Time,
@@ -108,12 +109,15 @@ class Zmiana(Base):
     godzina_rozpoczecia = Column(Time, nullable=False)
     godzina_zakonczenia = Column(Time, nullable=False)
     wymagana_obsada = Column(JSON, nullable=True)
+    # Unpaid break deducted from the shift's working time
+    przerwa_minuty = Column(Integer, nullable=True)
 
     wpisy = relationship("GrafikEntry", back_populates="zmiana")
 
 
 class GrafikMiesieczny(Base):
     __tablename__ = "grafiki_miesieczne"
+    __table_args__ = (Index("ix_grafiki_miesieczne_miesiac_rok", "miesiac_rok"),)
 
     id = Column(Integer, primary_key=True, index=True)
     miesiac_rok = Column(String(20), nullable=False)
@@ -129,6 +133,18 @@ class GrafikMiesieczny(Base):
 
 class GrafikEntry(Base):
     __tablename__ = "grafik_entries"
+    __table_args__ = (
+        # Covers the per-schedule reads ordered by (data, zmiana_id) and keeps
+        # one row per (schedule, employee, date, shift).
+        Index(
+            "ux_grafik_entries_grafik_data_zmiana_pracownik",
+            "grafik_miesieczny_id",
+            "data",
+            "zmiana_id",
+            "pracownik_id",
+            unique=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     grafik_miesieczny_id = Column(
@@ -147,6 +163,11 @@ class GrafikEntry(Base):
 
 class Nieobecnosc(Base):
     __tablename__ = "nieobecnosci"
+    __table_args__ = (
+        Index("ix_nieobecnosci_pracownik_okres", "pracownik_id", "data_od", "data_do"),
+        # Month-window reads without an employee: data_do >= start AND data_od <= end
+        Index("ix_nieobecnosci_okres", "data_do", "data_od"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     pracownik_id = Column(Integer, ForeignKey("pracownicy.id"), nullable=False)
@@ -165,6 +186,12 @@ class GeneratorParameter(Base):
     weights = Column(JSON, nullable=False)
     max_consecutive_nights = Column(Integer, nullable=True)
     min_rest_hours_override = Column(Integer, nullable=True)
+    # CP-SAT search profile for this scenario (NULL = solver default)
+    num_search_workers = Column(Integer, nullable=True)
+    max_time_in_seconds = Column(Float, nullable=True)
+    relative_gap_limit = Column(Float, nullable=True)
+    random_seed = Column(Integer, nullable=True)
+    use_hints = Column(Boolean, nullable=True, default=False)
     last_updated_by = Column(String(120), nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -0,0 +1,60 @@
+"""
+Month-windowed absence loading shared by the generators.
+
+Only absences overlapping the generated month are read from the database;
+the ``nieobecnosci (data_do, data_od)`` index keeps that query cheap
+regardless of how much history accumulated. Rules reaching back across the
+month boundary use the stored entries of the previous month (see
+``services.horizon``), not absences.
+"""
+
+from __future__ import annotations
+
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Set, Tuple, cast
+
+from sqlalchemy.orm import Session
+
+from ..models import Nieobecnosc
+
+
+def month_window(year: int, month: int) -> Tuple[date, date]:
+    """Return ``(month_start, month_end)`` for ``year``/``month``."""
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def load_absences(session: Session, window_start: date, window_end: date) -> List[Nieobecnosc]:
+    """Absences overlapping ``[window_start, window_end]``."""
+    # Ordering by pracownik_id would make SQLite walk the employee index end to end
+    return (
+        session.query(Nieobecnosc)
+        .filter(Nieobecnosc.data_od <= window_end, Nieobecnosc.data_do >= window_start)
+        .order_by(Nieobecnosc.data_od, Nieobecnosc.pracownik_id)
+        .all()
+    )
+
+
+def build_absence_map(absences: Iterable[Any], window_start: date, window_end: date) -> Dict[date, Set[int]]:
+    """Map each date of the window to the IDs of employees absent that day.
+
+    Each absence is clipped to the window as a pair of integer day offsets,
+    so no ``date`` arithmetic happens per absent day.
+    """
+    span = (window_end - window_start).days
+    if span < 0:
+        return {}
+    dates = [window_start + timedelta(days=offset) for offset in range(span + 1)]
+    absent: DefaultDict[int, Set[int]] = defaultdict(set)
+    for absence in absences:
+        start_date = cast(Optional[date], getattr(absence, "data_od", None))
+        end_date = cast(Optional[date], getattr(absence, "data_do", None))
+        employee_id = cast(Optional[int], getattr(absence, "pracownik_id", None))
+        if start_date is None or end_date is None or employee_id is None:
+            continue
+        first = max(0, (start_date - window_start).days)
+        last = min(span, (end_date - window_start).days)
+        for offset in range(first, last + 1):
+            absent[offset].add(employee_id)
+    return {dates[offset]: employees for offset, employees in absent.items()}
@@ -0,0 +1,140 @@
+"""
+Pre-solve staffing capacity analysis.
+
+Compares what a month demands with what the available staff can supply,
+using the arrays of a :class:`ScheduleContext`. Every check is a necessary
+condition for feasibility, so a deficit here means CP-SAT cannot succeed
+and the (potentially long) solve can be skipped.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from .schedule_context import ScheduleContext
+
+
+@dataclass
+class CapacityReport:
+    """Structured staffing deficits for one month."""
+
+    year: int
+    month: int
+    # (date, shift, role) slots needing more people than are available that day
+    slot_deficits: List[Dict[str, Any]] = field(default_factory=list)
+    # (date, role) pairs whose daily demand exceeds the available headcount
+    day_deficits: List[Dict[str, Any]] = field(default_factory=list)
+    # roles whose monthly demand exceeds their employees' hour capacity
+    hour_deficits: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def feasible(self) -> bool:
+        return not (self.slot_deficits or self.day_deficits or self.hour_deficits)
+
+    def messages(self) -> List[str]:
+        """Human-readable (Polish) description of every deficit."""
+        messages = [
+            f"{item['date']} '{item['shift_name']}' — rola {item['role']}: "
+            f"wymagane {item['required']}, dostępne {item['available']}"
+            for item in self.slot_deficits
+        ]
+        messages.extend(
+            f"{item['date']} — rola {item['role']}: dzienne zapotrzebowanie {item['required']}, "
+            f"dostępne {item['available']}"
+            for item in self.day_deficits
+        )
+        messages.extend(
+            f"Rola {item['role']}: potrzeba {item['required_hours']:.1f} h w miesiącu, "
+            f"limit pracowników {item['capacity_hours']:.1f} h"
+            for item in self.hour_deficits
+        )
+        return messages
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "year": self.year,
+            "month": self.month,
+            "feasible": self.feasible,
+            "slot_deficits": self.slot_deficits,
+            "day_deficits": self.day_deficits,
+            "hour_deficits": self.hour_deficits,
+            "elapsed_ms": round(self.elapsed_ms, 3),
+        }
+
+
+def analyze_capacity(
+    context: ScheduleContext,
+    one_shift_per_day: bool = True,
+    shift_names: Optional[Mapping[int, str]] = None,
+) -> CapacityReport:
+    """Compute staffing deficits of ``context``.
+
+    Args:
+        context: Month arrays built for the generator
+        one_shift_per_day: True when no two shifts can be worked on the same
+            day (e.g. because of daily rest); daily demand of a role is then
+            the sum over shifts rather than the busiest shift
+        shift_names: Optional shift id -> name mapping used in the report
+    """
+    started = perf_counter()
+    report = CapacityReport(year=context.year, month=context.month)
+    names = shift_names or {}
+
+    supply = context.available_by_role()  # (R, D)
+    demand = context.demand()  # (R, D, S)
+
+    # Report in (day, shift, role) order
+    slot_gap = demand - supply[:, :, np.newaxis]
+    for d_idx, s_idx, r_idx in np.argwhere(slot_gap.transpose(1, 2, 0) > 0):
+        shift_id = context.shift_ids[s_idx]
+        report.slot_deficits.append(
+            {
+                "date": context.dates[d_idx].isoformat(),
+                "shift_id": shift_id,
+                "shift_name": names.get(shift_id, str(shift_id)),
+                "role": context.role_names[r_idx],
+                "required": int(demand[r_idx, d_idx, s_idx]),
+                "available": int(supply[r_idx, d_idx]),
+                "deficit": int(slot_gap[r_idx, d_idx, s_idx]),
+            }
+        )
+
+    if one_shift_per_day:
+        # (day, role) pairs already reported per slot are not repeated
+        day_demand = demand.sum(axis=2)
+        day_gap = day_demand - supply
+        slot_short = (slot_gap > 0).any(axis=2)
+        for d_idx, r_idx in np.argwhere(((day_gap > 0) & ~slot_short).T):
+            report.day_deficits.append(
+                {
+                    "date": context.dates[d_idx].isoformat(),
+                    "role": context.role_names[r_idx],
+                    "required": int(day_demand[r_idx, d_idx]),
+                    "available": int(supply[r_idx, d_idx]),
+                    "deficit": int(day_gap[r_idx, d_idx]),
+                }
+            )
+
+    required_minutes = (demand * context.shift_minutes[np.newaxis, np.newaxis, :]).sum(axis=(1, 2))  # (R,)
+    capacity_minutes = context.monthly_limit_minutes
+    if one_shift_per_day and len(context.shift_minutes):
+        available_days = context.available.sum(axis=1)
+        capacity_minutes = np.minimum(capacity_minutes, available_days * context.shift_minutes.max())
+    role_capacity = context.role_masks.astype(np.int64) @ capacity_minutes  # (R,)
+    for r_idx in np.flatnonzero(required_minutes > role_capacity):
+        report.hour_deficits.append(
+            {
+                "role": context.role_names[r_idx],
+                "required_hours": round(float(required_minutes[r_idx]) / 60, 2),
+                "capacity_hours": round(float(role_capacity[r_idx]) / 60, 2),
+                "deficit_hours": round(float(required_minutes[r_idx] - role_capacity[r_idx]) / 60, 2),
+            }
+        )
+
+    report.elapsed_ms = (perf_counter() - started) * 1000
+    return report
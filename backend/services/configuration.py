@@ -22,6 +22,16 @@ from ..models import (
 )
 
 
+# GeneratorParameter columns holding the CP-SAT search profile of a scenario
+SOLVER_SETTING_FIELDS = (
+    "num_search_workers",
+    "max_time_in_seconds",
+    "relative_gap_limit",
+    "random_seed",
+    "use_hints",
+)
+
+
 class ConfigurationLoader:
     def create_or_update_holiday_api(self, data: dict) -> Holiday:
         """
@@ -72,12 +82,18 @@ class ConfigurationLoader:
         max_consecutive_nights = data.get("max_consecutive_nights")
         min_rest_hours_override = data.get("min_rest_hours_override")
         last_updated_by = data.get("last_updated_by")
+        solver_settings = {
+            key: data[key]
+            for key in SOLVER_SETTING_FIELDS
+            if key in data
+        }
         return self.create_or_update_generator_parameters(
             scenario_type=scenario_type,
             weights=weights,
             max_consecutive_nights=max_consecutive_nights,
             min_rest_hours_override=min_rest_hours_override,
             last_updated_by=last_updated_by,
+            solver_settings=solver_settings,
         )
     """
     Centralized configuration loader for schedule generation.
@@ -412,6 +428,7 @@ class ConfigurationLoader:
         max_consecutive_nights: Optional[int] = None,
         min_rest_hours_override: Optional[int] = None,
         last_updated_by: Optional[str] = None,
+        solver_settings: Optional[Dict[str, Any]] = None,
     ) -> GeneratorParameter:
         """
         Create or update generator parameters.
@@ -422,11 +439,22 @@ class ConfigurationLoader:
             max_consecutive_nights: Maximum consecutive night shifts
             min_rest_hours_override: Override for minimum rest hours
             last_updated_by: User who last updated the parameters
+            solver_settings: CP-SAT profile fields (see SOLVER_SETTING_FIELDS);
+                fields not given are left unchanged
             
         Returns:
             Created or updated GeneratorParameter
         """
-        params = self.get_generator_parameters(scenario_type)
+        params = (
+            self.session.query(GeneratorParameter)
+            .filter(GeneratorParameter.scenario_type == scenario_type)
+            .first()
+        )
+        solver_updates = {
+            field: value
+            for field, value in (solver_settings or {}).items()
+            if field in SOLVER_SETTING_FIELDS
+        }
         
         if params is not None:
             updates = {
@@ -434,6 +462,7 @@ class ConfigurationLoader:
                 "max_consecutive_nights": max_consecutive_nights,
                 "min_rest_hours_override": min_rest_hours_override,
                 "last_updated_by": last_updated_by,
+                **solver_updates,
             }
             for field, value in updates.items():
                 setattr(params, field, value)
@@ -444,6 +473,7 @@ class ConfigurationLoader:
                 max_consecutive_nights=max_consecutive_nights,
                 min_rest_hours_override=min_rest_hours_override,
                 last_updated_by=last_updated_by,
+                **solver_updates,
             )
             self.session.add(params)
         
@@ -7,6 +7,7 @@ import pandas as pd
 
 from ..database import session_scope
 from ..models import GrafikEntry, GrafikMiesieczny, Pracownik, Zmiana
+from .persistence import sync_schedule_entries
 
 
 class ImportError(Exception):
@@ -55,10 +56,6 @@ def import_schedule(month: str, file_stream: IO[bytes]):
             schedule = GrafikMiesieczny(miesiac_rok=month, status="roboczy")
             session.add(schedule)
             session.flush()
-        else:
-            session.query(GrafikEntry).filter(
-                GrafikEntry.grafik_miesieczny_id == schedule.id
-            ).delete()
 
         employees = {
             f"{emp.imie} {emp.nazwisko}".strip(): emp
@@ -66,7 +63,7 @@ def import_schedule(month: str, file_stream: IO[bytes]):
         }
         shifts = {shift.nazwa_zmiany: shift for shift in session.query(Zmiana).all()}
 
-        created: List[GrafikEntry] = []
+        assignments = []
         for entry in entries:
             employee = employees.get(entry["employee"])
             if not employee:
@@ -74,14 +71,14 @@ def import_schedule(month: str, file_stream: IO[bytes]):
             shift = shifts.get(entry["shift_name"])
             if not shift:
                 raise ImportError(f"Nieznana zmiana: {entry['shift_name']}")
-
-            grafik_entry = GrafikEntry(
-                grafik_miesieczny_id=schedule.id,
-                pracownik_id=employee.id,
-                zmiana_id=shift.id,
-                data=entry["date"],
-            )
-            session.add(grafik_entry)
-            created.append(grafik_entry)
+            assignments.append((employee.id, entry["date"], shift.id))
+
+        created: List[GrafikEntry] = sync_schedule_entries(
+            session,
+            schedule.id,
+            assignments,
+            {emp.id: emp for emp in employees.values()},
+            {shift.id: shift for shift in shifts.values()},
+        ).entries
 
         return schedule, created
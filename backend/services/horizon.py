@@ -0,0 +1,60 @@
+"""
+Month-boundary context for rolling-horizon generation.
+
+A month is solved on its own, but daily rest between the last day of the
+previous month and the 1st, and 7-day windows reaching back across the
+boundary, depend on what was already rostered. The last ``BOUNDARY_DAYS``
+days of stored entries before the month are loaded as fixed context for the
+generator and the validator.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from ..models import GrafikEntry, GrafikMiesieczny
+
+# A 7-day weekly rest window starting before the 1st reaches back at most 6 days
+BOUNDARY_DAYS = int(os.getenv("ROLLING_HORIZON_BOUNDARY_DAYS", "6"))
+
+
+def load_boundary_entries(session: Session, month_start: date, days: int = BOUNDARY_DAYS) -> List[GrafikEntry]:
+    """Stored entries from the ``days`` days before ``month_start``.
+
+    Only entries of the month schedules covering those days are read: the
+    schedules are resolved by ``miesiac_rok`` first, so the entry lookup runs
+    on the ``(grafik_miesieczny_id, data, ...)`` index instead of scanning
+    every schedule ever stored.
+    """
+    if days <= 0:
+        return []
+    first_day = month_start - timedelta(days=days)
+    last_day = month_start - timedelta(days=1)
+    month_count = (last_day.year - first_day.year) * 12 + last_day.month - first_day.month + 1
+    month_keys = [f"{year:04d}-{month:02d}" for year, month in month_sequence(first_day.year, first_day.month, month_count)]
+    schedule_ids = select(GrafikMiesieczny.id).where(GrafikMiesieczny.miesiac_rok.in_(month_keys))
+    return (
+        session.query(GrafikEntry)
+        .options(selectinload(GrafikEntry.zmiana), selectinload(GrafikEntry.pracownik))
+        .filter(
+            GrafikEntry.grafik_miesieczny_id.in_(schedule_ids),
+            GrafikEntry.data >= first_day,
+            GrafikEntry.data < month_start,
+        )
+        .order_by(GrafikEntry.data, GrafikEntry.pracownik_id)
+        .all()
+    )
+
+
+def month_sequence(year: int, month: int, count: int) -> List[Tuple[int, int]]:
+    """``count`` consecutive ``(year, month)`` pairs starting at ``year``/``month``."""
+    months: List[Tuple[int, int]] = []
+    for offset in range(count):
+        index = year * 12 + (month - 1) + offset
+        months.append((index // 12, index % 12 + 1))
+    return months
@@ -0,0 +1,102 @@
+"""
+Working-time caps by employment fraction (``etat``).
+
+``HourLimit`` rows give daily, weekly, monthly and quarterly caps in hours for
+one ``etat`` value. Employees without an ``etat`` are treated as full-time.
+:class:`HourLimitLookup` resolves the caps of an ``etat`` once and reuses them
+for every employee on that ``etat``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, cast
+
+from sqlalchemy.orm import Session
+
+from ..models import HourLimit
+
+FULL_TIME_ETAT = 1.0
+
+
+def load_hour_limits(session: Session) -> List[HourLimit]:
+    return session.query(HourLimit).order_by(HourLimit.etat).all()
+
+
+def limits_by_etat(limits: Iterable[Any]) -> Dict[float, Any]:
+    """Index ``HourLimit`` rows by ``etat``; the first row wins for duplicates."""
+    indexed: Dict[float, Any] = {}
+    for limit in limits:
+        etat = cast(Optional[float], getattr(limit, "etat", None))
+        if etat is not None:
+            indexed.setdefault(round(float(etat), 4), limit)
+    return indexed
+
+
+def employee_etat(employee: Any) -> float:
+    etat = cast(Optional[float], getattr(employee, "etat", None))
+    return round(float(etat), 4) if etat is not None else FULL_TIME_ETAT
+
+
+def _minutes(hours: Any) -> Optional[int]:
+    return int(hours) * 60 if hours is not None else None
+
+
+@dataclass(frozen=True)
+class HourCaps:
+    """Caps of one ``etat`` in minutes; ``None`` means uncapped."""
+
+    daily_minutes: Optional[int] = None
+    weekly_minutes: Optional[int] = None
+    monthly_minutes: Optional[int] = None
+    quarterly_minutes: Optional[int] = None
+
+
+NO_CAPS = HourCaps()
+
+
+class HourLimitLookup:
+    """``HourLimit`` rows indexed by ``etat``, with the resolved caps cached per ``etat``."""
+
+    def __init__(self, limits: Iterable[Any]):
+        self._rows = limits_by_etat(limits)
+        self._caps: Dict[float, HourCaps] = {}
+
+    @classmethod
+    def load(cls, session: Session) -> "HourLimitLookup":
+        return cls(load_hour_limits(session))
+
+    def caps_for_etat(self, etat: float) -> HourCaps:
+        caps = self._caps.get(etat)
+        if caps is None:
+            row = self._rows.get(etat)
+            caps = NO_CAPS if row is None else HourCaps(
+                daily_minutes=_minutes(getattr(row, "max_dziennie", None)),
+                weekly_minutes=_minutes(getattr(row, "max_tygodniowo", None)),
+                monthly_minutes=_minutes(getattr(row, "max_miesiecznie", None)),
+                quarterly_minutes=_minutes(getattr(row, "max_kwartalnie", None)),
+            )
+            self._caps[etat] = caps
+        return caps
+
+    def caps_for(self, employee: Any) -> HourCaps:
+        return self.caps_for_etat(employee_etat(employee))
+
+    def caps_by_employee(self, employees: Iterable[Any]) -> Dict[int, HourCaps]:
+        """Caps per employee id; employees whose ``etat`` has no ``HourLimit`` are omitted."""
+        caps: Dict[int, HourCaps] = {}
+        for employee in employees:
+            emp_id = cast(Optional[int], getattr(employee, "id", None))
+            employee_caps = self.caps_for(employee)
+            if emp_id is not None and employee_caps != NO_CAPS:
+                caps[emp_id] = employee_caps
+        return caps
+
+
+def quarterly_limit_minutes(employees: Iterable[Any], limits: Iterable[Any]) -> Dict[int, int]:
+    """``max_kwartalnie`` in minutes per employee id; employees without a cap are omitted."""
+    return {
+        emp_id: caps.quarterly_minutes
+        for emp_id, caps in HourLimitLookup(limits).caps_by_employee(employees).items()
+        if caps.quarterly_minutes is not None
+    }
@@ -0,0 +1,201 @@
+"""
+Background jobs for long-running schedule generation.
+
+Jobs run on a small thread pool so a CP-SAT solve does not occupy a Flask
+request worker. Each job keeps its status, solver progress and final result
+in memory until it is pruned.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATUSES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function to mark the job as cancelled."""
+
+
+class JobFailed(Exception):
+    """Raised inside a job function to fail the job with a structured report in ``error_details``."""
+
+    def __init__(self, message: str, details: Dict[str, Any]):
+        super().__init__(message)
+        self.details = details
+
+
+@dataclass
+class GenerationJob:
+    id: str
+    params: Dict[str, Any]
+    status: str = JOB_QUEUED
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    objective_history: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # Structured failure report (e.g. capacity deficits or conflicting constraints)
+    error_details: Optional[Dict[str, Any]] = None
+    # Latest improving solution (with entries) for streaming clients
+    latest_solution: Optional[Dict[str, Any]] = None
+    update_seq: int = 0
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        self._updated = threading.Condition(self._lock)
+
+    def _notify(self) -> None:
+        # Caller holds self._lock
+        self.update_seq += 1
+        self._updated.notify_all()
+
+    def report_progress(self, update: Dict[str, Any]) -> None:
+        """Record one progress update (a generation phase or an improving CP-SAT solution)."""
+        with self._lock:
+            self._record_progress(update)
+            self._notify()
+
+    def publish_solution(self, solution: Dict[str, Any]) -> None:
+        """Record an improving solution including its ``entries``."""
+        with self._lock:
+            self._record_progress({key: value for key, value in solution.items() if key != "entries"})
+            self.latest_solution = solution
+            self._notify()
+
+    def _record_progress(self, update: Dict[str, Any]) -> None:
+        # Phase updates keep the last solution's figures visible
+        self.progress = {**self.progress, **update}
+        if update.get("objective") is not None:
+            point = {"objective": update["objective"], "elapsed_s": update.get("elapsed_s")}
+            # A solution reported as progress and published with entries is one point
+            if not self.objective_history or self.objective_history[-1] != point:
+                self.objective_history.append(point)
+
+    def finish(
+        self,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        error_details: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.error_details = error_details
+            self.finished_at = datetime.utcnow()
+            self._notify()
+
+    def wait_for_update(self, last_seq: int, timeout: float) -> int:
+        """Block until ``update_seq`` differs from ``last_seq`` or ``timeout`` elapses."""
+        with self._lock:
+            self._updated.wait_for(lambda: self.update_seq != last_seq, timeout=timeout)
+            return self.update_seq
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = {
+                "job_id": self.id,
+                "status": self.status,
+                "params": self.params,
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                "progress": dict(self.progress),
+                "objective_history": list(self.objective_history),
+                "error": self.error,
+                "error_details": self.error_details,
+            }
+            if include_result:
+                data["result"] = self.result
+            return data
+
+
+class GenerationJobManager:
+    """Thread-pool backed registry of generation jobs."""
+
+    def __init__(self, max_workers: int = 2, max_finished_jobs: int = 100):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation")
+        self._jobs: Dict[str, GenerationJob] = {}
+        self._lock = threading.Lock()
+        self._max_finished_jobs = max_finished_jobs
+
+    def submit(
+        self,
+        params: Dict[str, Any],
+        func: Callable[[GenerationJob], Dict[str, Any]],
+    ) -> GenerationJob:
+        """Queue ``func(job)``; its return value becomes the job result."""
+        job = GenerationJob(id=uuid.uuid4().hex, params=params)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str) -> Optional[GenerationJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[GenerationJob]:
+        """Request cancellation; a queued job is cancelled at once, a running one by its generator."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with job._lock:
+            if job.status == JOB_QUEUED:
+                job.status = JOB_CANCELLED
+                job.finished_at = datetime.utcnow()
+                job._notify()
+        return job
+
+    def _run(self, job: GenerationJob, func: Callable[[GenerationJob], Dict[str, Any]]) -> None:
+        with job._lock:
+            if job.status != JOB_QUEUED:
+                return
+            job.status = JOB_RUNNING
+            job.started_at = datetime.utcnow()
+            job._notify()
+        details: Optional[Dict[str, Any]] = None
+        try:
+            result = func(job)
+        except JobCancelled:
+            status, result, error = JOB_CANCELLED, None, None
+        except JobFailed as exc:
+            status, result, error, details = JOB_FAILED, None, str(exc), exc.details
+        except Exception as exc:  # job failures are reported through the job status
+            status, result, error = JOB_FAILED, None, f"{exc.__class__.__name__}: {exc}"
+        else:
+            status, error = JOB_COMPLETED, None
+        job.finish(status, result, error, details)
+
+    def _prune(self) -> None:
+        finished = sorted(
+            (job for job in self._jobs.values() if job.status in FINISHED_STATUSES),
+            key=lambda job: job.finished_at or job.created_at,
+        )
+        for job in finished[: max(0, len(finished) - self._max_finished_jobs)]:
+            del self._jobs[job.id]
+
+
+job_manager = GenerationJobManager(max_workers=int(os.getenv("GENERATION_WORKERS", "2")))
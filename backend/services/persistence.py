@@ -0,0 +1,169 @@
+"""
+Bulk persistence of generated schedules.
+
+Generators produce thousands of (employee, date, shift) assignments per month.
+Writing them through individual ``session.add`` calls (and loading each
+relationship with ``session.get``) dominates request latency, so entries are
+written with a single Core ``INSERT ... RETURNING`` and the relationships are
+attached from objects the generator already holds in memory.
+
+Rewriting an existing schedule goes through :func:`sync_schedule_entries`,
+which compares the new assignment set with the stored rows and only deletes
+or inserts the tuples that changed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, cast
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..models import GrafikEntry, GrafikMiesieczny
+
+Assignment = Tuple[int, date, int]
+
+# Stay well below SQLite's bound-parameter limit for ``IN (...)`` lists
+DELETE_CHUNK_SIZE = 500
+
+
+@dataclass
+class EntrySyncResult:
+    """Outcome of :func:`sync_schedule_entries`."""
+
+    entries: List[GrafikEntry] = field(default_factory=list)
+    inserted: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+    def summary(self) -> Dict[str, int]:
+        return {"inserted": self.inserted, "deleted": self.deleted, "unchanged": self.unchanged}
+
+
+def get_or_create_month_schedule(session: Session, year: int, month: int) -> GrafikMiesieczny:
+    """Return the schedule for ``year``/``month``, creating a draft when missing."""
+    miesiac_rok = f"{year:04d}-{month:02d}"
+    schedule = (
+        session.query(GrafikMiesieczny)
+        .filter(GrafikMiesieczny.miesiac_rok == miesiac_rok)
+        .one_or_none()
+    )
+    if schedule is None:
+        schedule = GrafikMiesieczny(miesiac_rok=miesiac_rok, status="roboczy")
+        session.add(schedule)
+        session.flush()
+    return schedule
+
+
+def _entry_key(entry: GrafikEntry) -> Assignment:
+    return (cast(int, entry.pracownik_id), cast(date, entry.data), cast(int, entry.zmiana_id))
+
+
+def _attach_relationships(
+    entry: GrafikEntry,
+    employees_by_id: Optional[Mapping[int, Any]],
+    shifts_by_id: Optional[Mapping[int, Any]],
+) -> None:
+    employee = employees_by_id.get(cast(int, entry.pracownik_id)) if employees_by_id else None
+    if employee is not None:
+        set_committed_value(entry, "pracownik", employee)
+    shift = shifts_by_id.get(cast(int, entry.zmiana_id)) if shifts_by_id else None
+    if shift is not None:
+        set_committed_value(entry, "zmiana", shift)
+
+
+def insert_schedule_entries(
+    session: Session,
+    schedule_id: int,
+    assignments: Iterable[Assignment],
+    employees_by_id: Optional[Mapping[int, Any]] = None,
+    shifts_by_id: Optional[Mapping[int, Any]] = None,
+) -> List[GrafikEntry]:
+    """Insert ``(pracownik_id, data, zmiana_id)`` rows in one statement.
+
+    Returns the persisted entries in the order of ``assignments`` with
+    ``pracownik`` and ``zmiana`` populated from the given dicts, so callers
+    (validation, serialization) never trigger a lazy load per entry.
+    """
+    rows: List[Dict[str, Any]] = [
+        {
+            "grafik_miesieczny_id": schedule_id,
+            "pracownik_id": emp_id,
+            "data": entry_date,
+            "zmiana_id": shift_id,
+        }
+        for emp_id, entry_date, shift_id in assignments
+    ]
+    if not rows:
+        return []
+
+    inserted = session.scalars(insert(GrafikEntry).returning(GrafikEntry), rows).all()
+    by_key: Dict[Assignment, GrafikEntry] = {}
+    for entry in inserted:
+        _attach_relationships(entry, employees_by_id, shifts_by_id)
+        by_key[_entry_key(entry)] = entry
+
+    ordered: List[GrafikEntry] = []
+    for row in rows:
+        entry: Optional[GrafikEntry] = by_key.get((row["pracownik_id"], row["data"], row["zmiana_id"]))
+        if entry is not None:
+            ordered.append(entry)
+    return ordered
+
+
+def sync_schedule_entries(
+    session: Session,
+    schedule_id: int,
+    assignments: Iterable[Assignment],
+    employees_by_id: Optional[Mapping[int, Any]] = None,
+    shifts_by_id: Optional[Mapping[int, Any]] = None,
+) -> EntrySyncResult:
+    """Make the stored entries of ``schedule_id`` equal to ``assignments``.
+
+    Unchanged ``(pracownik_id, data, zmiana_id)`` rows are kept as they are;
+    only removed tuples are deleted and only new ones inserted. Duplicate
+    stored rows for the same tuple are removed as well. ``entries`` follows
+    the order of ``assignments``.
+    """
+    wanted: List[Assignment] = list(dict.fromkeys(assignments))
+
+    stored: Dict[Assignment, GrafikEntry] = {}
+    stale_ids: List[int] = []
+    for entry in session.scalars(
+        select(GrafikEntry).where(GrafikEntry.grafik_miesieczny_id == schedule_id)
+    ):
+        key = _entry_key(entry)
+        if key in stored:
+            stale_ids.append(cast(int, entry.id))
+        else:
+            stored[key] = entry
+
+    wanted_keys = set(wanted)
+    stale_ids.extend(cast(int, entry.id) for key, entry in stored.items() if key not in wanted_keys)
+    for start in range(0, len(stale_ids), DELETE_CHUNK_SIZE):
+        chunk = stale_ids[start : start + DELETE_CHUNK_SIZE]
+        session.execute(delete(GrafikEntry).where(GrafikEntry.id.in_(chunk)))
+
+    missing = [key for key in wanted if key not in stored]
+    inserted = {
+        _entry_key(entry): entry
+        for entry in insert_schedule_entries(session, schedule_id, missing, employees_by_id, shifts_by_id)
+    }
+
+    result = EntrySyncResult(
+        inserted=len(inserted),
+        deleted=len(stale_ids),
+        unchanged=len(wanted) - len(missing),
+    )
+    for key in wanted:
+        entry = stored.get(key)
+        if entry is not None:
+            _attach_relationships(entry, employees_by_id, shifts_by_id)
+        else:
+            entry = inserted.get(key)
+        if entry is not None:
+            result.entries.append(entry)
+    return result
@@ -0,0 +1,201 @@
+"""
+Employee preferences compiled from the free-form ``Pracownik.preferencje`` JSON.
+
+Recognised keys (Polish or English):
+
+* ``preferowane_zmiany`` / ``preferred_shifts`` – shift ids or names the
+  employee wants; other shifts count as a violation
+* ``unikane_zmiany`` / ``zakazane_zmiany`` / ``forbidden_shifts`` – shifts
+  the employee does not want
+* ``dni_wolne`` / ``preferowane_dni_wolne`` / ``days_off`` – weekday names,
+  ISO weekday numbers (1 = Monday … 7 = Sunday) or ``YYYY-MM-DD`` dates
+* ``max_nocy`` / ``max_nocne`` / ``max_nights`` – night shifts per month
+
+Everything else is kept in ``ignored`` so the UI can point at typos. The
+compiled form is cached per employee together with the JSON it was compiled
+from, so a changed ``preferencje`` is recompiled on the next read whoever
+wrote it. :func:`invalidate_preferences` drops entries early (the employees
+API calls it on update and delete).
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import unicodedata
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, FrozenSet, Iterable, Mapping, Optional, Tuple, Union, cast
+
+ShiftRef = Union[int, str]
+
+PREFERRED_SHIFT_KEYS = ("preferowane_zmiany", "preferred_shifts")
+AVOIDED_SHIFT_KEYS = ("unikane_zmiany", "zakazane_zmiany", "forbidden_shifts")
+DAYS_OFF_KEYS = ("dni_wolne", "preferowane_dni_wolne", "days_off")
+MAX_NIGHTS_KEYS = ("max_nocy", "max_nocne", "max_nights")
+
+# ISO weekday numbers by name, diacritics stripped
+WEEKDAYS = {
+    "poniedzialek": 1, "wtorek": 2, "sroda": 3, "czwartek": 4, "piatek": 5, "sobota": 6, "niedziela": 7,
+    "monday": 1, "tuesday": 2, "wednesday": 3, "thursday": 4, "friday": 5, "saturday": 6, "sunday": 7,
+}
+
+
+@dataclass(frozen=True)
+class EmployeePreferences:
+    """Typed form of one employee's ``preferencje``; shifts are ids or lowercase names."""
+
+    preferred_shifts: FrozenSet[ShiftRef] = frozenset()
+    avoided_shifts: FrozenSet[ShiftRef] = frozenset()
+    days_off_weekdays: FrozenSet[int] = frozenset()
+    days_off_dates: FrozenSet[date] = frozenset()
+    max_nights: Optional[int] = None
+    ignored: Tuple[str, ...] = ()
+
+    @property
+    def is_empty(self) -> bool:
+        return not (
+            self.preferred_shifts
+            or self.avoided_shifts
+            or self.days_off_weekdays
+            or self.days_off_dates
+            or self.max_nights is not None
+        )
+
+    def resolve_shifts(self, refs: FrozenSet[ShiftRef], shift_ids_by_name: Mapping[str, int]) -> FrozenSet[int]:
+        """Map shift references to ids; unknown names are dropped."""
+        resolved = set()
+        for ref in refs:
+            shift_id = ref if isinstance(ref, int) else shift_ids_by_name.get(ref)
+            if shift_id is not None:
+                resolved.add(shift_id)
+        return frozenset(resolved)
+
+    def is_day_off(self, day: date) -> bool:
+        return day in self.days_off_dates or day.isoweekday() in self.days_off_weekdays
+
+
+NO_PREFERENCES = EmployeePreferences()
+
+
+def _normalize(text: str) -> str:
+    stripped = unicodedata.normalize("NFKD", text.strip().lower())
+    return "".join(char for char in stripped if not unicodedata.combining(char)).replace("ł", "l")
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def _shift_refs(value: Any) -> FrozenSet[ShiftRef]:
+    refs = set()
+    for item in _as_list(value):
+        if isinstance(item, bool):
+            continue
+        if isinstance(item, int):
+            refs.add(item)
+        elif isinstance(item, str) and item.strip():
+            refs.add(int(item) if item.strip().isdigit() else item.strip().lower())
+    return frozenset(refs)
+
+
+def _days_off(value: Any) -> Tuple[FrozenSet[int], FrozenSet[date]]:
+    weekdays = set()
+    dates = set()
+    for item in _as_list(value):
+        if isinstance(item, bool):
+            continue
+        if isinstance(item, int):
+            if 1 <= item <= 7:
+                weekdays.add(item)
+            continue
+        if not isinstance(item, str):
+            continue
+        name = _normalize(item)
+        if name in WEEKDAYS:
+            weekdays.add(WEEKDAYS[name])
+            continue
+        try:
+            dates.add(date.fromisoformat(item.strip()))
+        except ValueError:
+            continue
+    return frozenset(weekdays), frozenset(dates)
+
+
+def _first(raw: Mapping[str, Any], keys: Tuple[str, ...]) -> Any:
+    for key in keys:
+        if key in raw:
+            return raw[key]
+    return None
+
+
+def compile_preferences(raw: Any) -> EmployeePreferences:
+    """Parse a ``preferencje`` value; anything that is not a dict compiles to no preferences."""
+    if not isinstance(raw, dict) or not raw:
+        return NO_PREFERENCES
+    weekdays, dates = _days_off(_first(raw, DAYS_OFF_KEYS))
+    max_nights_raw = _first(raw, MAX_NIGHTS_KEYS)
+    try:
+        max_nights = max(0, int(max_nights_raw)) if max_nights_raw is not None else None
+    except (TypeError, ValueError):
+        max_nights = None
+    known = set(PREFERRED_SHIFT_KEYS + AVOIDED_SHIFT_KEYS + DAYS_OFF_KEYS + MAX_NIGHTS_KEYS)
+    return EmployeePreferences(
+        preferred_shifts=_shift_refs(_first(raw, PREFERRED_SHIFT_KEYS)),
+        avoided_shifts=_shift_refs(_first(raw, AVOIDED_SHIFT_KEYS)),
+        days_off_weekdays=weekdays,
+        days_off_dates=dates,
+        max_nights=max_nights,
+        ignored=tuple(sorted(str(key) for key in raw if key not in known)),
+    )
+
+
+class PreferenceCache:
+    """Compiled preferences per employee id, keyed on the JSON they were compiled from."""
+
+    def __init__(self) -> None:
+        self._entries: Dict[int, Tuple[Any, EmployeePreferences]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, employee_id: int, raw: Any) -> EmployeePreferences:
+        """Cached preferences of ``employee_id``; recompiled when ``raw`` differs from the cached JSON."""
+        with self._lock:
+            cached = self._entries.get(employee_id)
+            if cached is not None and cached[0] == raw:
+                return cached[1]
+        compiled = compile_preferences(raw)
+        with self._lock:
+            self._entries[employee_id] = (copy.deepcopy(raw), compiled)
+        return compiled
+
+    def invalidate(self, employee_id: Optional[int] = None) -> None:
+        """Forget one employee's compiled preferences, or all of them."""
+        with self._lock:
+            if employee_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(employee_id, None)
+
+
+preference_cache = PreferenceCache()
+
+
+def invalidate_preferences(employee_id: Optional[int] = None) -> None:
+    preference_cache.invalidate(employee_id)
+
+
+def preference_index(employees: Iterable[Any]) -> Dict[int, EmployeePreferences]:
+    """Compiled preferences per employee id; employees without preferences are omitted."""
+    index: Dict[int, EmployeePreferences] = {}
+    for employee in employees:
+        emp_id = cast(Optional[int], getattr(employee, "id", None))
+        if emp_id is None:
+            continue
+        compiled = preference_cache.get(emp_id, getattr(employee, "preferencje", None))
+        if not compiled.is_empty:
+            index[emp_id] = compiled
+    return index
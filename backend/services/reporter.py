@@ -3,7 +3,7 @@ from __future__ import annotations
 import csv
 import io
 from collections import Counter, defaultdict
-from datetime import date, datetime, time, timedelta
+from datetime import date, datetime, timedelta
 from typing import Any, Dict, Iterable, List, Optional, Tuple, cast
 
 from sqlalchemy.orm import Session
@@ -17,6 +17,7 @@ from ..models import (
     Rola,
     StaffingRequirementTemplate,
 )
+from .shift_rules import minutes_by_employee, shift_work_minutes
 
 
 def _extract_date(value: Any) -> Optional[date]:
@@ -32,30 +33,6 @@ def _extract_date(value: Any) -> Optional[date]:
         return None
 
 
-def _extract_time(value: Any) -> Optional[time]:
-    if isinstance(value, time):
-        return value
-    if isinstance(value, datetime):
-        return value.time()
-    if value is None:
-        return None
-    text = str(value)
-    for fmt in ("%H:%M:%S", "%H:%M"):
-        try:
-            return datetime.strptime(text, fmt).time()
-        except ValueError:
-            continue
-    return None
-
-
-def _combine_datetime(value_date: Any, value_time: Any) -> Optional[datetime]:
-    date_part = _extract_date(value_date)
-    time_part = _extract_time(value_time)
-    if date_part is None or time_part is None:
-        return None
-    return datetime.combine(date_part, time_part)
-
-
 def _to_int(value: Any) -> Optional[int]:
     if isinstance(value, int):
         return value
@@ -95,17 +72,19 @@ def build_report(session: Session, month: str) -> Dict[str, object]:
 
     minutes_per_employee: Counter[int] = Counter()
     minutes_per_role: Counter[str] = Counter()
+    shift_minutes: Dict[int, Optional[int]] = {}
 
     for entry in entries:
         shift = entry.zmiana
         employee = entry.pracownik
         if not shift or not employee:
             continue
-        combined_start = _combine_datetime(entry.data, shift.godzina_rozpoczecia)
-        combined_end = _combine_datetime(entry.data, shift.godzina_zakonczenia)
-        if combined_start is None or combined_end is None:
+        shift_id = cast(int, entry.zmiana_id)
+        if shift_id not in shift_minutes:
+            shift_minutes[shift_id] = shift_work_minutes(shift)
+        duration = shift_minutes[shift_id]
+        if duration is None:
             continue
-        duration = int((combined_end - combined_start).total_seconds() // 60)
         emp_id = _to_int(getattr(employee, "id", None))
         if emp_id is None:
             continue
@@ -283,23 +262,9 @@ def _calculate_overtime(
     month: str,
 ) -> Dict[str, Any]:
     """Calculate overtime hours per employee."""
-    hours_by_employee: Dict[int, float] = defaultdict(float)
-    
-    for entry in entries:
-        if not entry.pracownik or not entry.zmiana:
-            continue
-
-        combined_start = _combine_datetime(entry.data, entry.zmiana.godzina_rozpoczecia)
-        combined_end = _combine_datetime(entry.data, entry.zmiana.godzina_zakonczenia)
-        if combined_start is None or combined_end is None:
-            continue
-
-        duration_hours = (combined_end - combined_start).total_seconds() / 3600.0
-
-        emp_id = _to_int(getattr(entry.pracownik, "id", None))
-        if emp_id is None:
-            continue
-        hours_by_employee[emp_id] += duration_hours
+    # Paid minutes per shift (overnight shifts and breaks handled), summed as integers
+    minutes_by_emp = minutes_by_employee(entry for entry in entries if entry.pracownik)
+    hours_by_employee = {emp_id: minutes / 60.0 for emp_id, minutes in minutes_by_emp.items()}
     
     # Get employee limits
     employees = session.query(Pracownik).filter(
@@ -0,0 +1,248 @@
+"""
+Dense array view of one month's scheduling inputs.
+
+Absences, closed days, role membership, staffing demand and shift lengths are
+encoded once as NumPy arrays indexed by position (employee ``e``, day ``d``,
+shift ``s``, role ``r``). Generators and the validator then answer
+"who can work when" and "how many are covered" with array reductions instead
+of set lookups inside nested loops.
+"""
+
+from __future__ import annotations
+
+from calendar import monthrange
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple, cast
+
+import numpy as np
+
+from .shift_rules import shift_work_minutes
+from .staffing import StaffingBounds
+
+DEFAULT_MONTHLY_LIMIT_HOURS = 160
+UNBOUNDED_STAFF = -1
+
+
+def _shift_requirements(shift: Any) -> Dict[str, int]:
+    raw_requirements = getattr(shift, "wymagana_obsada", None)
+    if isinstance(raw_requirements, dict):
+        requirements = raw_requirements
+    elif raw_requirements:
+        requirements = dict(raw_requirements)
+    else:
+        requirements = {}
+    return {str(role_name): int(count) for role_name, count in requirements.items()}
+
+
+@dataclass
+class ScheduleContext:
+    """Availability, demand and shift data for one month as NumPy arrays.
+
+    ``availability`` masks absences and closed days only; which roles a shift
+    needs is expressed by ``requirements`` together with ``role_masks``.
+    ``min_staff``/``target_staff``/``max_staff`` hold the per-date bounds
+    resolved from staffing templates; without templates all three equal
+    ``requirements`` on every day.
+    """
+
+    year: int
+    month: int
+    employee_ids: List[int]
+    shift_ids: List[int]
+    role_names: List[str]
+    dates: List[date]
+    employee_role: np.ndarray  # (E,) role index, -1 for employees without a role
+    role_masks: np.ndarray  # (R, E) bool
+    open_days: np.ndarray  # (D,) bool, False on closed holidays
+    available: np.ndarray  # (E, D) bool, open day and not absent
+    availability: np.ndarray  # (E, D, S) bool
+    requirements: np.ndarray  # (R, S) legacy ``wymagana_obsada`` headcount per shift
+    min_staff: np.ndarray  # (R, D, S)
+    target_staff: np.ndarray  # (R, D, S)
+    max_staff: np.ndarray  # (R, D, S), UNBOUNDED_STAFF when there is no upper bound
+    shift_minutes: np.ndarray  # (S,) paid shift length in minutes (breaks deducted)
+    monthly_limit_minutes: np.ndarray  # (E,)
+    employee_index: Dict[int, int] = field(init=False, repr=False)
+    shift_index: Dict[int, int] = field(init=False, repr=False)
+    role_index: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.employee_index = {emp_id: idx for idx, emp_id in enumerate(self.employee_ids)}
+        self.shift_index = {shift_id: idx for idx, shift_id in enumerate(self.shift_ids)}
+        self.role_index = {role_name: idx for idx, role_name in enumerate(self.role_names)}
+
+    @classmethod
+    def build(
+        cls,
+        year: int,
+        month: int,
+        employees: Iterable[Any],
+        shifts: Iterable[Any],
+        absence_map: Mapping[date, Set[int]],
+        holidays: Iterable[Any] = (),
+        default_limit_hours: int = DEFAULT_MONTHLY_LIMIT_HOURS,
+        staffing: Optional[Mapping[Tuple[date, int, str], StaffingBounds]] = None,
+    ) -> "ScheduleContext":
+        """Encode one month; ``staffing`` comes from :func:`resolve_staffing`."""
+        last_day = monthrange(year, month)[1]
+        dates = [date(year, month, day) for day in range(1, last_day + 1)]
+
+        employee_ids: List[int] = []
+        employee_role_names: List[str] = []
+        limits: List[int] = []
+        for emp in employees:
+            emp_id = cast(Optional[int], getattr(emp, "id", None))
+            if emp_id is None:
+                continue
+            role = getattr(emp, "rola", None)
+            employee_ids.append(emp_id)
+            employee_role_names.append(cast(str, getattr(role, "nazwa_roli", "") or "") if role else "")
+            limit_raw = cast(Optional[int], getattr(emp, "limit_godzin_miesieczny", None))
+            limits.append((limit_raw if limit_raw is not None else default_limit_hours) * 60)
+
+        shift_ids: List[int] = []
+        shift_requirements: List[Dict[str, int]] = []
+        minutes: List[int] = []
+        for shift in shifts:
+            shift_id = cast(Optional[int], getattr(shift, "id", None))
+            if shift_id is None:
+                continue
+            shift_ids.append(shift_id)
+            shift_requirements.append(_shift_requirements(shift))
+            minutes.append(shift_work_minutes(shift) or 0)
+
+        # Roles held by employees first, then roles only demanded by shifts
+        role_names = list(dict.fromkeys([name for name in employee_role_names if name] + [
+            role_name for requirements in shift_requirements for role_name in requirements
+        ] + [role_name for _, _, role_name in (staffing or {})]))
+        role_index = {role_name: idx for idx, role_name in enumerate(role_names)}
+
+        employee_role = np.array([role_index.get(name, -1) for name in employee_role_names], dtype=np.int64)
+        role_masks = employee_role[np.newaxis, :] == np.arange(len(role_names))[:, np.newaxis]
+
+        requirements = np.zeros((len(role_names), len(shift_ids)), dtype=np.int64)
+        for s_idx, shift_reqs in enumerate(shift_requirements):
+            for role_name, count in shift_reqs.items():
+                requirements[role_index[role_name], s_idx] = count
+
+        min_staff = np.repeat(requirements[:, np.newaxis, :], len(dates), axis=1)
+        target_staff = min_staff.copy()
+        max_staff = min_staff.copy()
+        shift_positions = {shift_id: idx for idx, shift_id in enumerate(shift_ids)}
+        for (slot_date, shift_id, role_name), bounds in (staffing or {}).items():
+            s_pos = shift_positions.get(shift_id)
+            if s_pos is None or slot_date.year != year or slot_date.month != month:
+                continue
+            slot = (role_index[role_name], slot_date.day - 1, s_pos)
+            min_staff[slot] = bounds.min_staff
+            target_staff[slot] = bounds.target_staff
+            max_staff[slot] = UNBOUNDED_STAFF if bounds.max_staff is None else bounds.max_staff
+
+        open_days = np.ones(len(dates), dtype=bool)
+        for holiday in holidays:
+            holiday_date = getattr(holiday, "date", None)
+            if (
+                isinstance(holiday_date, date)
+                and holiday_date.year == year
+                and holiday_date.month == month
+                and bool(getattr(holiday, "store_closed", False))
+            ):
+                open_days[holiday_date.day - 1] = False
+
+        emp_positions = {emp_id: idx for idx, emp_id in enumerate(employee_ids)}
+        absent = np.zeros((len(employee_ids), len(dates)), dtype=bool)
+        for absence_date, absent_ids in absence_map.items():
+            if absence_date.year != year or absence_date.month != month:
+                continue
+            rows = [emp_positions[emp_id] for emp_id in absent_ids if emp_id in emp_positions]
+            absent[rows, absence_date.day - 1] = True
+        available = ~absent & open_days[np.newaxis, :]
+        availability = np.repeat(available[:, :, np.newaxis], len(shift_ids), axis=2)
+
+        return cls(
+            year=year,
+            month=month,
+            employee_ids=employee_ids,
+            shift_ids=shift_ids,
+            role_names=role_names,
+            dates=dates,
+            employee_role=employee_role,
+            role_masks=role_masks,
+            open_days=open_days,
+            available=available,
+            availability=availability,
+            requirements=requirements,
+            min_staff=min_staff,
+            target_staff=target_staff,
+            max_staff=max_staff,
+            shift_minutes=np.array(minutes, dtype=np.int64),
+            monthly_limit_minutes=np.array(limits, dtype=np.int64),
+        )
+
+    def available_by_role(self) -> np.ndarray:
+        """(R, D) headcount of each role able to work each day."""
+        return self.role_masks.astype(np.int64) @ self.available.astype(np.int64)
+
+    def demand(self) -> np.ndarray:
+        """(R, D, S) minimum required headcount; zero on closed days."""
+        return self.min_staff * self.open_days[np.newaxis, :, np.newaxis]
+
+    def role_components(self) -> List[Tuple[List[int], List[str]]]:
+        """Employee ids and role names of each independent part of the month.
+
+        Coverage is the only constraint family spanning several employees and
+        it is stated per role, so with one role per employee every staffed
+        role is a component of its own. Employees without a role share one
+        component without roles.
+        """
+        components: List[Tuple[List[int], List[str]]] = []
+        for r_idx, role_name in enumerate(self.role_names):
+            members = [self.employee_ids[int(e_idx)] for e_idx in np.flatnonzero(self.role_masks[r_idx])]
+            if members:
+                components.append((members, [role_name]))
+        without_role = [self.employee_ids[int(e_idx)] for e_idx in np.flatnonzero(self.employee_role < 0)]
+        if without_role:
+            components.append((without_role, []))
+        return components
+
+    def unstaffed_demand(self) -> bool:
+        """True when some role with demand has no employees at all."""
+        return bool(self.demand()[~self.role_masks.any(axis=1)].any())
+
+    def index_assignments(
+        self, assignments: Iterable[Tuple[int, date, int]]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Positions ``(e, d, s)`` of ``(employee_id, date, shift_id)`` tuples.
+
+        Returns ``None`` when a tuple lies outside this context (unknown
+        employee or shift, or a date from another month).
+        """
+        e_idx: List[int] = []
+        d_idx: List[int] = []
+        s_idx: List[int] = []
+        for emp_id, entry_date, shift_id in assignments:
+            e_pos = self.employee_index.get(emp_id)
+            s_pos = self.shift_index.get(shift_id)
+            if e_pos is None or s_pos is None or entry_date.year != self.year or entry_date.month != self.month:
+                return None
+            e_idx.append(e_pos)
+            d_idx.append(entry_date.day - 1)
+            s_idx.append(s_pos)
+        return (
+            np.array(e_idx, dtype=np.int64),
+            np.array(d_idx, dtype=np.int64),
+            np.array(s_idx, dtype=np.int64),
+        )
+
+    def coverage(self, e_idx: np.ndarray, d_idx: np.ndarray, s_idx: np.ndarray) -> np.ndarray:
+        """(R, D, S) headcount per role of the given assignment positions."""
+        counts = np.zeros((len(self.role_names), len(self.dates), len(self.shift_ids)), dtype=np.int64)
+        roles = self.employee_role[e_idx]
+        with_role = roles >= 0
+        np.add.at(counts, (roles[with_role], d_idx[with_role], s_idx[with_role]), 1)
+        return counts
+
+    def worked_minutes(self, e_idx: np.ndarray, s_idx: np.ndarray) -> np.ndarray:
+        """(E,) minutes worked per employee for the given assignment positions."""
+        return np.bincount(e_idx, weights=self.shift_minutes[s_idx], minlength=len(self.employee_ids)).astype(np.int64)
@@ -0,0 +1,183 @@
+"""
+Shift timing rules shared by the generators and the validator.
+
+Shift start/end times are converted to integer minutes once per run, so the
+rest gap between any two shifts and the paid length of a shift become plain
+integer arithmetic instead of repeated ``datetime.combine`` calls.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import time
+from typing import Any, DefaultDict, Dict, FrozenSet, Iterable, List, Optional, Tuple, cast
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_MIN_REST_HOURS = 11
+DAILY_REST_RULE_CODES = {"odpoczynek_dobowy", "rest_daily"}
+# Night time (pora nocna) 22:00-06:00
+NIGHT_START_MINUTES = 22 * 60
+NIGHT_END_MINUTES = 6 * 60
+
+
+def _to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def shift_duration_minutes(start: time, end: time) -> int:
+    """Length of a shift in minutes; an end at or before the start means it ends the next day."""
+    start_min = _to_minutes(start)
+    end_min = _to_minutes(end)
+    if end_min <= start_min:
+        end_min += MINUTES_PER_DAY
+    return end_min - start_min
+
+
+def shift_work_minutes(shift: Any) -> Optional[int]:
+    """Paid minutes of ``shift``: its length (across midnight) minus ``przerwa_minuty``.
+
+    Returns ``None`` when the shift has no valid start or end time.
+    """
+    start = getattr(shift, "godzina_rozpoczecia", None)
+    end = getattr(shift, "godzina_zakonczenia", None)
+    if not isinstance(start, time) or not isinstance(end, time):
+        return None
+    break_minutes = cast(Optional[int], getattr(shift, "przerwa_minuty", None)) or 0
+    return max(0, shift_duration_minutes(start, end) - int(break_minutes))
+
+
+def shift_minutes_table(shifts: Iterable[Any]) -> Dict[int, int]:
+    """Paid minutes keyed by shift id; shifts without valid times are left out."""
+    table: Dict[int, int] = {}
+    for shift in shifts:
+        shift_id = cast(Optional[int], getattr(shift, "id", None))
+        minutes = shift_work_minutes(shift)
+        if shift_id is not None and minutes is not None:
+            table.setdefault(shift_id, minutes)
+    return table
+
+
+def minutes_by_employee(entries: Iterable[Any]) -> Dict[int, int]:
+    """Paid minutes per ``pracownik_id``, looking each entry's shift length up once per shift."""
+    durations: Dict[Any, Optional[int]] = {}
+    totals: DefaultDict[int, int] = defaultdict(int)
+    for entry in entries:
+        employee_id = getattr(entry, "pracownik_id", None)
+        shift = getattr(entry, "zmiana", None)
+        if not isinstance(employee_id, int) or shift is None:
+            continue
+        shift_key = getattr(entry, "zmiana_id", None) or id(shift)
+        if shift_key not in durations:
+            durations[shift_key] = shift_work_minutes(shift)
+        minutes = durations[shift_key]
+        if minutes is not None:
+            totals[employee_id] += minutes
+    return dict(totals)
+
+
+def is_night_shift(start_minutes: int, end_minutes: int) -> bool:
+    """True when at least half of a shift falls into night time (22:00-06:00).
+
+    ``end_minutes`` is after ``start_minutes``, i.e. past ``MINUTES_PER_DAY``
+    for overnight shifts.
+    """
+    windows = (
+        (NIGHT_START_MINUTES - MINUTES_PER_DAY, NIGHT_END_MINUTES),
+        (NIGHT_START_MINUTES, NIGHT_END_MINUTES + MINUTES_PER_DAY),
+    )
+    night = sum(max(0, min(end_minutes, high) - max(start_minutes, low)) for low, high in windows)
+    return end_minutes > start_minutes and 2 * night >= end_minutes - start_minutes
+
+
+def resolve_min_rest_hours(rules: Iterable[Any], default: int = DEFAULT_MIN_REST_HOURS) -> int:
+    """Return ``min_hours`` of the first daily rest rule, or ``default``."""
+    for rule in rules:
+        rule_code = cast(str, getattr(rule, "code", "") or "")
+        if rule_code.lower() in DAILY_REST_RULE_CODES:
+            parameters = getattr(rule, "parameters", None)
+            if isinstance(parameters, dict):
+                return int(parameters.get("min_hours", default))
+            break
+    return default
+
+
+@dataclass
+class ShiftRestMatrix:
+    """Rest compatibility between every pair of shifts.
+
+    ``start_minutes`` and ``end_minutes`` are offsets from midnight of the day
+    the shift starts; overnight shifts end after ``MINUTES_PER_DAY``.
+    """
+
+    min_rest_minutes: int
+    start_minutes: Dict[int, int] = field(default_factory=dict)
+    end_minutes: Dict[int, int] = field(default_factory=dict)
+    # shift worked on day d -> shifts that may not be worked on day d+1
+    next_day_conflicts: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+    # unordered pairs of shifts that may not be worked on the same day
+    same_day_conflicts: FrozenSet[Tuple[int, int]] = frozenset()
+
+    @classmethod
+    def build(cls, shifts: Iterable[Any], min_rest_hours: int = DEFAULT_MIN_REST_HOURS) -> "ShiftRestMatrix":
+        matrix = cls(min_rest_minutes=int(min_rest_hours * 60))
+        for shift in shifts:
+            shift_id = cast(Optional[int], getattr(shift, "id", None))
+            start = getattr(shift, "godzina_rozpoczecia", None)
+            end = getattr(shift, "godzina_zakonczenia", None)
+            if shift_id is None or shift_id in matrix.start_minutes:
+                continue
+            if not isinstance(start, time) or not isinstance(end, time):
+                continue
+            start_min = _to_minutes(start)
+            end_min = _to_minutes(end)
+            # Handle overnight shifts
+            if end_min <= start_min:
+                end_min += MINUTES_PER_DAY
+            matrix.start_minutes[shift_id] = start_min
+            matrix.end_minutes[shift_id] = end_min
+
+        shift_ids = list(matrix.start_minutes)
+        same_day = set()
+        for prev_id in shift_ids:
+            matrix.next_day_conflicts[prev_id] = frozenset(
+                next_id for next_id in shift_ids if matrix.violates(prev_id, next_id, day_gap=1)
+            )
+            for next_id in shift_ids:
+                if prev_id < next_id and matrix.violates(prev_id, next_id, 0) and matrix.violates(next_id, prev_id, 0):
+                    same_day.add((prev_id, next_id))
+        matrix.same_day_conflicts = frozenset(same_day)
+        return matrix
+
+    def rest_minutes(self, prev_shift_id: int, next_shift_id: int, day_gap: int = 1) -> Optional[int]:
+        """Minutes between the end of ``prev`` and the start of ``next`` started ``day_gap`` days later."""
+        prev_end = self.end_minutes.get(prev_shift_id)
+        next_start = self.start_minutes.get(next_shift_id)
+        if prev_end is None or next_start is None:
+            return None
+        return day_gap * MINUTES_PER_DAY + next_start - prev_end
+
+    def violates(self, prev_shift_id: int, next_shift_id: int, day_gap: int = 1) -> bool:
+        rest = self.rest_minutes(prev_shift_id, next_shift_id, day_gap)
+        return rest is not None and rest < self.min_rest_minutes
+
+    def conflicts_same_day(self, first_id: int, second_id: int) -> bool:
+        pair = (first_id, second_id) if first_id < second_id else (second_id, first_id)
+        return pair in self.same_day_conflicts
+
+    def is_same_day_clique(self, shift_ids: Iterable[int]) -> bool:
+        """True when no two of ``shift_ids`` can be worked on the same day."""
+        ids = list(shift_ids)
+        return all(
+            self.conflicts_same_day(ids[i], ids[j])
+            for i in range(len(ids))
+            for j in range(i + 1, len(ids))
+        )
+
+    def next_day_conflict_groups(self) -> List[Tuple[List[int], FrozenSet[int]]]:
+        """Group day-d shifts that share the same set of forbidden day-(d+1) shifts."""
+        grouped: DefaultDict[FrozenSet[int], List[int]] = defaultdict(list)
+        for shift_id, conflicts in self.next_day_conflicts.items():
+            if conflicts:
+                grouped[conflicts].append(shift_id)
+        return [(shift_ids, conflicts) for conflicts, shift_ids in grouped.items()]
@@ -0,0 +1,180 @@
+"""
+Per-date staffing requirements for the generators.
+
+Each date of a month is first mapped to a day type (``WEEKDAY``, ``WEEKEND``
+or ``HOLIDAY``, or the type a holiday's ``coverage_overrides`` names). The
+min/target/max headcount of every (day, shift, role) slot is then resolved,
+in order of precedence, from:
+
+1. ``Holiday.coverage_overrides["staffing"]`` entries for that date,
+2. ``StaffingRequirementTemplate`` rows for the day type effective that day
+   (a ``HOLIDAY`` without templates of its own uses the weekday/weekend ones),
+3. the legacy ``Zmiana.wymagana_obsada`` JSON, as an exact count.
+
+``coverage_overrides`` is optional and only read when it is a dict::
+
+    {
+        "day_type": "WEEKEND",
+        "staffing": [
+            {"shift_id": 1, "role": "Kasjer", "min_staff": 1, "target_staff": 2, "max_staff": 3}
+        ]
+    }
+"""
+
+from __future__ import annotations
+
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, cast
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..models import Rola, StaffingRequirementTemplate
+
+DAY_TYPE_WEEKDAY = "WEEKDAY"
+DAY_TYPE_WEEKEND = "WEEKEND"
+DAY_TYPE_HOLIDAY = "HOLIDAY"
+
+
+@dataclass(frozen=True)
+class StaffingBounds:
+    """Headcount bounds of one slot; ``max_staff`` None means unbounded."""
+
+    min_staff: int
+    target_staff: int
+    max_staff: Optional[int]
+
+    @classmethod
+    def exact(cls, count: int) -> "StaffingBounds":
+        return cls(count, count, count)
+
+    @property
+    def is_exact(self) -> bool:
+        return self.max_staff is not None and self.min_staff == self.max_staff
+
+
+def _base_day_type(current_date: date) -> str:
+    return DAY_TYPE_WEEKEND if current_date.weekday() >= 5 else DAY_TYPE_WEEKDAY
+
+
+def _overrides(holiday: Any) -> Dict[str, Any]:
+    overrides = getattr(holiday, "coverage_overrides", None)
+    return overrides if isinstance(overrides, dict) else {}
+
+
+def day_type_calendar(year: int, month: int, holidays: Iterable[Any] = ()) -> Dict[date, str]:
+    """Day type of every date of the month."""
+    calendar = {
+        date(year, month, day): _base_day_type(date(year, month, day))
+        for day in range(1, monthrange(year, month)[1] + 1)
+    }
+    for holiday in holidays:
+        holiday_date = getattr(holiday, "date", None)
+        if not isinstance(holiday_date, date) or holiday_date not in calendar:
+            continue
+        override_type = _overrides(holiday).get("day_type")
+        calendar[holiday_date] = str(override_type) if override_type else DAY_TYPE_HOLIDAY
+    return calendar
+
+
+def load_staffing_templates(session: Session, month_start: date, month_end: date) -> List[Tuple[Any, str]]:
+    """Templates effective at some point of the month, paired with their role name."""
+    return [
+        (template, cast(str, role_name))
+        for template, role_name in (
+            session.query(StaffingRequirementTemplate, Rola.nazwa_roli)
+            .join(Rola, StaffingRequirementTemplate.role_id == Rola.id)
+            .filter(
+                or_(
+                    StaffingRequirementTemplate.effective_from.is_(None),
+                    StaffingRequirementTemplate.effective_from <= month_end,
+                ),
+                or_(
+                    StaffingRequirementTemplate.effective_to.is_(None),
+                    StaffingRequirementTemplate.effective_to >= month_start,
+                ),
+            )
+            .all()
+        )
+    ]
+
+
+def _bounds(raw: Mapping[str, Any]) -> StaffingBounds:
+    min_staff = int(raw.get("min_staff") or 0)
+    target = raw.get("target_staff")
+    max_staff = raw.get("max_staff")
+    target_staff = max(int(target), min_staff) if target is not None else min_staff
+    if max_staff is not None:
+        max_staff = max(int(max_staff), min_staff)
+        target_staff = min(target_staff, max_staff)
+    return StaffingBounds(min_staff, target_staff, max_staff)
+
+
+def _effective(template: Any, current_date: date) -> bool:
+    effective_from = getattr(template, "effective_from", None)
+    effective_to = getattr(template, "effective_to", None)
+    return (effective_from is None or effective_from <= current_date) and (
+        effective_to is None or effective_to >= current_date
+    )
+
+
+def resolve_staffing(
+    calendar: Mapping[date, str],
+    shift_requirements: Mapping[int, Mapping[str, int]],
+    templates: Iterable[Tuple[Any, str]] = (),
+    holidays: Iterable[Any] = (),
+    role_names_by_id: Optional[Mapping[int, str]] = None,
+) -> Dict[Tuple[date, int, str], StaffingBounds]:
+    """Resolve min/target/max for every (date, shift, role) slot with demand.
+
+    Args:
+        calendar: Output of :func:`day_type_calendar` for the dates to resolve
+        shift_requirements: Legacy ``wymagana_obsada`` per shift id
+        templates: ``(StaffingRequirementTemplate, role_name)`` pairs
+        holidays: Holidays of the month (for ``coverage_overrides["staffing"]``)
+        role_names_by_id: Used for override entries that give ``role_id``
+    """
+    by_day_type: Dict[str, List[Tuple[Any, str]]] = {}
+    for template, role_name in templates:
+        by_day_type.setdefault(cast(str, getattr(template, "day_type", "")), []).append((template, role_name))
+
+    overrides_by_date: Dict[date, List[Mapping[str, Any]]] = {}
+    for holiday in holidays:
+        holiday_date = getattr(holiday, "date", None)
+        entries = _overrides(holiday).get("staffing")
+        if isinstance(holiday_date, date) and isinstance(entries, list):
+            overrides_by_date[holiday_date] = [entry for entry in entries if isinstance(entry, dict)]
+
+    staffing: Dict[Tuple[date, int, str], StaffingBounds] = {}
+    for current_date, day_type in calendar.items():
+        for shift_id, requirements in shift_requirements.items():
+            for role_name, count in requirements.items():
+                staffing[(current_date, shift_id, role_name)] = StaffingBounds.exact(int(count))
+
+        day_templates = by_day_type.get(day_type)
+        if day_templates is None and day_type == DAY_TYPE_HOLIDAY:
+            day_templates = by_day_type.get(_base_day_type(current_date))
+        for template, role_name in day_templates or []:
+            shift_id = cast(int, getattr(template, "shift_id", None))
+            if shift_id in shift_requirements and _effective(template, current_date):
+                staffing[(current_date, shift_id, role_name)] = _bounds(
+                    {
+                        "min_staff": getattr(template, "min_staff", 0),
+                        "target_staff": getattr(template, "target_staff", None),
+                        "max_staff": getattr(template, "max_staff", None),
+                    }
+                )
+
+        for entry in overrides_by_date.get(current_date, []):
+            try:
+                shift_id = int(entry["shift_id"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            role_name = entry.get("role")
+            if role_name is None and role_names_by_id is not None and entry.get("role_id") is not None:
+                role_name = role_names_by_id.get(int(entry["role_id"]))
+            if shift_id in shift_requirements and role_name:
+                staffing[(current_date, shift_id, str(role_name))] = _bounds(entry)
+    return staffing
@@ -2,22 +2,21 @@ from __future__ import annotations
 
 from collections import defaultdict
 from dataclasses import dataclass
-from datetime import date, datetime, time, timedelta
-from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Sequence, cast
+from datetime import date
+from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Sequence, Tuple, cast
 
+import numpy as np
 from sqlalchemy.orm import Session
 
 from ..models import GrafikEntry, Zmiana, Holiday, LaborLawRule, Pracownik
+from .schedule_context import ScheduleContext
+from .shift_rules import DEFAULT_MIN_REST_HOURS, ShiftRestMatrix, minutes_by_employee
 
 
 def _extract_date(value: Any) -> Optional[date]:
     return value if isinstance(value, date) else None
 
 
-def _extract_time(value: Any) -> Optional[time]:
-    return value if isinstance(value, time) else None
-
-
 def _extract_int(value: Any) -> Optional[int]:
     return int(value) if isinstance(value, (int,)) else None
 
@@ -39,47 +38,91 @@ def _group_entries(entries: Sequence[GrafikEntry]):
     return per_day
 
 
-def check_daily_rest(entries: Sequence[GrafikEntry]) -> List[ValidationIssue]:
-    issues: List[ValidationIssue] = []
-    per_employee: DefaultDict[int, List[GrafikEntry]] = defaultdict(list)
+def _entry_shift_id(entry: GrafikEntry) -> Optional[int]:
+    shift_id = _extract_int(getattr(entry, "zmiana_id", None))
+    if shift_id is None:
+        shift = getattr(entry, "zmiana", None)
+        shift_id = _extract_int(getattr(shift, "id", None)) if shift else None
+    return shift_id
+
 
+def _daily_rest_violations(
+    entries: Sequence[GrafikEntry],
+    rest_matrix: ShiftRestMatrix,
+) -> List[Tuple[int, date, date]]:
+    """Return (employee_id, previous_date, current_date) for every rest gap below the minimum."""
+    per_employee: DefaultDict[int, List[Tuple[date, int]]] = defaultdict(list)
     for entry in entries:
         employee_id = _extract_int(getattr(entry, "pracownik_id", None))
-        if employee_id is None:
+        entry_date = _extract_date(getattr(entry, "data", None))
+        shift_id = _entry_shift_id(entry)
+        if employee_id is None or entry_date is None or shift_id is None:
             continue
-        per_employee[employee_id].append(entry)
-
-    for employee_id, emp_entries in per_employee.items():
-        emp_entries.sort(key=lambda item: _extract_date(getattr(item, "data", None)) or date.min)
-        for idx in range(1, len(emp_entries)):
-            prev = emp_entries[idx - 1]
-            current = emp_entries[idx]
-            prev_date = _extract_date(getattr(prev, "data", None))
-            current_date = _extract_date(getattr(current, "data", None))
-            prev_shift = getattr(prev, "zmiana", None)
-            current_shift = getattr(current, "zmiana", None)
-            prev_end = _extract_time(getattr(prev_shift, "godzina_zakonczenia", None)) if prev_shift else None
-            current_start = _extract_time(getattr(current_shift, "godzina_rozpoczecia", None)) if current_shift else None
-            if prev_date is None or current_date is None or prev_end is None or current_start is None:
-                continue
-            time_between = (
-                datetime.combine(current_date, current_start)
-                - datetime.combine(prev_date, prev_end)
-            )
-            if time_between < timedelta(hours=11):
-                issues.append(
-                    ValidationIssue(
-                        level="warning",
-                        message=(
-                            f"Pracownik ID {employee_id} ma mniej niż 11 godzin odpoczynku "
-                            f"między zmianami {prev_date} i {current_date}"
-                        ),
-                    )
-                )
-    return issues
+        per_employee[employee_id].append((entry_date, shift_id))
+
+    violations: List[Tuple[int, date, date]] = []
+    for employee_id, worked in per_employee.items():
+        worked.sort(key=lambda item: (item[0], rest_matrix.start_minutes.get(item[1], 0)))
+        for idx in range(1, len(worked)):
+            prev_date, prev_shift_id = worked[idx - 1]
+            current_date, current_shift_id = worked[idx]
+            day_gap = (current_date - prev_date).days
+            if rest_matrix.violates(prev_shift_id, current_shift_id, day_gap):
+                violations.append((employee_id, prev_date, current_date))
+    return violations
 
 
-def check_weekly_rest(entries: Sequence[GrafikEntry]) -> List[ValidationIssue]:
+def _with_previous(
+    entries: Sequence[GrafikEntry],
+    previous_entries: Sequence[GrafikEntry],
+) -> Tuple[List[GrafikEntry], Optional[date]]:
+    """Prepend boundary context; returns the entries to scan and the first checked date.
+
+    Violations ending before the first date of ``entries`` belong to the
+    previous period and are not reported again.
+    """
+    if not previous_entries:
+        return list(entries), None
+    entry_dates = [_extract_date(getattr(entry, "data", None)) for entry in entries]
+    dates = [entry_date for entry_date in entry_dates if entry_date is not None]
+    return list(previous_entries) + list(entries), min(dates) if dates else None
+
+
+def _rest_matrix_for_entries(entries: Sequence[GrafikEntry], min_hours: int) -> ShiftRestMatrix:
+    return ShiftRestMatrix.build(
+        (shift for shift in (getattr(entry, "zmiana", None) for entry in entries) if shift is not None),
+        min_hours,
+    )
+
+
+def check_daily_rest(
+    entries: Sequence[GrafikEntry],
+    rest_matrix: Optional[ShiftRestMatrix] = None,
+    previous_entries: Sequence[GrafikEntry] = (),
+) -> List[ValidationIssue]:
+    """``previous_entries`` (e.g. the previous month's tail) only serve as context."""
+    entries, checked_from = _with_previous(entries, previous_entries)
+    if rest_matrix is None:
+        rest_matrix = _rest_matrix_for_entries(entries, DEFAULT_MIN_REST_HOURS)
+    min_hours = rest_matrix.min_rest_minutes // 60
+    return [
+        ValidationIssue(
+            level="warning",
+            message=(
+                f"Pracownik ID {employee_id} ma mniej niż {min_hours} godzin odpoczynku "
+                f"między zmianami {prev_date} i {current_date}"
+            ),
+        )
+        for employee_id, prev_date, current_date in _daily_rest_violations(entries, rest_matrix)
+        if checked_from is None or current_date >= checked_from
+    ]
+
+
+def check_weekly_rest(
+    entries: Sequence[GrafikEntry],
+    previous_entries: Sequence[GrafikEntry] = (),
+) -> List[ValidationIssue]:
+    entries, checked_from = _with_previous(entries, previous_entries)
     issues: List[ValidationIssue] = []
     per_employee: DefaultDict[int, List[date]] = defaultdict(list)
     for entry in entries:
@@ -92,6 +135,8 @@ def check_weekly_rest(entries: Sequence[GrafikEntry]) -> List[ValidationIssue]:
     for employee_id, work_days in per_employee.items():
         work_days.sort()
         for i in range(len(work_days) - 6):
+            if checked_from is not None and work_days[i + 6] < checked_from:
+                continue
             if all((work_days[i+j+1] - work_days[i+j]).days == 1 for j in range(6)):
                 issues.append(
                     ValidationIssue(
@@ -104,22 +149,9 @@ def check_weekly_rest(entries: Sequence[GrafikEntry]) -> List[ValidationIssue]:
 
 def check_working_hours_limit(entries: Sequence[GrafikEntry], limit_hours: int) -> List[ValidationIssue]:
     issues: List[ValidationIssue] = []
-    per_employee: DefaultDict[int, float] = defaultdict(float)
-    for entry in entries:
-        employee_id = _extract_int(getattr(entry, "pracownik_id", None))
-        shift = getattr(entry, "zmiana", None)
-        start_time = _extract_time(getattr(shift, "godzina_rozpoczecia", None)) if shift else None
-        end_time = _extract_time(getattr(shift, "godzina_zakonczenia", None)) if shift else None
-        if employee_id is None or start_time is None or end_time is None:
-            continue
-        duration = (
-            datetime.combine(date.today(), end_time)
-            - datetime.combine(date.today(), start_time)
-        ).total_seconds() / 3600
-        per_employee[employee_id] += duration
-
-    for employee_id, total_hours in per_employee.items():
-        if total_hours > limit_hours:
+    for employee_id, total_minutes in minutes_by_employee(entries).items():
+        total_hours = total_minutes / 60
+        if total_minutes > limit_hours * 60:
             issues.append(
                 ValidationIssue(
                     level="warning",
@@ -154,10 +186,54 @@ def check_holidays(entries: Sequence[GrafikEntry], holidays: List[Holiday]) -> L
     return issues
 
 
+def _coverage_issues_from_context(
+    entries: Sequence[GrafikEntry],
+    context: ScheduleContext,
+) -> Optional[List[ValidationIssue]]:
+    """Array-based coverage check; ``None`` when an entry falls outside ``context``."""
+    keys = []
+    for entry in entries:
+        employee_id = _extract_int(getattr(entry, "pracownik_id", None))
+        entry_date = _extract_date(getattr(entry, "data", None))
+        shift_id = _extract_int(getattr(entry, "zmiana_id", None))
+        if employee_id is None or entry_date is None or shift_id is None:
+            continue
+        keys.append((employee_id, entry_date, shift_id))
+    positions = context.index_assignments(keys)
+    if positions is None:
+        return None
+    e_idx, d_idx, s_idx = positions
+
+    # Like the loop-based check, only (day, shift) cells holding entries are checked
+    staffed_cells = np.zeros((len(context.dates), len(context.shift_ids)), dtype=bool)
+    staffed_cells[d_idx, s_idx] = True
+    missing = context.min_staff - context.coverage(e_idx, d_idx, s_idx)
+    missing = np.where(staffed_cells[np.newaxis, :, :], missing, 0)
+
+    issues: List[ValidationIssue] = []
+    for d_pos, s_pos, r_pos in np.argwhere(missing.transpose(1, 2, 0) > 0):
+        issues.append(
+            ValidationIssue(
+                level="error",
+                message=(
+                    f"{context.dates[d_pos].isoformat()} zmiana {context.shift_ids[s_pos]}: "
+                    f"brakuje {missing[r_pos, d_pos, s_pos]} pracowników w roli {context.role_names[r_pos]}"
+                ),
+            )
+        )
+    return issues
+
+
 def check_shift_coverage(
     entries: Sequence[GrafikEntry],
     shifts: Iterable[Zmiana],
+    context: Optional[ScheduleContext] = None,
 ) -> List[ValidationIssue]:
+    if context is not None:
+        context_issues = _coverage_issues_from_context(entries, context)
+        if context_issues is not None:
+            return context_issues
+
     shift_requirements: Dict[int, Dict[str, int]] = {}
     for shift in shifts:
         shift_id = _extract_int(getattr(shift, "id", None))
@@ -210,18 +286,29 @@ def check_shift_coverage(
     return issues
 
 
-def validate_schedule(entries: Sequence[GrafikEntry], shifts: Iterable[Zmiana], holidays: List[Holiday]):
+def validate_schedule(
+    entries: Sequence[GrafikEntry],
+    shifts: Iterable[Zmiana],
+    holidays: List[Holiday],
+    rest_matrix: Optional[ShiftRestMatrix] = None,
+    context: Optional[ScheduleContext] = None,
+    previous_entries: Sequence[GrafikEntry] = (),
+):
     """
     Validate schedule using hardcoded validation rules.
     
     For database-driven validation with LaborLawRule, use validate_schedule_with_rules().
+    Callers that already hold a ``ShiftRestMatrix`` or ``ScheduleContext``
+    (e.g. the generators) can pass them to skip rebuilding per-entry lookups.
+    ``previous_entries`` extends the rest checks across the start of the
+    period without re-reporting issues that lie entirely before it.
     """
     issues = []
-    issues.extend(check_daily_rest(entries))
-    issues.extend(check_weekly_rest(entries))
+    issues.extend(check_daily_rest(entries, rest_matrix, previous_entries))
+    issues.extend(check_weekly_rest(entries, previous_entries))
     issues.extend(check_working_hours_limit(entries, 40))  # Przykładowy limit
     issues.extend(check_holidays(entries, holidays))
-    issues.extend(check_shift_coverage(entries, shifts))
+    issues.extend(check_shift_coverage(entries, shifts, context))
     return issues
 
 
@@ -271,41 +358,18 @@ def validate_schedule_with_rules(
         severity_value = getattr(daily_rest_rule, "severity", "warning")
         severity_level = "error" if severity_value == "HARD" else "warning"
         
-        per_employee_entries: DefaultDict[int, List[GrafikEntry]] = defaultdict(list)
-        for entry in entries:
-            employee_id = _extract_int(getattr(entry, "pracownik_id", None))
-            if employee_id is None:
-                continue
-            per_employee_entries[employee_id].append(entry)
-        
-        for employee_id, emp_entries in per_employee_entries.items():
-            emp_entries.sort(key=lambda item: _extract_date(getattr(item, "data", None)) or date.min)
-            for idx in range(1, len(emp_entries)):
-                prev = emp_entries[idx - 1]
-                current = emp_entries[idx]
-                prev_date = _extract_date(getattr(prev, "data", None))
-                current_date = _extract_date(getattr(current, "data", None))
-                prev_shift = getattr(prev, "zmiana", None)
-                current_shift = getattr(current, "zmiana", None)
-                prev_end = _extract_time(getattr(prev_shift, "godzina_zakonczenia", None)) if prev_shift else None
-                current_start = _extract_time(getattr(current_shift, "godzina_rozpoczecia", None)) if current_shift else None
-                if prev_date is None or current_date is None or prev_end is None or current_start is None:
-                    continue
-                time_between = (
-                    datetime.combine(current_date, current_start)
-                    - datetime.combine(prev_date, prev_end)
+        rest_matrix = _rest_matrix_for_entries(entries, min_hours)
+        for employee_id, prev_date, current_date in _daily_rest_violations(entries, rest_matrix):
+            issues.append(
+                ValidationIssue(
+                    level=severity_level,
+                    message=(
+                        f"Pracownik ID {employee_id} ma mniej niż {min_hours} godzin odpoczynku "
+                        f"między zmianami {prev_date} i {current_date}"
+                    ),
+                    rule_code=cast(str, getattr(daily_rest_rule, "code", None)),
                 )
-                if time_between < timedelta(hours=min_hours):
-                    issues.append(
-                        ValidationIssue(
-                            level=severity_level,
-                            message=(
-                                f"Pracownik ID {employee_id} ma mniej niż {min_hours} godzin odpoczynku "
-                                f"między zmianami {prev_date} i {current_date}"
-                            ),
-                            rule_code=cast(str, getattr(daily_rest_rule, "code", None)),
-                        )
-                    )
+            )
     
     # Validate weekly rest using rule parameters
     weekly_rest_rule = rules_by_code.get("odpoczynek_tygodniowy")
@@ -343,27 +407,14 @@ def validate_schedule_with_rules(
         severity_value = getattr(hours_limit_rule, "severity", "warning")
         severity_level = "error" if severity_value == "HARD" else "warning"
         
-        per_employee_hours: DefaultDict[int, float] = defaultdict(float)
-        for entry in entries:
-            employee_id = _extract_int(getattr(entry, "pracownik_id", None))
-            shift = getattr(entry, "zmiana", None)
-            start_time = _extract_time(getattr(shift, "godzina_rozpoczecia", None)) if shift else None
-            end_time = _extract_time(getattr(shift, "godzina_zakonczenia", None)) if shift else None
-            if employee_id is None or start_time is None or end_time is None:
-                continue
-            duration = (
-                datetime.combine(date.today(), end_time)
-                - datetime.combine(date.today(), start_time)
-            ).total_seconds() / 3600
-            per_employee_hours[employee_id] += duration
-        
-        for employee_id, total_hours in per_employee_hours.items():
+        for employee_id, total_minutes in minutes_by_employee(entries).items():
+            total_hours = total_minutes / 60
             # Check employee-specific limit or use default
             employee = session.get(Pracownik, employee_id)
             limit_attr = getattr(employee, "limit_godzin_miesieczny", None) if employee else None
             limit = limit_attr if isinstance(limit_attr, int) else default_limit
             
-            if total_hours > limit:
+            if total_minutes > limit * 60:
                 issues.append(
                     ValidationIssue(
                         level=severity_level,
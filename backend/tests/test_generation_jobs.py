@@ -0,0 +1,165 @@
+import threading
+import time
+
+from backend.services.jobs import (
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    GenerationJobManager,
+    JobCancelled,
+)
+
+
+def wait_for(job, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if job.status in {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"job still {job.status}")
+
+
+def test_job_reports_progress_and_result():
+    manager = GenerationJobManager(max_workers=1)
+
+    def work(job):
+        job.report_progress({"solutions": 1, "objective": 10.0, "elapsed_s": 0.1})
+        job.report_progress({"solutions": 2, "objective": 7.0, "elapsed_s": 0.2})
+        return {"entries": []}
+
+    job = manager.submit({"month": 1, "year": 2024}, work)
+    wait_for(job)
+
+    data = manager.get(job.id).to_dict()
+    assert data["status"] == JOB_COMPLETED
+    assert data["result"] == {"entries": []}
+    assert data["progress"]["objective"] == 7.0
+    assert [point["objective"] for point in data["objective_history"]] == [10.0, 7.0]
+
+
+def test_job_failure_is_reported():
+    manager = GenerationJobManager(max_workers=1)
+
+    def work(job):
+        raise ValueError("brak danych")
+
+    job = manager.submit({}, work)
+    wait_for(job)
+    assert job.status == JOB_FAILED
+    assert "brak danych" in job.error
+
+
+def test_cancel_running_and_queued_jobs():
+    manager = GenerationJobManager(max_workers=1)
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        job.cancel_event.wait(5)
+        raise JobCancelled()
+
+    running = manager.submit({}, work)
+    queued = manager.submit({}, work)
+    assert started.wait(5)
+
+    manager.cancel(queued.id)
+    assert queued.status == JOB_CANCELLED
+    manager.cancel(running.id)
+    wait_for(running)
+    assert running.status == JOB_CANCELLED
+    assert manager.cancel("missing") is None
+
+
+def test_stream_endpoint_emits_solutions_and_final_status():
+    from backend.app import create_app
+    from backend.services.jobs import job_manager
+
+    def work(job):
+        job.publish_solution({"solutions": 1, "objective": 3.0, "entries": [{"pracownik_id": 1}]})
+        return {"entries": []}
+
+    job = job_manager.submit({}, work)
+    response = create_app().test_client().get(f"/api/grafiki/zadania/{job.id}/strumien")
+    body = response.get_data(as_text=True)
+
+    assert response.mimetype == "text/event-stream"
+    assert "event: solution" in body
+    assert '"pracownik_id": 1' in body
+    assert body.rstrip().splitlines()[-2] == "event: status"
+    assert job.progress == {"solutions": 1, "objective": 3.0}
+
+
+def test_generation_job_publishes_ortools_solutions(monkeypatch):
+    from contextlib import contextmanager
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.api import schedules
+    from backend.models import Base
+    from backend.services.jobs import GenerationJob
+    from backend.tests.test_ortools_generator import setup_basic_data
+
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    setup_basic_data(session)
+
+    @contextmanager
+    def test_session_scope():
+        yield session
+
+    monkeypatch.setattr(schedules, "session_scope", test_session_scope)
+    params = schedules._parse_generation_payload({"year": 2024, "month": 1, "generator_type": "ortools"})
+    job = GenerationJob(id="test", params=params)
+
+    result = schedules._generation_job(job)
+
+    assert result["entries"]
+    assert job.latest_solution is not None
+    assert job.latest_solution["entries"]
+    # Phases reach the job; each solution is one history point although both callbacks saw it
+    assert job.progress["phase"] == "validating"
+    assert job.progress["objective"] == result["diagnostics"]["solver"]["objective"]
+    assert len(job.objective_history) == job.progress["solutions"]
+
+
+def test_infeasible_generation_job_keeps_the_diagnosis(monkeypatch):
+    from contextlib import contextmanager
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from backend.api import schedules
+    from backend.models import Base, HourLimit
+    from backend.tests.test_ortools_generator import setup_basic_data
+
+    # One connection shared with the job's worker thread
+    engine = create_engine(
+        "sqlite://", future=True, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    setup_basic_data(session)
+    # Three cashiers with 16 h a week cannot cover 7 eight-hour shifts
+    session.add(HourLimit(etat=1.0, max_tygodniowo=16))
+    session.commit()
+
+    @contextmanager
+    def test_session_scope():
+        yield session
+
+    monkeypatch.setattr(schedules, "session_scope", test_session_scope)
+    params = schedules._parse_generation_payload(
+        {"year": 2024, "month": 1, "generator_type": "ortools", "diagnose": True}
+    )
+    manager = GenerationJobManager(max_workers=1)
+    job = manager.submit(params, schedules._generation_job)
+    wait_for(job, timeout=30)
+
+    data = job.to_dict()
+    assert data["status"] == JOB_FAILED
+    assert data["error"].startswith("InfeasibleScheduleError")
+    assert data["error_details"]["message"] == "Nie można wygenerować grafiku"
+    assert {cause["constraint"] for cause in data["error_details"]["infeasibility"]} >= {"weekly_hours"}
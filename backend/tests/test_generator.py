@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker
 
 from backend.core.generator import GenerationError, generate_monthly_schedule
 from backend.models import Base, GrafikEntry, Pracownik, Rola, Zmiana, Nieobecnosc
+from backend.services.absences import build_absence_map, load_absences, month_window
 
 
 @pytest.fixture()
@@ -49,3 +50,39 @@ def test_generate_respects_absences(session):
 
     with pytest.raises(GenerationError):
         generate_monthly_schedule(session, 2024, 1)
+
+
+def test_regenerate_replaces_entries_in_bulk(session):
+    setup_basic_data(session)
+    generate_monthly_schedule(session, 2024, 1)
+    schedule, entries, _ = generate_monthly_schedule(session, 2024, 1)
+    session.commit()
+
+    assert len(entries) == 31
+    assert all(entry.id is not None for entry in entries)
+    assert entries[0].pracownik.imie == "Anna"
+    assert entries[0].zmiana.nazwa_zmiany == "Poranna"
+    assert [entry.data for entry in entries] == sorted(entry.data for entry in entries)
+    assert session.query(GrafikEntry).filter_by(grafik_miesieczny_id=schedule.id).count() == 31
+
+
+def test_absences_are_loaded_for_month_window_only(session):
+    setup_basic_data(session)
+    session.add_all(
+        [
+            Nieobecnosc(pracownik_id=1, typ_nieobecnosci="urlop", data_od=date(2023, 6, 1), data_do=date(2023, 6, 10)),
+            Nieobecnosc(pracownik_id=1, typ_nieobecnosci="urlop", data_od=date(2023, 12, 20), data_do=date(2024, 1, 2)),
+            Nieobecnosc(pracownik_id=1, typ_nieobecnosci="L4", data_od=date(2023, 12, 27), data_do=date(2023, 12, 28)),
+            Nieobecnosc(pracownik_id=1, typ_nieobecnosci="urlop", data_od=date(2024, 2, 1), data_do=date(2024, 2, 3)),
+        ]
+    )
+    session.commit()
+
+    window = month_window(2024, 1)
+    absences = load_absences(session, *window)
+    assert window == (date(2024, 1, 1), date(2024, 1, 31))
+    assert [absence.data_od for absence in absences] == [date(2023, 12, 20)]
+
+    absence_map = build_absence_map(absences, *window)
+    assert sorted(absence_map) == [date(2024, 1, 1), date(2024, 1, 2)]
+    assert absence_map[date(2024, 1, 1)] == {1}
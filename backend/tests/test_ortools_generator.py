@@ -1,11 +1,24 @@
+import threading
 from datetime import date, time
 
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from backend.core.ortools_generator import OrToolsGenerator
-from backend.models import Base, GrafikEntry, Pracownik, Rola, Zmiana, Nieobecnosc
+from backend.core import ortools_generator
+from backend.core.ortools_generator import (
+    CapacityError,
+    GenerationCancelled,
+    GenerationError,
+    InfeasibleScheduleError,
+    OrToolsGenerator,
+    generate_rolling_horizon,
+)
+from backend.models import Base, GeneratorParameter, GrafikEntry, Pracownik, Rola, Zmiana, Nieobecnosc, Holiday
+from backend.core.quarter_generator import QuarterGenerator
+from backend.core.schedule_repair import ScheduleRepairGenerator
+from backend.services.horizon import load_boundary_entries
+from backend.models import GrafikMiesieczny, HourLimit, StaffingRequirementTemplate
 
 
 @pytest.fixture()
@@ -47,3 +60,479 @@ def test_ortools_generator_success(session):
     # OR-Tools should generate a valid schedule (warnings are acceptable, errors are not)
     blocking_issues = [issue for issue in issues if issue.level == 'error']
     assert not blocking_issues, f"Found blocking issues: {blocking_issues}"
+
+
+def test_ortools_generator_skips_closed_days(session):
+    setup_basic_data(session)
+    session.add(Holiday(date=date(2024, 1, 1), name="Nowy Rok", store_closed=True))
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1)
+    schedule, entries, issues = generator.generate()
+
+    assert not any(key[1] == 1 for key in generator.assignments)
+    assert all(entry.data != date(2024, 1, 1) for entry in entries)
+    # Every open day/shift slot is covered from the (role, day, shift) index
+    assert len(entries) == 30
+
+
+def test_ortools_generator_applies_scenario_solver_profile(session):
+    setup_basic_data(session)
+    session.add(GeneratorParameter(
+        scenario_type="FAST",
+        weights={},
+        num_search_workers=2,
+        max_time_in_seconds=5,
+        relative_gap_limit=0.05,
+        random_seed=7,
+        use_hints=True,
+    ))
+    session.commit()
+
+    # First run stores a schedule, the second one is hinted from it
+    OrToolsGenerator(session, 2024, 1, "FAST").generate()
+    generator = OrToolsGenerator(session, 2024, 1, "FAST")
+    generator.generate()
+
+    assert generator.solver.parameters.num_workers == 2
+    assert generator.solver.parameters.max_time_in_seconds == 5
+    assert generator.solver.parameters.random_seed == 7
+    assert generator.solve_stats["status"] in {"OPTIMAL", "FEASIBLE"}
+    assert generator.solve_stats["settings"]["use_hints"] is True
+
+
+def test_ortools_generator_warm_start_from_heuristic(session):
+    setup_basic_data(session)
+
+    generator = OrToolsGenerator(session, 2024, 1, warm_start="heuristic")
+    schedule, entries, issues = generator.generate()
+
+    warm_start = generator.solve_stats["warm_start"]
+    assert warm_start["source"] == "heuristic"
+    assert warm_start["hinted_assignments"] == 31
+    assert 0.0 <= warm_start["survival_rate"] <= 1.0
+    assert warm_start["kept_assignments"] <= len(entries)
+
+
+def test_ortools_generator_reports_progress_and_honours_cancel(session):
+    setup_basic_data(session)
+
+    updates = []
+    solutions = []
+    generator = OrToolsGenerator(
+        session, 2024, 1, progress_callback=updates.append, solution_callback=solutions.append
+    )
+    schedule, entries, issues = generator.generate()
+    phases = [update["phase"] for update in updates if "phase" in update]
+    assert phases == ["model", "solving", "persisting", "validating"]
+    solution_updates = [update for update in updates if "objective" in update]
+    assert solution_updates[-1]["objective"] == generator.solve_stats["objective"]
+    assert len(solutions[-1]["entries"]) == len(entries)
+    # Progress updates are not the dicts later extended with entries
+    assert all("entries" not in update for update in updates)
+    assert generator.solve_stats["time_to_first_feasible_ms"] is not None
+
+    cancel_event = threading.Event()
+    cancel_event.set()
+    generator = OrToolsGenerator(session, 2024, 1, cancel_event=cancel_event)
+    with pytest.raises(GenerationCancelled):
+        generator.generate()
+
+
+def test_ortools_generator_reports_capacity_deficits(session):
+    setup_basic_data(session)
+    session.add(Zmiana(
+        id=2,
+        nazwa_zmiany="Popołudniowa",
+        godzina_rozpoczecia=time(14),
+        godzina_zakonczenia=time(22),
+        wymagana_obsada={"Kasjer": 2},
+    ))
+    for emp_id in (1, 2):
+        session.add(Nieobecnosc(pracownik_id=emp_id, typ_nieobecnosci="urlop", data_od=date(2024, 1, 10), data_do=date(2024, 1, 11)))
+    session.add(Pracownik(id=4, imie="Ewa", nazwisko="Limit", rola_id=1, limit_godzin_miesieczny=10))
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1)
+    with pytest.raises(CapacityError) as exc_info:
+        generator.generate()
+
+    report = exc_info.value.report
+    assert not report.feasible
+    assert not report.slot_deficits
+    # Overlapping shifts need 3 different cashiers a day; only 2 are available on the 10th and 11th
+    assert [item["date"] for item in report.day_deficits] == ["2024-01-10", "2024-01-11"]
+    # 93 shifts x 8 h exceed 3 x 160 h + 10 h
+    assert report.hour_deficits == [
+        {"role": "Kasjer", "required_hours": 744.0, "capacity_hours": 490.0, "deficit_hours": 254.0}
+    ]
+    assert generator.assignments == {}
+
+
+def test_ortools_generator_diagnoses_infeasible_month(session):
+    role = Rola(id=1, nazwa_roli="Kasjer")
+    session.add(Pracownik(id=1, imie="Anna", nazwisko="Sama", rola=role, limit_godzin_miesieczny=300))
+    session.add(Zmiana(
+        id=1,
+        nazwa_zmiany="Poranna",
+        godzina_rozpoczecia=time(8),
+        godzina_zakonczenia=time(16),
+        wymagana_obsada={"Kasjer": 1},
+    ))
+    session.commit()
+
+    # One cashier cannot cover every day and still get a day off each week
+    generator = OrToolsGenerator(session, 2024, 1, diagnose=True)
+    with pytest.raises(InfeasibleScheduleError) as exc_info:
+        generator.generate()
+
+    causes = exc_info.value.causes
+    families = {cause["constraint"] for cause in causes}
+    assert families == {"coverage", "weekly_rest"}
+    assert any(cause["message"] == "Pracownik Anna Sama: co najmniej 1 dzień wolny w każdym 7-dniowym oknie" for cause in causes)
+    coverage_days = sorted(cause["date"] for cause in causes if cause["constraint"] == "coverage")
+    assert 7 <= len(coverage_days) <= 31
+    assert generator.diagnosis_stats["status"] == "INFEASIBLE"
+
+
+def test_ortools_generator_soft_coverage_returns_uncovered_slots(session):
+    setup_basic_data(session)
+    session.add(Zmiana(
+        id=2,
+        nazwa_zmiany="Popołudniowa",
+        godzina_rozpoczecia=time(14),
+        godzina_zakonczenia=time(22),
+        wymagana_obsada={"Kasjer": 2},
+    ))
+    for emp_id in (1, 2):
+        session.add(Nieobecnosc(pracownik_id=emp_id, typ_nieobecnosci="urlop", data_od=date(2024, 1, 10), data_do=date(2024, 1, 10)))
+    for emp_id in (1, 2, 3):
+        session.get(Pracownik, emp_id).limit_godzin_miesieczny = 250
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1, soft_coverage=True)
+    schedule, entries, _ = generator.generate()
+
+    # Only one cashier is left on the 10th for three slots; weekly rest leaves more gaps
+    assert entries
+    assert generator.solve_stats["coverage_mode"] == "soft"
+    missing_on_10th = sum(slot["missing"] for slot in generator.uncovered_slots if slot["date"] == "2024-01-10")
+    assert missing_on_10th == 2
+    assert not generator.overstaffed_slots
+    total_missing = sum(slot["missing"] for slot in generator.uncovered_slots)
+    assert len(entries) == 31 * 3 - total_missing
+
+
+def test_ortools_generator_uses_staffing_templates_and_holiday_overrides(session):
+    setup_basic_data(session)
+    session.add(StaffingRequirementTemplate(day_type="WEEKDAY", shift_id=1, role_id=1, min_staff=1, target_staff=2, max_staff=2))
+    session.add(Holiday(
+        date=date(2024, 1, 1),
+        name="Nowy Rok",
+        store_closed=False,
+        coverage_overrides={"staffing": [{"shift_id": 1, "role": "Kasjer", "min_staff": 3, "max_staff": 3}]},
+    ))
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1)
+    _, entries, issues = generator.generate()
+
+    # Working an open holiday is still reported by validation; coverage must hold
+    assert not [issue for issue in issues if "brakuje" in issue.message]
+    per_day = {}
+    for entry in entries:
+        per_day[entry.data] = per_day.get(entry.data, 0) + 1
+    assert generator.day_types[date(2024, 1, 1)] == "HOLIDAY"
+    assert per_day[date(2024, 1, 1)] == 3
+    weekdays = [day for day in per_day if day.weekday() < 5 and day.day != 1]
+    weekends = [day for day in per_day if day.weekday() >= 5]
+    # Templates apply on weekdays only; weekends keep the exact legacy requirement
+    assert all(1 <= per_day[day] <= 2 for day in weekdays)
+    assert sum(per_day[day] for day in weekdays) > len(weekdays)
+    assert all(per_day[day] == 1 for day in weekends)
+
+
+def test_ortools_generator_rolling_horizon_respects_previous_month_tail(session):
+    setup_basic_data(session)
+    session.add(Zmiana(id=2, nazwa_zmiany="Nocna", godzina_rozpoczecia=time(22), godzina_zakonczenia=time(6), wymagana_obsada={}))
+    december = GrafikMiesieczny(miesiac_rok="2023-12", status="roboczy")
+    session.add(december)
+    session.flush()
+    # Anna worked the last six days of December, Jan the night of the 31st
+    for day in range(26, 32):
+        session.add(GrafikEntry(grafik_miesieczny_id=december.id, pracownik_id=1, zmiana_id=1, data=date(2023, 12, day)))
+    session.add(GrafikEntry(grafik_miesieczny_id=december.id, pracownik_id=2, zmiana_id=2, data=date(2023, 12, 31)))
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1, rolling_horizon=True)
+    _, entries, issues = generator.generate()
+
+    assert generator.solve_stats["boundary_entries"] == 7
+    morning = [entry.pracownik_id for entry in entries if entry.data == date(2024, 1, 1) and entry.zmiana_id == 1]
+    assert morning == [3]
+    assert not [issue for issue in issues if "odpoczynku" in issue.message or "7 dni z rzędu" in issue.message]
+
+
+def test_boundary_entries_come_only_from_the_previous_month_schedule(session):
+    setup_basic_data(session)
+    december = GrafikMiesieczny(miesiac_rok="2023-12", status="roboczy")
+    # A stray schedule whose entries fall on the same December days
+    other = GrafikMiesieczny(miesiac_rok="2024-02", status="roboczy")
+    session.add_all([december, other])
+    session.flush()
+    session.add(GrafikEntry(grafik_miesieczny_id=december.id, pracownik_id=1, zmiana_id=1, data=date(2023, 12, 30)))
+    session.add(GrafikEntry(grafik_miesieczny_id=other.id, pracownik_id=2, zmiana_id=1, data=date(2023, 12, 30)))
+    session.add(GrafikEntry(grafik_miesieczny_id=other.id, pracownik_id=3, zmiana_id=1, data=date(2023, 12, 31)))
+    session.commit()
+
+    entries = load_boundary_entries(session, date(2024, 1, 1))
+
+    assert [(entry.pracownik_id, entry.data) for entry in entries] == [(1, date(2023, 12, 30))]
+
+
+def test_generate_rolling_horizon_chains_consecutive_months(session):
+    setup_basic_data(session)
+
+    results = generate_rolling_horizon(session, 2024, 1, 2)
+
+    assert [(result.year, result.month) for result in results] == [(2024, 1), (2024, 2)]
+    assert all(result.entries for result in results)
+    # February sees January's last days as fixed context
+    assert results[1].generator.boundary_entries
+    assert not [issue for issue in results[1].issues if "7 dni z rzędu" in issue.message]
+
+
+def test_quarter_generator_keeps_quarterly_limits(session):
+    setup_basic_data(session)
+    session.add(HourLimit(etat=1.0, max_kwartalnie=250))
+    session.commit()
+
+    result = QuarterGenerator(session, 2024, 1).generate()
+
+    assert [(month.year, month.month) for month in result.months] == [(2024, 1), (2024, 2), (2024, 3)]
+    # One 8h cashier shift on each of the 91 days, spread within 3 x 250h
+    assert sum(result.worked_minutes.values()) == 91 * 8 * 60
+    assert all(minutes <= 250 * 60 for minutes in result.worked_minutes.values())
+    assert not result.violations
+    # February and March are solved with January's and February's tails as context
+    assert result.months[1].generator.boundary_entries
+
+
+def test_quarter_repair_rolls_back_a_chain_when_a_later_month_fails(session, monkeypatch):
+    setup_basic_data(session)
+    generator = QuarterGenerator(session, 2024, 1)
+    generator._forward_pass()
+    session.commit()
+    stored = {(entry.pracownik_id, entry.data, entry.zmiana_id) for entry in session.query(GrafikEntry)}
+    totals = generator._total_worked(generator.months)
+    # Anna is one shift over her limit, the others have room; March cannot be re-solved
+    generator.quarterly_limits = {1: totals[1] - 8 * 60, 2: totals[2] + 40 * 60, 3: totals[3] + 40 * 60}
+    solve_month = generator._solve_month
+
+    def failing_march(year, month, budgets, warm_start=None):
+        if (year, month) == (2024, 3) and warm_start == "current":
+            raise GenerationError("Brak rozwiązania")
+        return solve_month(year, month, budgets, warm_start)
+
+    monkeypatch.setattr(generator, "_solve_month", failing_march)
+    generator._repair_pass()
+
+    assert not generator.repaired_months
+    assert [(failure["month"], failure["failed_month"]) for failure in generator.failed_repairs] == [
+        ("2024-03", "2024-03"),
+        ("2024-02", "2024-03"),
+        ("2024-01", "2024-03"),
+    ]
+    # January and February re-solves were rolled back with the failed chain
+    assert {(entry.pracownik_id, entry.data, entry.zmiana_id) for entry in session.query(GrafikEntry)} == stored
+    assert generator._total_worked(generator.months) == totals
+    february = generator.results[(2024, 2)]
+    assert {(entry.pracownik_id, entry.data, entry.zmiana_id) for entry in february.entries} == {
+        key for key in stored if key[1].month == 2
+    }
+
+
+def test_ortools_generator_decomposes_by_role(session, monkeypatch):
+    setup_basic_data(session)
+    manager = Rola(id=2, nazwa_roli="Kierownik")
+    session.add(manager)
+    session.add_all([
+        Pracownik(id=4, imie="Ewa", nazwisko="Kierownik", rola=manager),
+        Pracownik(id=5, imie="Piotr", nazwisko="Kierownik", rola=manager),
+    ])
+    session.get(Zmiana, 1).wymagana_obsada = {"Kasjer": 1, "Kierownik": 1}
+    session.commit()
+
+    monolithic = OrToolsGenerator(session, 2024, 1)
+    _, mono_entries, _ = monolithic.generate()
+    mono_objective = monolithic.solve_stats["objective"]
+
+    # Too small to be worth a process pool: solved as one model
+    generator = OrToolsGenerator(session, 2024, 1, decompose=True)
+    generator.generate()
+    assert "components" not in generator.solve_stats
+
+    monkeypatch.setattr(ortools_generator, "DECOMPOSITION_MIN_VARIABLES", 0)
+    generator = OrToolsGenerator(session, 2024, 1, decompose=True)
+    _, entries, issues = generator.generate()
+
+    components = generator.solve_stats["components"]
+    assert sorted(component["roles"][0] for component in components) == ["Kasjer", "Kierownik"]
+    assert all(component["status"] == "OPTIMAL" for component in components)
+    assert len(entries) == len(mono_entries) == 31 * 2
+    assert generator.solve_stats["objective"] == mono_objective
+    # Each role's demand is split over its own employees: 31 days over 3 cashiers, over 2 managers
+    for role_ids in ((1, 2, 3), (4, 5)):
+        counts = [sum(1 for entry in entries if entry.pracownik_id == emp_id) for emp_id in role_ids]
+        assert max(counts) - min(counts) <= 1
+    assert not [issue for issue in issues if issue.level == "error"]
+
+
+def test_schedule_repair_only_changes_the_absence_neighborhood(session):
+    setup_basic_data(session)
+    OrToolsGenerator(session, 2024, 1).generate()
+    before = {
+        (entry.pracownik_id, entry.data, entry.zmiana_id)
+        for entry in session.query(GrafikEntry).all()
+    }
+    absent_id = next(emp_id for emp_id, entry_date, _ in before if entry_date == date(2024, 1, 15))
+    session.add(Nieobecnosc(
+        pracownik_id=absent_id, typ_nieobecnosci="zwolnienie",
+        data_od=date(2024, 1, 15), data_do=date(2024, 1, 16),
+    ))
+    session.commit()
+
+    generator = ScheduleRepairGenerator(
+        session, 2024, 1, absent_id, date(2024, 1, 15), date(2024, 1, 16), radius_days=2
+    )
+    _, entries, issues = generator.generate()
+    after = {(entry.pracownik_id, entry.data, entry.zmiana_id) for entry in entries}
+
+    assert not any(emp_id == absent_id and entry_date.day in (15, 16) for emp_id, entry_date, _ in after)
+    # Outside 13-18 January nothing moved
+    assert {key for key in after if not 13 <= key[1].day <= 18} == {
+        key for key in before if not 13 <= key[1].day <= 18
+    }
+    assert len(after) == 31
+    assert generator.repair_stats["changes"] == len(after ^ before)
+    assert generator.repair_stats["changes"] <= 4 * 2
+    assert not [issue for issue in issues if issue.level == "error"]
+
+
+def test_ortools_generator_applies_hour_limit_caps_by_etat(session):
+    setup_basic_data(session)
+    session.add(HourLimit(etat=1.0, max_dziennie=8, max_tygodniowo=24))
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1)
+    _, entries, _ = generator.generate()
+
+    assert generator.hour_caps[1].weekly_minutes == 24 * 60
+    weekly = {}
+    for entry in entries:
+        key = (entry.pracownik_id, entry.data.isocalendar()[:2])
+        weekly[key] = weekly.get(key, 0) + 8
+    assert max(weekly.values()) <= 24
+
+
+def test_ortools_generator_diagnoses_weekly_hour_cap(session):
+    setup_basic_data(session)
+    # Three cashiers with 16 h a week cannot cover 7 eight-hour shifts
+    session.add(HourLimit(etat=1.0, max_tygodniowo=16))
+    session.commit()
+
+    with pytest.raises(InfeasibleScheduleError) as error:
+        OrToolsGenerator(session, 2024, 1, diagnose=True).generate()
+
+    assert {cause["constraint"] for cause in error.value.causes} >= {"weekly_hours"}
+    assert "16 h w tygodniu" in str(error.value)
+
+
+def test_ortools_generator_breaks_symmetry_between_identical_employees(session):
+    setup_basic_data(session)
+    session.add(Nieobecnosc(
+        pracownik_id=3, typ_nieobecnosci="urlop", data_od=date(2024, 1, 10), data_do=date(2024, 1, 12),
+    ))
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1)
+    _, entries, _ = generator.generate()
+
+    # Employee 3 has an absence and is not interchangeable with 1 and 2
+    assert generator._equivalence_classes() == [[1, 2]]
+    assert generator.solve_stats["symmetry"] == {"classes": 1, "employees": 2}
+    shifts_per_employee = {emp_id: sum(1 for entry in entries if entry.pracownik_id == emp_id) for emp_id in (1, 2)}
+    assert shifts_per_employee[1] >= shifts_per_employee[2]
+
+    hinted = OrToolsGenerator(session, 2024, 1, warm_start="current")
+    hinted.generate()
+    assert hinted.solve_stats["symmetry"] is None
+
+
+def test_ortools_generator_honours_employee_preferences(session):
+    setup_basic_data(session)
+    session.add(GeneratorParameter(scenario_type="DEFAULT", weights={"preferencje": 50}))
+    session.get(Pracownik, 1).preferencje = {"dni_wolne": ["sobota", "niedziela"]}
+    session.get(Pracownik, 2).preferencje = {"unikane_zmiany": ["Poranna"]}
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1)
+    _, entries, _ = generator.generate()
+
+    assert not [entry for entry in entries if entry.pracownik_id == 1 and entry.data.isoweekday() >= 6]
+    assert not [entry for entry in entries if entry.pracownik_id == 2]
+    assert generator.solve_stats["preferences"]["employees"] == 2
+    assert generator.solve_stats["preferences"]["violations"] == 0
+
+
+@pytest.mark.parametrize("mode", ["deviation", "spread", ["spread", "weekend_night"]])
+def test_ortools_generator_fairness_modes_balance_shifts(session, mode):
+    setup_basic_data(session)
+    session.add(GeneratorParameter(scenario_type="DEFAULT", weights={"fairness_mode": mode}))
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1)
+    _, entries, _ = generator.generate()
+
+    counts = [sum(1 for entry in entries if entry.pracownik_id == emp_id) for emp_id in (1, 2, 3)]
+    assert sum(counts) == 31
+    assert max(counts) - min(counts) <= 1
+    assert generator.solve_stats["status"] == "OPTIMAL"
+
+
+def test_ortools_generator_hours_fairness_scales_by_etat(session):
+    setup_basic_data(session)
+    session.get(Pracownik, 3).etat = 0.5
+    session.add(GeneratorParameter(scenario_type="DEFAULT", weights={"fairness_mode": "hours"}))
+    session.commit()
+
+    _, entries, _ = OrToolsGenerator(session, 2024, 1).generate()
+
+    counts = {emp_id: sum(1 for entry in entries if entry.pracownik_id == emp_id) for emp_id in (1, 2, 3)}
+    # 31 shifts split 2:2:1
+    assert counts[3] in (6, 7)
+    assert abs(counts[1] - counts[2]) <= 1
+
+
+def test_symmetry_breaking_keeps_employees_with_different_etat_apart(session):
+    setup_basic_data(session)
+    # Ordering Anna first would force her to work at least as much as Jan
+    session.get(Pracownik, 1).etat = 0.5
+    session.add(GeneratorParameter(scenario_type="DEFAULT", weights={"fairness_mode": "hours"}))
+    session.commit()
+
+    generator = OrToolsGenerator(session, 2024, 1)
+    _, entries, _ = generator.generate()
+
+    assert generator.solve_stats["symmetry"] == {"classes": 1, "employees": 2}
+    counts = {emp_id: sum(1 for entry in entries if entry.pracownik_id == emp_id) for emp_id in (1, 2, 3)}
+    assert counts[1] in (6, 7)
+
+
+def test_ortools_generator_rejects_unknown_fairness_mode(session):
+    setup_basic_data(session)
+    session.add(GeneratorParameter(scenario_type="DEFAULT", weights={"fairness_mode": "random"}))
+    session.commit()
+
+    with pytest.raises(GenerationError, match="random"):
+        OrToolsGenerator(session, 2024, 1)
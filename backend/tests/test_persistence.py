@@ -0,0 +1,83 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from backend import database
+from backend.models import Base, GrafikEntry, GrafikMiesieczny, Pracownik, Rola, Zmiana
+from backend.services.persistence import sync_schedule_entries
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        yield session
+
+
+def setup_schedule(session):
+    role = Rola(id=1, nazwa_roli="Kasjer")
+    session.add_all(
+        [
+            role,
+            Pracownik(id=1, imie="Anna", nazwisko="Test", rola=role),
+            Pracownik(id=2, imie="Jan", nazwisko="Test", rola=role),
+            Zmiana(id=1, nazwa_zmiany="Poranna", godzina_rozpoczecia=time(6), godzina_zakonczenia=time(14)),
+            Zmiana(id=2, nazwa_zmiany="Popołudniowa", godzina_rozpoczecia=time(14), godzina_zakonczenia=time(22)),
+        ]
+    )
+    schedule = GrafikMiesieczny(miesiac_rok="2024-01", status="roboczy")
+    session.add(schedule)
+    session.flush()
+    return schedule
+
+
+def test_sync_only_touches_changed_entries(session):
+    schedule = setup_schedule(session)
+    initial = [(emp, date(2024, 1, day), 1) for emp in (1, 2) for day in range(1, 11)]
+    first = sync_schedule_entries(session, schedule.id, initial)
+    session.commit()
+    assert first.summary() == {"inserted": 20, "deleted": 0, "unchanged": 0}
+    ids_before = {(e.pracownik_id, e.data, e.zmiana_id): e.id for e in first.entries}
+
+    # Swap the shifts of two cells
+    edited = [
+        (emp, entry_date, 2 if (emp, entry_date.day) in {(1, 3), (2, 4)} else shift)
+        for emp, entry_date, shift in initial
+    ]
+    second = sync_schedule_entries(session, schedule.id, edited)
+    session.commit()
+
+    assert second.summary() == {"inserted": 2, "deleted": 2, "unchanged": 18}
+    assert [(e.pracownik_id, e.data, e.zmiana_id) for e in second.entries] == edited
+    for entry in second.entries:
+        key = (entry.pracownik_id, entry.data, entry.zmiana_id)
+        if key in ids_before:
+            assert entry.id == ids_before[key]
+    assert session.query(GrafikEntry).count() == 20
+
+
+def test_missing_indexes_are_added_after_deduplication(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}", future=True)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE grafiki_miesieczne (id INTEGER PRIMARY KEY, miesiac_rok VARCHAR(20) NOT NULL, status VARCHAR(40) NOT NULL, data_utworzenia DATETIME NOT NULL)"))
+        connection.execute(text("CREATE TABLE grafik_entries (id INTEGER PRIMARY KEY, grafik_miesieczny_id INTEGER NOT NULL, pracownik_id INTEGER NOT NULL, data DATE NOT NULL, zmiana_id INTEGER NOT NULL)"))
+        connection.execute(text("INSERT INTO grafiki_miesieczne VALUES (1, '2024-01', 'roboczy', '2024-01-01 00:00:00')"))
+        for entry_id in (1, 2, 3):
+            connection.execute(
+                text("INSERT INTO grafik_entries VALUES (:id, 1, 1, '2024-01-01', :shift)"),
+                {"id": entry_id, "shift": 1 if entry_id < 3 else 2},
+            )
+    monkeypatch.setattr(database, "engine", engine)
+
+    database.create_db_tables()
+
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("grafik_entries")}
+    assert indexes["ux_grafik_entries_grafik_data_zmiana_pracownik"]["unique"]
+    assert "ix_grafiki_miesieczne_miesiac_rok" in {index["name"] for index in inspect(engine).get_indexes("grafiki_miesieczne")}
+    with engine.connect() as connection:
+        remaining = connection.execute(text("SELECT id FROM grafik_entries ORDER BY id")).scalars().all()
+    assert remaining == [1, 3]
@@ -0,0 +1,53 @@
+from datetime import date
+
+from backend.services.preferences import (
+    NO_PREFERENCES,
+    PreferenceCache,
+    compile_preferences,
+)
+from backend.services.shift_rules import is_night_shift
+
+
+def test_compile_preferences_builds_typed_index():
+    compiled = compile_preferences({
+        "preferowane_zmiany": ["Poranna", 2],
+        "unikane_zmiany": "3",
+        "dni_wolne": ["Sobota", "niedziela", 3, "2024-01-15", "jutro"],
+        "max_nocy": "4",
+        "max_godzin": 120,
+    })
+
+    assert compiled.preferred_shifts == {"poranna", 2}
+    assert compiled.avoided_shifts == {3}
+    assert compiled.days_off_weekdays == {6, 7, 3}
+    assert compiled.days_off_dates == {date(2024, 1, 15)}
+    assert compiled.max_nights == 4
+    assert compiled.ignored == ("max_godzin",)
+    assert compiled.resolve_shifts(compiled.preferred_shifts, {"poranna": 1}) == {1, 2}
+    assert compiled.is_day_off(date(2024, 1, 13)) and compiled.is_day_off(date(2024, 1, 15))
+    assert compile_preferences(None) is NO_PREFERENCES
+    assert compile_preferences(["x"]).is_empty
+
+
+def test_preference_cache_recompiles_only_after_change_or_invalidation():
+    cache = PreferenceCache()
+    raw = {"dni_wolne": ["sobota"]}
+
+    first = cache.get(1, raw)
+    assert cache.get(1, {"dni_wolne": ["sobota"]}) is first
+
+    # Written without an invalidate, e.g. by the importer or another process
+    raw["dni_wolne"].append("niedziela")
+    changed = cache.get(1, raw)
+    assert changed.days_off_weekdays == {6, 7}
+
+    cache.invalidate(1)
+    assert cache.get(1, raw) is not changed
+    assert cache.get(2, {}) is NO_PREFERENCES
+
+
+def test_is_night_shift_uses_night_time_share():
+    assert is_night_shift(22 * 60, 30 * 60)
+    assert is_night_shift(18 * 60, 26 * 60)
+    assert not is_night_shift(14 * 60, 22 * 60)
+    assert not is_night_shift(6 * 60, 14 * 60)
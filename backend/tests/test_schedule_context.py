@@ -0,0 +1,98 @@
+from datetime import date, time
+
+from backend.models import GrafikEntry, Holiday, Pracownik, Rola, StaffingRequirementTemplate, Zmiana
+from backend.services.schedule_context import UNBOUNDED_STAFF, ScheduleContext
+from backend.services.staffing import StaffingBounds, day_type_calendar, resolve_staffing
+from backend.services.walidacja import check_shift_coverage
+
+
+def make_inputs():
+    kasjer = Rola(id=1, nazwa_roli="Kasjer")
+    kierownik = Rola(id=2, nazwa_roli="Kierownik")
+    employees = [
+        Pracownik(id=10, imie="Anna", nazwisko="A", rola=kasjer, limit_godzin_miesieczny=120),
+        Pracownik(id=11, imie="Jan", nazwisko="B", rola=kasjer),
+        Pracownik(id=12, imie="Ewa", nazwisko="C", rola=kierownik),
+    ]
+    shifts = [
+        Zmiana(id=1, nazwa_zmiany="Poranna", godzina_rozpoczecia=time(6), godzina_zakonczenia=time(14),
+               wymagana_obsada={"Kasjer": 1, "Kierownik": 1}),
+        Zmiana(id=2, nazwa_zmiany="Nocna", godzina_rozpoczecia=time(22), godzina_zakonczenia=time(6),
+               wymagana_obsada={"Kasjer": 2, "Magazynier": 1}),
+    ]
+    holidays = [Holiday(date=date(2024, 1, 1), name="Nowy Rok", store_closed=True)]
+    absence_map = {date(2024, 1, 2): {11}, date(2023, 12, 31): {10}}
+    return employees, shifts, holidays, absence_map
+
+
+def test_context_encodes_availability_and_demand():
+    employees, shifts, holidays, absence_map = make_inputs()
+    context = ScheduleContext.build(2024, 1, employees, shifts, absence_map, holidays)
+
+    assert context.role_names == ["Kasjer", "Kierownik", "Magazynier"]
+    assert context.availability.shape == (3, 31, 2)
+    assert not context.open_days[0]
+    assert not context.available[1, 1] and context.available[0, 1]
+    assert context.shift_minutes.tolist() == [480, 480]
+    assert context.monthly_limit_minutes.tolist() == [7200, 9600, 9600]
+
+    supply = context.available_by_role()
+    assert supply[:, 0].tolist() == [0, 0, 0]
+    assert supply[:, 1].tolist() == [1, 1, 0]
+    demand = context.demand()
+    assert demand[:, 0, :].sum() == 0
+    assert demand[:, 1, 1].tolist() == [2, 0, 1]
+
+
+def test_coverage_check_matches_loop_based_check():
+    employees, shifts, holidays, absence_map = make_inputs()
+    context = ScheduleContext.build(2024, 1, employees, shifts, absence_map, holidays)
+    entries = []
+    for emp, day, shift in [(employees[0], 2, shifts[0]), (employees[2], 2, shifts[0]), (employees[0], 3, shifts[1])]:
+        entry = GrafikEntry(pracownik_id=emp.id, zmiana_id=shift.id, data=date(2024, 1, day))
+        entry.pracownik = emp
+        entry.zmiana = shift
+        entries.append(entry)
+
+    with_context = sorted(issue.message for issue in check_shift_coverage(entries, shifts, context))
+    without_context = sorted(issue.message for issue in check_shift_coverage(entries, shifts))
+
+    assert with_context == without_context
+    assert with_context == [
+        "2024-01-03 zmiana 2: brakuje 1 pracowników w roli Kasjer",
+        "2024-01-03 zmiana 2: brakuje 1 pracowników w roli Magazynier",
+    ]
+
+
+def test_staffing_resolution_follows_day_type_calendar():
+    employees, shifts, _, absence_map = make_inputs()
+    holidays = [
+        Holiday(date=date(2024, 1, 1), name="Nowy Rok"),
+        Holiday(date=date(2024, 1, 6), name="Trzech Króli", coverage_overrides={"day_type": "WEEKDAY"}),
+        Holiday(date=date(2024, 1, 8), name="Opis", coverage_overrides="tylko opis"),
+    ]
+    templates = [
+        (StaffingRequirementTemplate(day_type="WEEKDAY", shift_id=1, role_id=1, min_staff=1, target_staff=2, max_staff=3), "Kasjer"),
+        (StaffingRequirementTemplate(day_type="WEEKDAY", shift_id=1, role_id=1, min_staff=4,
+                                     effective_from=date(2024, 1, 20)), "Kasjer"),
+    ]
+    calendar = day_type_calendar(2024, 1, holidays)
+    assert calendar[date(2024, 1, 1)] == "HOLIDAY"
+    assert calendar[date(2024, 1, 6)] == "WEEKDAY"
+    assert calendar[date(2024, 1, 7)] == "WEEKEND"
+    assert calendar[date(2024, 1, 8)] == "HOLIDAY"
+
+    requirements = {1: {"Kasjer": 1, "Kierownik": 1}, 2: {"Kasjer": 2, "Magazynier": 1}}
+    staffing = resolve_staffing(calendar, requirements, templates, holidays)
+    # HOLIDAY without templates of its own falls back to the weekday templates
+    assert staffing[(date(2024, 1, 1), 1, "Kasjer")] == StaffingBounds(1, 2, 3)
+    assert staffing[(date(2024, 1, 6), 1, "Kasjer")] == StaffingBounds(1, 2, 3)
+    assert staffing[(date(2024, 1, 7), 1, "Kasjer")] == StaffingBounds.exact(1)
+    assert staffing[(date(2024, 1, 22), 1, "Kasjer")] == StaffingBounds(4, 4, None)
+    assert staffing[(date(2024, 1, 2), 1, "Kierownik")] == StaffingBounds.exact(1)
+
+    context = ScheduleContext.build(2024, 1, employees, shifts, absence_map, holidays, staffing=staffing)
+    kasjer = context.role_index["Kasjer"]
+    assert context.min_staff[kasjer, 1, 0] == 1 and context.max_staff[kasjer, 1, 0] == 3
+    assert context.max_staff[kasjer, 21, 0] == UNBOUNDED_STAFF
+    assert context.demand()[kasjer, 21, 0] == 4
@@ -1,6 +1,7 @@
 from datetime import date, time, timedelta
 
 from backend.models import GrafikEntry, Pracownik, Rola, Zmiana, Holiday
+from backend.services.shift_rules import ShiftRestMatrix, shift_minutes_table
 from backend.services.walidacja import (
     check_daily_rest,
     check_shift_coverage,
@@ -70,9 +71,57 @@ def test_working_hours_limit_exceeded():
     assert issues[0].level == "warning"
 
 
+def test_working_hours_limit_counts_overnight_shifts_minus_breaks():
+    entries = [make_entry(i, hour_start=22, hour_end=6) for i in range(1, 7)]
+    for entry in entries:
+        entry.zmiana.przerwa_minuty = 30
+    assert shift_minutes_table([entries[0].zmiana]) == {1: 450}
+    # 5 x 7.5 h
+    assert not check_working_hours_limit(entries[:5], 40)
+
+    issues = check_working_hours_limit(entries, 40)
+    assert issues
+    assert "45.00/40" in issues[0].message
+
+
 def test_holiday_scheduling_violation():
     holiday = Holiday(date=date(2024, 1, 1), name="Nowy Rok")
     entries = [make_entry(1)]
     issues = check_holidays(entries, [holiday])
     assert issues
     assert issues[0].level == "error"
+
+
+def test_rest_matrix_handles_overnight_shifts():
+    shifts = [
+        Zmiana(id=1, nazwa_zmiany="Nocna", godzina_rozpoczecia=time(22), godzina_zakonczenia=time(6)),
+        Zmiana(id=2, nazwa_zmiany="Poranna", godzina_rozpoczecia=time(6), godzina_zakonczenia=time(14)),
+        Zmiana(id=3, nazwa_zmiany="Popołudniowa", godzina_rozpoczecia=time(14), godzina_zakonczenia=time(22)),
+    ]
+    matrix = ShiftRestMatrix.build(shifts, 11)
+
+    assert matrix.next_day_conflicts[1] == {2, 3}
+    assert matrix.next_day_conflicts[2] == set()
+    assert matrix.next_day_conflicts[3] == {2}
+    assert matrix.rest_minutes(1, 2, day_gap=1) == 0
+    assert matrix.is_same_day_clique([1, 2, 3])
+
+
+def test_daily_rest_uses_rest_matrix_threshold():
+    entries = [make_entry(1, hour_end=22), make_entry(2, hour_start=6)]
+    matrix = ShiftRestMatrix.build([entries[0].zmiana], 8)
+    assert not check_daily_rest(entries, matrix)
+
+
+def test_rest_checks_use_previous_entries_as_context_only():
+    # Six 8-22 shifts in a row, then one shift the next day
+    previous = [make_entry(day, hour_end=22) for day in range(1, 7)]
+    current = [make_entry(7, hour_end=22)]
+
+    assert not check_weekly_rest(current)
+    assert not check_daily_rest(current)
+    assert len(check_weekly_rest(current, previous_entries=previous)) == 1
+    # Only the 6th -> 7th gap is reported, not the earlier ones inside ``previous``
+    issues = check_daily_rest(current, previous_entries=previous)
+    assert len(issues) == 1
+    assert "2024-01-07" in issues[0].message